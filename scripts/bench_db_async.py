@@ -0,0 +1,94 @@
+"""
+Compares the async database layer (database/aio.py) against the to_thread + sync ORM approach
+for a burst of concurrent operations, as the worker issues them when a batch of listings lands.
+Each operation is the pipeline's DB work for one listing: read it, record its valuation, schedule it.
+
+    python scripts/bench_db_async.py --concurrency 100 --rounds 5
+"""
+import os
+import sys
+import time
+import argparse
+import asyncio
+import logging
+from datetime import datetime, timezone
+from dotenv import load_dotenv
+
+# Add the project root to the Python path to allow imports from 'src'
+PROJECT_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+sys.path.insert(0, PROJECT_ROOT)
+
+load_dotenv(dotenv_path=os.path.join(os.path.dirname(__file__), '..', '.env.local'))
+
+from src.database import main as database
+from src.database import aio
+
+logger = logging.getLogger(__name__)
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s', stream=sys.stdout)
+
+PREFIX = 'bench-aio-'
+ALT_DATA = {'alt_value': 100.0, 'avg_price': 95.0, 'supply': 10, 'confidence': 0.9}
+
+def _seed(count: int):
+    database.save_listing([{
+        'listing_id': f"{PREFIX}{n}", 'name': f"Bench {n}", 'token_mint': f"{PREFIX}mint-{n}",
+        'listed_at': datetime.now(timezone.utc).isoformat(), 'cartel_category': 'NEW', 'is_listed': True,
+    } for n in range(count)])
+
+def _cleanup():
+    with database.get_session() as session:
+        session.query(database.ReaperSchedule).filter(database.ReaperSchedule.token_mint.like(f"{PREFIX}%")).delete(synchronize_session=False)
+        session.query(database.Listing).filter(database.Listing.listing_id.like(f"{PREFIX}%")).delete(synchronize_session=False)
+        session.commit()
+
+async def _threaded_op(n: int):
+    listing = await asyncio.to_thread(database.get_listing_by_id, f"{PREFIX}{n}")
+    await asyncio.to_thread(database.update_listing, listing['listing_id'], ALT_DATA, 'OK')
+    await asyncio.to_thread(database.schedule_verification, [listing['token_mint']])
+
+async def _async_op(n: int):
+    listing = await aio.get_listing_by_id(f"{PREFIX}{n}")
+    await aio.update_listing(listing['listing_id'], ALT_DATA, 'OK')
+    await aio.schedule_verification([listing['token_mint']])
+
+async def _timed(op, n: int, latencies: list):
+    started_at = time.perf_counter()
+    await op(n)
+    latencies.append(time.perf_counter() - started_at)
+
+async def run_burst(op, concurrency: int) -> tuple[float, list]:
+    latencies = []
+    started_at = time.perf_counter()
+    await asyncio.gather(*(_timed(op, n, latencies) for n in range(concurrency)))
+    return time.perf_counter() - started_at, sorted(latencies)
+
+async def bench(concurrency: int, rounds: int):
+    for name, op in (("to_thread + sync ORM", _threaded_op), ("async (aio)", _async_op)):
+        await run_burst(op, concurrency) # Warm up pools and statement caches
+        walls, latencies = [], []
+        for _ in range(rounds):
+            wall, burst_latencies = await run_burst(op, concurrency)
+            walls.append(wall)
+            latencies.extend(burst_latencies)
+        latencies.sort()
+        p50 = latencies[len(latencies) // 2]
+        p99 = latencies[min(len(latencies) - 1, int(len(latencies) * 0.99))]
+        logger.info(f"{name:>22}: burst of {concurrency} in {min(walls) * 1000:.0f}ms best / "
+                    f"{sum(walls) / len(walls) * 1000:.0f}ms avg, per-op p50 {p50 * 1000:.0f}ms p99 {p99 * 1000:.0f}ms")
+    await aio.dispose()
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--concurrency", type=int, default=100)
+    parser.add_argument("--rounds", type=int, default=5)
+    args = parser.parse_args()
+
+    database.init_db()
+    _seed(args.concurrency)
+    try:
+        asyncio.run(bench(args.concurrency, args.rounds))
+    finally:
+        _cleanup()
+
+if __name__ == "__main__":
+    main()
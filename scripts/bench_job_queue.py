@@ -0,0 +1,99 @@
+"""
+Measures throughput of the Postgres-backed job queue (WORK_QUEUE_MODE=postgres) as workers are added.
+Each worker is a separate process claiming jobs with SKIP LOCKED, like a real replica; jobs simulate
+an ALT/ME call by sleeping for --io-ms. Run against a scratch database: it empties the 'bench' jobs.
+
+    python scripts/bench_job_queue.py --jobs 2000 --workers 1 2 4 8
+"""
+import os
+import sys
+import time
+import argparse
+import logging
+import asyncio
+import multiprocessing
+from dotenv import load_dotenv
+
+# Add the project root to the Python path to allow imports from 'src'
+PROJECT_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+sys.path.insert(0, PROJECT_ROOT)
+
+load_dotenv(dotenv_path=os.path.join(os.path.dirname(__file__), '..', '.env.local'))
+
+from src.database import main as database
+
+logger = logging.getLogger(__name__)
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s', stream=sys.stdout)
+
+KIND = 'bench'
+
+def _clear_jobs():
+    with database.get_session() as session:
+        session.query(database.Job).filter(database.Job.kind == KIND).delete()
+        session.commit()
+
+async def _worker_loop(worker_id: str, concurrency: int, io_seconds: float, lease_seconds: int):
+    in_flight = set()
+
+    async def run(job):
+        await asyncio.sleep(io_seconds)
+        await asyncio.to_thread(database.complete_job, job['id'])
+
+    while True:
+        claimed = await asyncio.to_thread(database.claim_jobs, [KIND], concurrency - len(in_flight), lease_seconds, worker_id)
+        for job in claimed:
+            task = asyncio.create_task(run(job))
+            in_flight.add(task)
+            task.add_done_callback(in_flight.discard)
+        if not claimed and not in_flight:
+            return
+        if len(in_flight) >= concurrency or not claimed:
+            await asyncio.wait(in_flight, return_when=asyncio.FIRST_COMPLETED)
+
+def _worker_process(worker_id: str, concurrency: int, io_seconds: float, start_event):
+    # Don't reuse the parent's pooled connections after fork
+    database.engine.dispose(close=False)
+    start_event.wait()
+    asyncio.run(_worker_loop(worker_id, concurrency, io_seconds, lease_seconds=60))
+
+def run_round(workers: int, jobs: int, concurrency: int, io_seconds: float) -> float:
+    _clear_jobs()
+    for offset in range(0, jobs, 1000):
+        database.enqueue_jobs([{'kind': KIND, 'payload': {'n': n}} for n in range(offset, min(jobs, offset + 1000))])
+
+    start_event = multiprocessing.Event()
+    processes = [
+        multiprocessing.Process(target=_worker_process, args=(f"bench-{i}", concurrency, io_seconds, start_event))
+        for i in range(workers)
+    ]
+    for process in processes:
+        process.start()
+    started_at = time.perf_counter()
+    start_event.set()
+    for process in processes:
+        process.join()
+    elapsed = time.perf_counter() - started_at
+
+    remaining = database.get_job_counts().get((KIND, 'PENDING'), 0)
+    if remaining:
+        logger.warning(f"{remaining} jobs were left unclaimed.")
+    return jobs / elapsed
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--jobs", type=int, default=2000)
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4, 8])
+    parser.add_argument("--concurrency", type=int, default=10, help="Jobs in flight per worker (JOB_RUNNER_CONCURRENCY).")
+    parser.add_argument("--io-ms", type=float, default=50, help="Simulated I/O time per job.")
+    args = parser.parse_args()
+
+    database.init_db()
+    baseline = None
+    for workers in args.workers:
+        rate = run_round(workers, args.jobs, args.concurrency, args.io_ms / 1000)
+        baseline = baseline or rate
+        logger.info(f"{workers} worker(s): {rate:,.0f} jobs/s ({rate / baseline:.2f}x)")
+    _clear_jobs()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,118 @@
+"""
+Compares the old ORM read path (full Listing objects returned as row.__dict__) against the Core
+projection reads in database/main.py, on the /recheck query over a large SKIP backlog.
+"Core streamed" reads the same rows in DB_STREAM_CHUNK_SIZE chunks through a server-side cursor.
+Reports the best wall time over a few rounds, then the peak and retained memory of one read
+measured with tracemalloc (timed separately, since tracing slows allocation down).
+
+    python scripts/bench_read_projection.py --rows 100000 --rounds 3
+"""
+import os
+import sys
+import gc
+import time
+import argparse
+import logging
+import tracemalloc
+from datetime import datetime, timezone
+from dotenv import load_dotenv
+
+# Add the project root to the Python path to allow imports from 'src'
+PROJECT_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+sys.path.insert(0, PROJECT_ROOT)
+
+load_dotenv(dotenv_path=os.path.join(os.path.dirname(__file__), '..', '.env.local'))
+
+from src.database import main as database
+
+logger = logging.getLogger(__name__)
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s', stream=sys.stdout)
+
+PREFIX = 'bench-proj-'
+SEED_BATCH_SIZE = 5000
+# What the rechecker needs to decide whether a SKIP listing can be re-scored locally
+NARROW_FIELDS = ('listing_id', 'token_mint', 'alt_value', 'alt_value_confidence', 'last_analyzed_at')
+
+def _seed(count: int):
+    listed_at = datetime.now(timezone.utc)
+    for start in range(0, count, SEED_BATCH_SIZE):
+        database.save_listing([{
+            'listing_id': f"{PREFIX}{n}", 'name': f"Bench Card #{n} PSA 10", 'token_mint': f"{PREFIX}mint-{n}",
+            'grade_num': 10.0, 'grade': 'GEM MT 10', 'category': 'Pokemon', 'insured_value': 120.0,
+            'grading_company': 'PSA', 'img_url': f"https://example.com/{n}.png", 'grading_id': str(10_000_000 + n),
+            'price_amount': 1.5, 'price_currency': 'SOL', 'listed_at': listed_at, 'alt_value': 110.0,
+            'avg_price': 105.0, 'supply': 40, 'alt_asset_id': f"asset-{n}", 'alt_value_lower_bound': 90.0,
+            'alt_value_upper_bound': 130.0, 'alt_value_confidence': 80.0, 'cartel_category': 'SKIP', 'is_listed': True,
+        } for n in range(start, min(start + SEED_BATCH_SIZE, count))])
+
+def _cleanup():
+    with database.get_session() as session:
+        session.query(database.Listing).filter(database.Listing.listing_id.like(f"{PREFIX}%")).delete(synchronize_session=False)
+        session.commit()
+
+def orm_dict_rows() -> list:
+    """The previous get_skipped_listings: ORM objects, returned as their __dict__."""
+    with database.get_session() as session:
+        rows = session.query(database.Listing).filter(
+            database.Listing.is_listed == True,
+            database.Listing.cartel_category == 'SKIP'
+        ).all()
+        return [row.__dict__ for row in rows]
+
+def core_records() -> list:
+    return database.get_skipped_listings(None)
+
+def core_narrow_records() -> list:
+    return database.get_skipped_listings(None, NARROW_FIELDS)
+
+def core_streamed() -> int:
+    """iter_skipped_listings, dropping each chunk once it's been looked at. Returns the row count."""
+    return sum(len(chunk) for chunk in database.iter_skipped_listings(None))
+
+def _best_seconds(read, rounds: int) -> tuple[float, int]:
+    best, count = float('inf'), 0
+    for _ in range(rounds):
+        gc.collect()
+        started_at = time.perf_counter()
+        rows = read()
+        best = min(best, time.perf_counter() - started_at)
+        count = rows if isinstance(rows, int) else len(rows)
+        del rows
+    return best, count
+
+def _memory(read) -> tuple[int, int]:
+    gc.collect()
+    tracemalloc.start()
+    rows = read()
+    gc.collect()
+    retained, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del rows
+    return peak, retained
+
+def bench(rounds: int):
+    for name, read in (("ORM row.__dict__", orm_dict_rows), ("Core records", core_records),
+                       ("Core records, 5 cols", core_narrow_records), ("Core streamed", core_streamed)):
+        read() # Warm up the pool and compiled statement cache
+        seconds, count = _best_seconds(read, rounds)
+        peak, retained = _memory(read)
+        logger.info(f"{name:>21}: {count} rows in {seconds * 1000:.0f}ms best, "
+                    f"peak {peak / 2**20:.1f} MiB, retained {retained / 2**20:.1f} MiB ({retained / max(count, 1):.0f} B/row)")
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark ORM vs Core projection reads.")
+    parser.add_argument("--rows", type=int, default=100000, help="Listings to seed.")
+    parser.add_argument("--rounds", type=int, default=3, help="Timed reads per path; the best is reported.")
+    args = parser.parse_args()
+
+    database.init_db()
+    _cleanup()
+    logger.info(f"Seeding {args.rows} SKIP listings...")
+    _seed(args.rows)
+    try:
+        bench(args.rounds)
+    finally:
+        _cleanup()
+
+if __name__ == "__main__":
+    main()
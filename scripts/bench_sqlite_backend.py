@@ -0,0 +1,91 @@
+"""
+Compares the legacy database/core.py (a new connection per call, rollback journal, a commit per
+row) against the SQLite backend of database/main.py (DATABASE_BACKEND=sqlite: a persistent WAL
+connection per thread with tuned pragmas) on the per-listing pipeline work: save, read back,
+record its valuation. Also runs the valuation writes through the write buffer, which batches them.
+Each path gets a fresh database file in a temporary directory.
+
+    python scripts/bench_sqlite_backend.py --listings 5000
+"""
+import os
+import sys
+import time
+import asyncio
+import argparse
+import logging
+import tempfile
+
+# Add the project root to the Python path to allow imports from 'src'
+PROJECT_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+sys.path.insert(0, PROJECT_ROOT)
+
+TEMP_DIR = tempfile.mkdtemp(prefix="bench-sqlite-")
+# Must be set before database.main is imported
+os.environ["DATABASE_BACKEND"] = "sqlite"
+os.environ["SQLITE_PATH"] = os.path.join(TEMP_DIR, "backend.db")
+
+from src.database import core
+from src.database import main as database
+from src.database import aio
+from src.database import write_buffer
+
+logger = logging.getLogger(__name__)
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s', stream=sys.stdout)
+logging.getLogger("src.database.main").setLevel(logging.WARNING)
+
+ALT_DATA = {'alt_value': 100.0, 'avg_price': 95.0, 'supply': 10, 'lower_bound': 90.0, 'upper_bound': 110.0, 'confidence': 80.0}
+
+def _listing(n: int) -> dict:
+    return {
+        'listing_id': f"bench-{n}", 'name': f"Bench Card #{n}", 'token_mint': f"bench-mint-{n}", 'grade_num': 10.0,
+        'grade': 'GEM MT 10', 'category': 'Pokemon', 'insured_value': 120.0, 'grading_company': 'PSA',
+        'img_url': f"https://example.com/{n}.png", 'grading_id': str(10_000_000 + n), 'price_amount': 1.5,
+        'price_currency': 'SOL', 'listed_at': '2025-06-01T12:00:00.000Z',
+    }
+
+def run_legacy(count: int) -> float:
+    core.DB_FILE = os.path.join(TEMP_DIR, "legacy.db")
+    core.init_db()
+    started_at = time.perf_counter()
+    for n in range(count):
+        core.save_listing([_listing(n)])
+        listing = core.get_listing_by_id(f"bench-{n}")
+        core.update_listing(listing['listing_id'], ALT_DATA, 'SKIP')
+    return time.perf_counter() - started_at
+
+def run_backend(count: int) -> float:
+    database.init_db()
+    started_at = time.perf_counter()
+    for n in range(count):
+        database.save_listing([_listing(n)])
+        listing = database.get_listing_by_id(f"bench-{n}")
+        database.update_listing(listing['listing_id'], ALT_DATA, 'SKIP')
+    return time.perf_counter() - started_at
+
+async def run_buffered(count: int) -> float:
+    started_at = time.perf_counter()
+    for n in range(count):
+        await aio.save_listing([_listing(count + n)])
+        listing = await aio.get_listing_by_id(f"bench-{count + n}")
+        await write_buffer.update_listing(listing['listing_id'], ALT_DATA, 'SKIP')
+    await write_buffer.flush()
+    elapsed = time.perf_counter() - started_at
+    await write_buffer.close()
+    await aio.dispose()
+    return elapsed
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the legacy SQLite module against the SQLite backend.")
+    parser.add_argument("--listings", type=int, default=5000, help="Listings to save, read and update per path.")
+    args = parser.parse_args()
+
+    logger.info(f"Databases in {TEMP_DIR}")
+    for name, elapsed in (
+        ("legacy core.py", run_legacy(args.listings)),
+        ("sqlite backend", run_backend(args.listings)),
+        ("sqlite backend + write buffer", asyncio.run(run_buffered(args.listings))),
+    ):
+        logger.info(f"{name:>29}: {args.listings} listings in {elapsed:.2f}s ({args.listings / elapsed:.0f} listings/s)")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,114 @@
+"""
+Compares per-call listing updates (database/aio.py, one transaction each) with the write-behind
+buffer (database/write_buffer.py) under a burst of concurrent writers, then checks that the
+buffered run left every row in the same final state.
+
+    python scripts/bench_write_buffer.py --listings 2000 --writes 20000 --writers 200
+"""
+import os
+import sys
+import time
+import random
+import argparse
+import asyncio
+import logging
+from datetime import datetime, timezone
+from dotenv import load_dotenv
+
+# Add the project root to the Python path to allow imports from 'src'
+PROJECT_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+sys.path.insert(0, PROJECT_ROOT)
+
+load_dotenv(dotenv_path=os.path.join(os.path.dirname(__file__), '..', '.env.local'))
+
+from src.database import main as database
+from src.database import aio
+from src.database import write_buffer
+
+logger = logging.getLogger(__name__)
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s', stream=sys.stdout)
+
+PREFIX = 'bench-wb-'
+
+def _seed(count: int):
+    database.save_listing([{
+        'listing_id': f"{PREFIX}{n}", 'name': f"Bench {n}", 'token_mint': f"{PREFIX}mint-{n}",
+        'listed_at': datetime.now(timezone.utc), 'cartel_category': 'NEW', 'is_listed': True,
+    } for n in range(count)])
+
+def _cleanup():
+    with database.get_session() as session:
+        session.query(database.Listing).filter(database.Listing.listing_id.like(f"{PREFIX}%")).delete(synchronize_session=False)
+        session.commit()
+
+def _workload(listings: int, writes: int, seed: int) -> list[tuple]:
+    """The same pipeline-shaped mix of writes for both runs: enrich, skip or delist a random listing."""
+    rng = random.Random(seed)
+    ops = []
+    for _ in range(writes):
+        n, roll = rng.randrange(listings), rng.random()
+        if roll < 0.6:
+            ops.append(('update_listing', f"{PREFIX}{n}", {'alt_value': rng.uniform(1, 500), 'confidence': 0.9}, rng.choice(['OK', 'GOOD', 'SKIP'])))
+        elif roll < 0.9:
+            ops.append(('skip_listing', f"{PREFIX}{n}", 'SKIP'))
+        else:
+            ops.append(('update_listing_status', f"{PREFIX}mint-{n}", rng.random() < 0.5))
+    return ops
+
+async def _run(target, ops: list[tuple], writers: int) -> float:
+    # Each listing belongs to one writer, which issues its writes in order, so both runs end in
+    # the same state per listing however the writers interleave.
+    chunks = [[] for _ in range(writers)]
+    for op in ops:
+        chunks[int(op[1].rsplit('-', 1)[1]) % writers].append(op)
+
+    async def writer(chunk):
+        for name, *args in chunk:
+            await getattr(target, name)(*args)
+            await asyncio.sleep(0) # Yield like the pipeline does between listings
+
+    started_at = time.perf_counter()
+    await asyncio.gather(*(writer(chunk) for chunk in chunks))
+    if target is write_buffer:
+        await write_buffer.flush()
+    return time.perf_counter() - started_at
+
+async def _snapshot() -> dict:
+    async with aio.engine.connect() as connection:
+        rows = await connection.exec_driver_sql(
+            f"SELECT listing_id, cartel_category, alt_value, is_listed FROM listings WHERE listing_id LIKE '{PREFIX}%'"
+        )
+        return {row[0]: tuple(row[1:]) for row in rows}
+
+async def bench(listings: int, writes: int, writers: int):
+    ops = _workload(listings, writes, seed=7)
+    direct = await _run(aio, ops, writers)
+    direct_state = await _snapshot()
+    buffered = await _run(write_buffer, ops, writers)
+    buffered_state = await _snapshot()
+
+    logger.info(f"per-call: {writes} writes in {direct:.2f}s = {writes / direct:,.0f} writes/s")
+    logger.info(f"buffered: {writes} writes in {buffered:.2f}s = {writes / buffered:,.0f} writes/s "
+                f"({direct / buffered:.1f}x), {write_buffer.buffer.flushes} flushes of "
+                f"{write_buffer.buffer.rows_flushed / max(1, write_buffer.buffer.flushes):.0f} rows on average")
+    logger.info("Final state matches." if direct_state == buffered_state else "Final state DIFFERS between runs!")
+    await write_buffer.close()
+    await aio.dispose()
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--listings", type=int, default=2000)
+    parser.add_argument("--writes", type=int, default=20000)
+    parser.add_argument("--writers", type=int, default=200)
+    args = parser.parse_args()
+
+    database.init_db()
+    _cleanup()
+    _seed(args.listings)
+    try:
+        asyncio.run(bench(args.listings, args.writes, args.writers))
+    finally:
+        _cleanup()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,123 @@
+"""
+Query-plan regression check: EXPLAINs the hot queries against the configured database and fails
+if any of them would scan a table sequentially or stops using the index it was built for.
+
+Sequential scans are disabled for the session, so the planner only falls back to one when no
+usable index exists. Which index wins still depends on the data, so run it against a copy of
+production (or a seed with a realistic category mix, where most listings are 'SKIP').
+
+    python scripts/check_query_plans.py
+"""
+import os
+import sys
+import json
+import logging
+from datetime import datetime, timezone
+from sqlalchemy import select, update, or_, and_
+from dotenv import load_dotenv
+
+# Add the project root to the Python path to allow imports from 'src'
+PROJECT_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+sys.path.insert(0, PROJECT_ROOT)
+
+load_dotenv(dotenv_path=os.path.join(os.path.dirname(__file__), '..', '.env.local'))
+
+from src.database import main as database
+from src.database.main import Listing, ReaperSchedule, Job, active_deals_page_query, stale_active_listings_page_query
+
+logger = logging.getLogger(__name__)
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s', stream=sys.stdout)
+
+NOW = datetime.now(timezone.utc)
+
+# (name, statement, indexes any of which the plan must use)
+HOT_QUERIES = [
+    ("get_listing_by_id",
+     select(Listing).where(Listing.listing_id == 'x'),
+     {"listings_pkey"}),
+    ("get_listing_by_mint",
+     select(Listing).where(Listing.token_mint == 'x').limit(1),
+     {"ix_listings_token_mint"}),
+    ("update_listing_status",
+     update(Listing).where(Listing.token_mint == 'x').values(is_listed=False),
+     {"ix_listings_token_mint"}),
+    ("get_active_deals_by_category",
+     select(Listing.name, Listing.listing_id).where(Listing.is_listed == True, Listing.cartel_category.in_(['AUTOBUY', 'GOOD', 'OK']))
+     .order_by(Listing.listed_at.desc()).limit(25),
+     {"ix_listings_active_category_listed_at"}),
+    ("get_active_deals_page",
+     active_deals_page_query(['AUTOBUY', 'GOOD', 'OK'], 25, after=(NOW, 'x')),
+     {"ix_listings_active_category_listed_at"}),
+    ("get_skipped_listings",
+     select(Listing).where(Listing.is_listed == True, Listing.cartel_category == 'SKIP', Listing.last_analyzed_at >= NOW),
+     {"ix_listings_active_category_listed_at", "ix_listings_active_last_analyzed_at"}),
+    ("get_stale_active_listings",
+     select(Listing.listing_id, Listing.token_mint).where(Listing.is_listed == True, Listing.last_analyzed_at < NOW)
+     .order_by(Listing.last_analyzed_at),
+     {"ix_listings_active_last_analyzed_at"}),
+    ("iter_stale_active_listings",
+     stale_active_listings_page_query(NOW, 1000, after=(NOW, 'x')),
+     {"ix_listings_active_last_analyzed_at"}),
+    ("claim_unprocessed_listings",
+     select(Listing).where(Listing.cartel_category == 'NEW', Listing.last_analyzed_at < NOW)
+     .order_by(Listing.last_analyzed_at).limit(20).with_for_update(skip_locked=True),
+     {"ix_listings_new_last_analyzed_at"}),
+    ("claim_unprocessed_listings (give up)",
+     update(Listing).where(Listing.cartel_category == 'NEW', Listing.last_analyzed_at < NOW, Listing.claim_attempts >= 5)
+     .values(cartel_category='SKIP').returning(Listing.listing_id),
+     {"ix_listings_new_last_analyzed_at"}),
+    ("archive_delisted_listings",
+     select(Listing.listing_id).where(Listing.is_listed == False, Listing.delisted_at < NOW)
+     .order_by(Listing.delisted_at).limit(1000).with_for_update(skip_locked=True),
+     {"ix_listings_delisted_at"}),
+    ("claim_due_verifications",
+     select(ReaperSchedule.token_mint).where(ReaperSchedule.next_check_at <= NOW)
+     .order_by(ReaperSchedule.next_check_at).limit(20).with_for_update(skip_locked=True),
+     {"ix_reaper_schedule_next_check_at"}),
+    ("claim_jobs",
+     select(Job.id).where(Job.kind.in_(['enrich']), or_(
+         and_(Job.status == 'PENDING', Job.run_at <= NOW),
+         and_(Job.status == 'RUNNING', Job.lease_expires_at < NOW)
+     )).order_by(Job.priority, Job.run_at).limit(10).with_for_update(skip_locked=True),
+     {"ix_jobs_claimable", "ix_jobs_running_lease"}),
+]
+
+def _walk(plan: dict):
+    yield plan
+    for child in plan.get("Plans", []):
+        yield from _walk(child)
+
+def explain(connection, statement) -> dict:
+    compiled = statement.compile(dialect=database.engine.dialect, compile_kwargs={"render_postcompile": True})
+    row = connection.exec_driver_sql(f"EXPLAIN (FORMAT JSON) {compiled}", compiled.params).scalar()
+    return (row if isinstance(row, list) else json.loads(row))[0]["Plan"]
+
+def main() -> int:
+    database.init_db()
+    failures = 0
+    with database.engine.connect() as connection:
+        connection.exec_driver_sql("SET enable_seqscan = off")
+        for name, statement, expected_indexes in HOT_QUERIES:
+            nodes = list(_walk(explain(connection, statement)))
+            seq_scans = sorted({node["Relation Name"] for node in nodes if node["Node Type"] == "Seq Scan"})
+            used_indexes = sorted({node["Index Name"] for node in nodes if "Index Name" in node})
+            problems = []
+            if seq_scans:
+                problems.append(f"sequential scan on {', '.join(seq_scans)}")
+            if not expected_indexes.intersection(used_indexes):
+                problems.append(f"expected one of {', '.join(sorted(expected_indexes))}")
+            if problems:
+                failures += 1
+                logger.error(f"FAIL {name}: {'; '.join(problems)} (uses: {', '.join(used_indexes) or 'no index'})")
+            else:
+                logger.info(f"ok   {name}: {', '.join(used_indexes)}")
+        connection.rollback()
+
+    if failures:
+        logger.error(f"{failures} of {len(HOT_QUERIES)} hot queries regressed.")
+        return 1
+    logger.info(f"All {len(HOT_QUERIES)} hot queries use their indexes.")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
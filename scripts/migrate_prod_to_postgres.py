@@ -1,17 +1,35 @@
+"""
+Migrates the listings of the legacy production SQLite database into Postgres.
 
-import sqlite3
-from datetime import datetime, timedelta
-import logging
+The SQLite table is read in chunks of rowids. Each chunk is loaded with COPY into a temporary
+staging table and upserted into listings in the same transaction that records the chunk in
+sqlite_migration_chunks, so an interrupted run resumes with the chunks that never committed.
+Chunks run in parallel. When a chunk fails it is split in halves until the rows Postgres
+rejects are isolated; those go to the rejects file instead of aborting the migration.
+Migrated listings are marked stale so the rechecker re-scores them.
+
+    python scripts/migrate_prod_to_postgres.py --workers 4 --chunk-size 20000
+"""
+import io
 import os
 import sys
-from sqlalchemy.orm import sessionmaker
+import json
+import time
+import sqlite3
+import logging
+import argparse
+import threading
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from datetime import datetime, timedelta, timezone
+from sqlalchemy import Boolean, Integer, Float
 from dotenv import load_dotenv
 
 # Add the project's root directory to the Python path to find the 'src' module
 sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
 load_dotenv(dotenv_path=os.path.join(os.path.dirname(__file__), '..', '.env.local'))
 
-from src.database.main import engine, Listing, Base
+from src.database import main as database
+from src.database.migrations import SQLITE_LISTED_AT_UTC_SQL
 
 # Configure logging
 logging.basicConfig(level=logging.INFO)
@@ -19,53 +37,225 @@ logger = logging.getLogger(__name__)
 
 # --- Configuration ---
 PROD_DB_FILE = os.path.join(os.path.dirname(__file__), '..', 'data', 'prod-listings.db')
+REJECTS_FILE = os.path.join(os.path.dirname(__file__), '..', 'data', 'prod-listings-rejects.jsonl')
+MIGRATE_CHUNK_SIZE = int(os.getenv("MIGRATE_CHUNK_SIZE", 20000))
+MIGRATE_WORKERS = int(os.getenv("MIGRATE_WORKERS", 4))
+# Migrated listings count as analyzed this long ago, so the rechecker picks them up
+STALE_AGE = timedelta(days=400)
+
+PROGRESS_TABLE_SQL = """
+CREATE TABLE IF NOT EXISTS sqlite_migration_chunks (
+    source text NOT NULL,
+    first_rowid bigint NOT NULL,
+    last_rowid bigint NOT NULL,
+    rows_loaded integer NOT NULL,
+    rows_rejected integer NOT NULL,
+    migrated_at timestamptz NOT NULL DEFAULT now(),
+    PRIMARY KEY (source, first_rowid)
+)
+"""
+STAGING_TABLE_SQL = "CREATE TEMP TABLE IF NOT EXISTS listings_staging (LIKE listings)"
+
+def _copy_text(value: str) -> str:
+    """Escapes a value for COPY's text format."""
+    return value.replace('\\', '\\\\').replace('\t', '\\t').replace('\n', '\\n').replace('\r', '\\r')
+
+def _formatter(column):
+    """Converts a SQLite value to COPY text for the Postgres column it's loaded into."""
+    if isinstance(column.type, Boolean):
+        return lambda value: 't' if value else 'f'
+    if isinstance(column.type, Integer):
+        return lambda value: str(int(value))
+    if isinstance(column.type, Float):
+        return lambda value: repr(float(value))
+    return lambda value: _copy_text(str(value))
+
+class Migration:
+    def __init__(self, source: str, chunk_size: int, on_conflict: str, rejects_file: str):
+        self.source = os.path.realpath(source)
+        self.chunk_size = chunk_size
+        self.rejects_file = rejects_file
+        self._rejects_lock = threading.Lock()
+        self.stale_at = datetime.now(timezone.utc) - STALE_AGE
+
+        with self._connect_source() as connection:
+            source_columns = {row[1] for row in connection.execute("PRAGMA table_info(listings)")}
+        # Computed for sources that predate the column: delisted listings start their archive clock now
+        derived = {'listed_at': f"({SQLITE_LISTED_AT_UTC_SQL}) || '+00'"}
+        if 'delisted_at' not in source_columns:
+            derived['delisted_at'] = "CASE WHEN is_listed THEN NULL ELSE strftime('%Y-%m-%d %H:%M:%f', 'now') || '+00' END"
+        # last_analyzed_at is always written, as the stale timestamp
+        self.columns = [column for column in database.Listing.__table__.columns
+                        if (column.key in source_columns or column.key in derived) and column.key != 'last_analyzed_at']
+        self.formatters = [_formatter(column) for column in self.columns]
+        column_list = ", ".join(column.key for column in self.columns)
+        selects = [derived.get(column.key, column.key) for column in self.columns]
+        self.select_sql = f"SELECT {', '.join(selects)} FROM listings WHERE rowid BETWEEN ? AND ?"
+        self.copy_sql = f"COPY listings_staging ({column_list}, last_analyzed_at) FROM STDIN"
+        if on_conflict == "update":
+            assignments = ", ".join(f"{column.key} = EXCLUDED.{column.key}" for column in self.columns if column.key != 'listing_id')
+            conflict = f"DO UPDATE SET {assignments}, last_analyzed_at = EXCLUDED.last_analyzed_at"
+        else:
+            conflict = "DO NOTHING"
+        self.upsert_sql = (
+            f"INSERT INTO listings ({column_list}, last_analyzed_at) "
+            f"SELECT {column_list}, last_analyzed_at FROM listings_staging ON CONFLICT (listing_id) {conflict}"
+        )
+
+    def _connect_source(self):
+        # Read-only, so a mistaken path can't create an empty database
+        return sqlite3.connect(f"file:{self.source}?mode=ro", uri=True)
 
-def fetch_prod_listings():
-    """Fetches all listings from the production SQLite database."""
-    logger.info(f"Connecting to production database: {PROD_DB_FILE}")
-    conn = sqlite3.connect(PROD_DB_FILE)
-    conn.row_factory = sqlite3.Row
-    cursor = conn.cursor()
-    cursor.execute("SELECT * FROM listings")
-    rows = cursor.fetchall()
-    conn.close()
-    logger.info(f"Fetched {len(rows)} listings from {PROD_DB_FILE}")
-    return [dict(row) for row in rows]
-
-def migrate_data():
+    def plan_chunks(self) -> tuple[list[tuple[int, int]], int]:
+        """Returns the (first_rowid, last_rowid) chunks not yet migrated, and how many rows were already."""
+        with self._connect_source() as connection:
+            low, high = connection.execute("SELECT min(rowid), max(rowid) FROM listings").fetchone()
+        with database.engine.begin() as connection:
+            done = connection.exec_driver_sql(
+                "SELECT first_rowid, last_rowid, rows_loaded + rows_rejected FROM sqlite_migration_chunks "
+                "WHERE source = %(source)s ORDER BY first_rowid", {"source": self.source}
+            ).all()
+        if low is None:
+            return [], 0
+
+        chunks, start = [], low
+        for first, last, _ in [*done, (high + 1, high + 1, 0)]:
+            while start < first and start <= high:
+                end = min(first - 1, start + self.chunk_size - 1, high)
+                chunks.append((start, end))
+                start = end + 1
+            start = max(start, last + 1)
+        return chunks, sum(row[2] for row in done)
+
+    def _format(self, rows: list[tuple]) -> tuple[list[tuple[tuple, str]], list[tuple[tuple, str]]]:
+        """Turns source rows into COPY lines, setting aside rows whose values can't be converted."""
+        stale_at = self.stale_at.isoformat()
+        lines, rejects = [], []
+        for row in rows:
+            try:
+                values = ['\\N' if value is None else format_value(value) for format_value, value in zip(self.formatters, row)]
+            except (TypeError, ValueError) as e:
+                rejects.append((row, f"unconvertible value: {e}"))
+                continue
+            lines.append((row, "\t".join(values) + f"\t{stale_at}\n"))
+        return lines, rejects
+
+    def _load(self, cursor, lines: list[tuple[tuple, str]], rejects: list[tuple[tuple, str]]):
+        """
+        COPYs lines into staging and upserts them, under a savepoint. If that fails, loads each
+        half of the lines the same way, down to the single rows that fail, which are rejected.
+        """
+        if not lines:
+            return
+        cursor.execute("SAVEPOINT migrate_rows")
+        try:
+            cursor.copy_expert(self.copy_sql, io.StringIO("".join(line for _, line in lines)))
+            cursor.execute(self.upsert_sql)
+            cursor.execute("DELETE FROM listings_staging")
+            cursor.execute("RELEASE SAVEPOINT migrate_rows")
+            return
+        except database.engine.dialect.dbapi.Error as e:
+            cursor.execute("ROLLBACK TO SAVEPOINT migrate_rows")
+            cursor.execute("RELEASE SAVEPOINT migrate_rows")
+            error = str(e).strip()
+        if len(lines) == 1:
+            rejects.append((lines[0][0], error))
+            return
+        middle = len(lines) // 2
+        self._load(cursor, lines[:middle], rejects)
+        self._load(cursor, lines[middle:], rejects)
+
+    def _write_rejects(self, rejects: list[tuple[tuple, str]]):
+        if not rejects:
+            return
+        with self._rejects_lock, open(self.rejects_file, "a") as file:
+            for row, error in rejects:
+                listing = dict(zip((column.key for column in self.columns), row))
+                file.write(json.dumps({"source": self.source, "listing": listing, "error": error}, default=str) + "\n")
+
+    def migrate_chunk(self, first: int, last: int) -> tuple[int, int]:
+        """Loads one chunk and records it, in one transaction. Returns (rows loaded, rows rejected)."""
+        with self._connect_source() as source:
+            rows = source.execute(self.select_sql, (first, last)).fetchall()
+        lines, rejects = self._format(rows)
+
+        connection = database.engine.raw_connection()
+        try:
+            cursor = connection.cursor()
+            cursor.execute(STAGING_TABLE_SQL)
+            self._load(cursor, lines, rejects)
+            loaded = len(rows) - len(rejects)
+            cursor.execute(
+                "INSERT INTO sqlite_migration_chunks (source, first_rowid, last_rowid, rows_loaded, rows_rejected) "
+                "VALUES (%s, %s, %s, %s, %s)", (self.source, first, last, loaded, len(rejects))
+            )
+            # Written before the commit: a chunk that rolls back after this is retried and its rejects logged again
+            self._write_rejects(rejects)
+            connection.commit()
+            return loaded, len(rejects)
+        except BaseException:
+            connection.rollback()
+            raise
+        finally:
+            connection.close()
+
+def migrate_data(source: str = PROD_DB_FILE, chunk_size: int = MIGRATE_CHUNK_SIZE, workers: int = MIGRATE_WORKERS,
+                 on_conflict: str = "update", restart: bool = False, rejects_file: str = REJECTS_FILE):
     """Migrates data from SQLite to PostgreSQL."""
-    # 1. Fetch data from production SQLite DB
-    prod_listings = fetch_prod_listings()
-
-    # 2. Prepare data for PostgreSQL
-    listings_to_insert = []
-    stale_date = datetime.utcnow() - timedelta(days=400)
-    
-    for listing in prod_listings:
-        # Mark as stale
-        listing['last_analyzed_at'] = stale_date
-        listings_to_insert.append(listing)
-
-    # 3. Connect to PostgreSQL and bulk insert
-    logger.info("Connecting to PostgreSQL...")
-    Base.metadata.create_all(engine)  # Ensure the table exists
-    Session = sessionmaker(bind=engine)
-    session = Session()
-
-    try:
-        logger.info(f"Starting bulk insert of {len(listings_to_insert)} listings...")
-        # SQLAlchemy's bulk_insert_mappings is efficient for large inserts
-        session.bulk_insert_mappings(Listing, listings_to_insert)  # type: ignore
-        session.commit()
-        logger.info("Bulk insert completed successfully.")
-    except Exception as e:
-        logger.error(f"An error occurred during bulk insert: {e}")
-        session.rollback()
-    finally:
-        session.close()
-        logger.info("PostgreSQL session closed.")
+    if database.engine.dialect.name != "postgresql":
+        raise SystemExit(f"The target must be Postgres; DATABASE_BACKEND points at {database.engine.dialect.name}.")
+    database.init_db()
+    with database.engine.begin() as connection:
+        connection.exec_driver_sql(PROGRESS_TABLE_SQL)
+
+    migration = Migration(source, chunk_size, on_conflict, rejects_file)
+    if restart:
+        with database.engine.begin() as connection:
+            connection.exec_driver_sql("DELETE FROM sqlite_migration_chunks WHERE source = %(source)s", {"source": migration.source})
+    chunks, already_migrated = migration.plan_chunks()
+    if already_migrated:
+        logger.info(f"Resuming: {already_migrated} rows of {migration.source} were migrated by an earlier run.")
+    logger.info(f"Migrating {len(chunks)} chunks of up to {chunk_size} rows with {workers} workers...")
+
+    started_at = time.perf_counter()
+    loaded_total = rejected_total = 0
+    with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="migrate") as executor:
+        futures = {executor.submit(migration.migrate_chunk, first, last): (first, last) for first, last in chunks}
+        for done, future in enumerate(as_completed(futures), start=1):
+            first, last = futures[future]
+            try:
+                loaded, rejected = future.result()
+            except Exception as e:
+                # Left unrecorded, so the next run picks the chunk up again
+                logger.error(f"Chunk {first}-{last} failed and will be retried on the next run: {e}")
+                continue
+            loaded_total += loaded
+            rejected_total += rejected
+            elapsed = time.perf_counter() - started_at
+            logger.info(f"[{done}/{len(chunks)}] rowids {first}-{last}: {loaded} rows, {rejected} rejected "
+                        f"({loaded_total} total, {(loaded_total + rejected_total) / elapsed:.0f} rows/s)")
+
+    elapsed = time.perf_counter() - started_at
+    logger.info(f"Migrated {loaded_total} rows in {elapsed:.1f}s ({(loaded_total + rejected_total) / max(elapsed, 1e-9):.0f} rows/s).")
+    if rejected_total:
+        logger.warning(f"{rejected_total} rows were rejected; see {rejects_file}.")
+    # Fresh statistics for the planner after a bulk load
+    with database.engine.connect().execution_options(isolation_level="AUTOCOMMIT") as connection:
+        connection.exec_driver_sql("ANALYZE listings")
+
+def main():
+    parser = argparse.ArgumentParser(description="Migrate listings from the production SQLite database to Postgres.")
+    parser.add_argument("--source", default=PROD_DB_FILE, help="The SQLite database to read.")
+    parser.add_argument("--chunk-size", type=int, default=MIGRATE_CHUNK_SIZE, help="Rowids per chunk (one COPY and transaction each).")
+    parser.add_argument("--workers", type=int, default=MIGRATE_WORKERS, help="Chunks loaded in parallel.")
+    parser.add_argument("--on-conflict", choices=("update", "skip"), default="update",
+                        help="What to do with listings already in Postgres: overwrite them or keep them.")
+    parser.add_argument("--restart", action="store_true", help="Forget the progress of earlier runs and migrate every chunk again.")
+    parser.add_argument("--rejects", default=REJECTS_FILE, help="JSON lines file that rejected rows are appended to.")
+    args = parser.parse_args()
+    migrate_data(args.source, args.chunk_size, args.workers, args.on_conflict, args.restart, args.rejects)
 
 if __name__ == "__main__":
     logger.info("Starting production data migration to PostgreSQL.")
-    migrate_data()
+    main()
     logger.info("Migration script finished.")
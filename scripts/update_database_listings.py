@@ -11,6 +11,7 @@ PROJECT_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
 sys.path.insert(0, PROJECT_ROOT)
 
 from src.database import main as database
+from src.database import aio
 from src.worker.app.core import magic_eden as me
 from src.worker.app.core import alt_data as alt
 from src.worker.app.core import utils
@@ -30,6 +31,9 @@ logging.basicConfig(
 # --- Discord Configuration ---
 BOT_TOKEN = os.getenv("DISCORD_BOT_TOKEN")
 
+# The only columns analyze_and_update_listing reads from an existing listing
+SYNC_FIELDS = ('listing_id', 'token_mint', 'name', 'grading_id', 'grade_num', 'grading_company', 'price_amount')
+
 
 async def analyze_and_update_listing(listing: dict, queue: asyncio.Queue):
     """
@@ -145,13 +149,15 @@ async def sync_with_magic_eden(queue: asyncio.Queue):
     me_listings_map = {listing['token_mint']: listing for listing in me_listings}
     logger.info(f"Fetched {len(me_listings_map)} unique listings from Magic Eden.")
 
-    # 2. Fetch all active listings from the database
-    db_listings = await asyncio.to_thread(database.get_all_active_listings)
-    db_listings_map = {listing['token_mint']: listing for listing in db_listings}
-    logger.info(f"Found {len(db_listings_map)} active listings in the database.")
+    # 2. Stream the active listings from the database, keeping only mint -> listing_id;
+    #    each existing listing is read again when its turn to be re-analyzed comes.
+    db_listing_ids = {}
+    async for listings in aio.prefetch(aio.iter_active_listings(('token_mint', 'listing_id'))):
+        db_listing_ids.update((listing['token_mint'], listing['listing_id']) for listing in listings)
+    logger.info(f"Found {len(db_listing_ids)} active listings in the database.")
 
     # 3. Identify delisted items
-    delisted_mints = set(db_listings_map.keys()) - set(me_listings_map.keys())
+    delisted_mints = db_listing_ids.keys() - me_listings_map.keys()
     logger.info(f"Found {len(delisted_mints)} listings to mark as delisted.")
     for mint in delisted_mints:
         await asyncio.to_thread(database.update_listing_status, mint, is_listed=False)
@@ -159,7 +165,9 @@ async def sync_with_magic_eden(queue: asyncio.Queue):
     # 4. Process new and existing listings
     for i, (mint, me_listing) in enumerate(me_listings_map.items()):
         logger.info(f"--- ({i+1}/{len(me_listings_map)}) Processing mint: {mint} ---")
-        db_listing = db_listings_map.get(mint)
+        db_listing = None
+        if mint in db_listing_ids:
+            db_listing = await asyncio.to_thread(database.get_listing_by_id, db_listing_ids[mint], SYNC_FIELDS)
 
         if not db_listing:
             # New listing
@@ -176,7 +184,7 @@ async def sync_with_magic_eden(queue: asyncio.Queue):
             # Existing listing, re-analyze
             logger.info(f"Existing listing found: {me_listing['name']}. Re-analyzing.")
             # We pass the existing DB listing, but we need to update the price from ME
-            db_listing['price_amount'] = me_listing['price_amount']
+            db_listing = {**db_listing, 'price_amount': me_listing['price_amount']}
             await analyze_and_update_listing(db_listing, queue)
 
     logger.info("--- Full database sync and re-check process complete! ---")
@@ -219,6 +227,7 @@ async def main():
     finally:
         if not bot.is_closed():
             await bot.close()
+        await aio.dispose()
         logger.info("Script finished.")
 
 
@@ -0,0 +1,189 @@
+"""
+Native async access to the same database as database.main, for code running on the event loop.
+
+Functions mirror database.main by name and return the same shapes, so
+`await asyncio.to_thread(database.save_listing, listings)` becomes `await aio.save_listing(listings)`
+without tying up a default thread-pool slot per call. Nothing is implemented twice: each of
+database.main's operations (see @operation there) runs here unchanged on an async engine (asyncpg
+for Postgres, aiosqlite for SQLite), and anything else in database.main is still reachable here
+and runs in a worker thread.
+"""
+import os
+import time
+import asyncio
+import functools
+from contextlib import closing
+from datetime import datetime
+from typing import AsyncIterator, Generator
+from sqlalchemy import event
+from sqlalchemy.ext.asyncio import create_async_engine
+
+from . import main as database
+from .main import (
+    LISTING_FIELDS, STALE_LISTING_FIELDS, DB_STREAM_CHUNK_SIZE,
+    listing_record_type, active_listings_query, skipped_listings_query, stale_listing_pages,
+)
+from .records import Record
+
+# --- Configuration ---
+# asyncpg prepares every statement once per connection and reuses it from this per-connection cache
+DB_PREPARED_STATEMENT_CACHE_SIZE = int(os.getenv("DB_PREPARED_STATEMENT_CACHE_SIZE", 256))
+
+def _async_url():
+    url = database.engine.url
+    if url.get_backend_name() == "sqlite":
+        return url.set(drivername="sqlite+aiosqlite")
+    return url.set(drivername="postgresql+asyncpg").update_query_dict(
+        {"prepared_statement_cache_size": str(DB_PREPARED_STATEMENT_CACHE_SIZE)}
+    )
+
+def _create_engine():
+    url = _async_url()
+    if url.get_backend_name() == "sqlite":
+        sqlite_engine = create_async_engine(url, connect_args={
+            "cached_statements": database.SQLITE_STATEMENT_CACHE_SIZE,
+            "timeout": database.SQLITE_BUSY_TIMEOUT_MS / 1000,
+        })
+        event.listen(sqlite_engine.sync_engine, "connect",
+                     lambda dbapi_connection, _: database.apply_sqlite_pragmas(dbapi_connection))
+        return sqlite_engine
+    return create_async_engine(
+        url,
+        pool_size=database.DB_POOL_SIZE,
+        max_overflow=database.DB_MAX_OVERFLOW,
+        pool_timeout=database.DB_POOL_TIMEOUT,
+    )
+
+engine = _create_engine()
+
+async def run(steps: Generator):
+    """database.main.run on the async engine: runs an operation's statements and returns its value."""
+    try:
+        step = next(steps)
+    except StopIteration as stop:
+        return stop.value
+    async with engine.connect() as connection:
+        with closing(steps):
+            while True:
+                if step is database.COMMIT:
+                    await connection.commit()
+                    result = None
+                else:
+                    statement, params = step if isinstance(step, tuple) else (step, None)
+                    result = await connection.execute(statement, params)
+                try:
+                    step = steps.send(result)
+                except StopIteration as stop:
+                    await connection.commit()
+                    return stop.value
+
+async def _stream_records(query, fields: tuple[str, ...], chunk_size: int) -> AsyncIterator[list[Record]]:
+    """Async counterpart of database.main._stream_records (a server-side cursor inside a transaction)."""
+    make = listing_record_type(fields)._make
+    async with engine.connect() as connection:
+        result = await connection.stream(query.execution_options(yield_per=chunk_size))
+        async for partition in result.partitions():
+            yield [make(row) for row in partition]
+
+async def _read_pages(pages: Generator, fields: tuple[str, ...]) -> AsyncIterator[list[Record]]:
+    """Async counterpart of database.main._read_pages."""
+    make = listing_record_type(fields)._make
+    try:
+        query = next(pages)
+        while True:
+            async with engine.connect() as connection:
+                chunk = [make(row) for row in await connection.execute(query)]
+            if chunk:
+                yield chunk
+            query = pages.send(chunk)
+    except StopIteration:
+        return
+
+async def prefetch(chunks: AsyncIterator[list], depth: int = 1) -> AsyncIterator[list]:
+    """
+    Re-yields the chunks of an iter_* stream while a background task already reads the next
+    `depth` chunks, so the caller's processing overlaps with the database round trips.
+    Closing it (wrap it in contextlib.aclosing to leave an `async for` early) stops the reader
+    and releases its cursor.
+    """
+    queue = asyncio.Queue(maxsize=depth)
+
+    async def read_ahead():
+        try:
+            async for chunk in chunks:
+                await queue.put((chunk, None))
+            await queue.put((None, None))
+        except Exception as e:
+            await queue.put((None, e))
+
+    reader = asyncio.create_task(read_ahead(), name="db:prefetch")
+    try:
+        while True:
+            chunk, error = await queue.get()
+            if error is not None:
+                raise error
+            if chunk is None:
+                return
+            yield chunk
+    finally:
+        reader.cancel()
+        await asyncio.gather(reader, return_exceptions=True)
+        await chunks.aclose()
+
+async def dispose():
+    """Closes pooled connections. Call before the event loop that opened them shuts down."""
+    await engine.dispose()
+
+def _observed(func):
+    """Async counterpart of database.main._observed, reporting to the same query_observer."""
+    @functools.wraps(func)
+    async def wrapper(*args, **kwargs):
+        started_at = time.perf_counter()
+        failed = True
+        try:
+            result = await func(*args, **kwargs)
+            failed = False
+            return result
+        finally:
+            if database.query_observer is not None:
+                database.query_observer(func.__name__, time.perf_counter() - started_at, failed)
+    return wrapper
+
+@functools.cache
+def _operation(name: str):
+    operation = database.operations[name]
+
+    @functools.wraps(operation)
+    async def run_operation(*args, **kwargs):
+        return await run(operation(*args, **kwargs))
+    return _observed(run_operation)
+
+def __getattr__(name: str):
+    """
+    database.main's operations, run on the async engine. Anything else falls back to running
+    database.main's synchronous function in a worker thread.
+    """
+    if name in database.operations:
+        return _operation(name)
+    sync_func = getattr(database, name)
+    if not callable(sync_func):
+        return sync_func
+
+    @functools.wraps(sync_func)
+    async def in_thread(*args, **kwargs):
+        return await asyncio.to_thread(sync_func, *args, **kwargs)
+    return in_thread
+
+# --- Readers ---
+def iter_active_listings(fields: tuple[str, ...] = LISTING_FIELDS, chunk_size: int = DB_STREAM_CHUNK_SIZE) -> AsyncIterator[list[Record]]:
+    """Streaming get_all_active_listings: yields chunks of up to chunk_size records."""
+    return _stream_records(active_listings_query(fields), fields, chunk_size)
+
+def iter_stale_active_listings(analyzed_before: datetime, chunk_size: int = DB_STREAM_CHUNK_SIZE) -> AsyncIterator[list[Record]]:
+    """Paged get_stale_active_listings, one short keyset query per chunk; see database.main.iter_stale_active_listings."""
+    return _read_pages(stale_listing_pages(analyzed_before, chunk_size), STALE_LISTING_FIELDS)
+
+def iter_skipped_listings(since: datetime | None, fields: tuple[str, ...] = LISTING_FIELDS,
+                          chunk_size: int = DB_STREAM_CHUNK_SIZE) -> AsyncIterator[list[Record]]:
+    """Streaming get_skipped_listings: yields chunks of up to chunk_size records."""
+    return _stream_records(skipped_listings_query(since, fields), fields, chunk_size)
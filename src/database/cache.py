@@ -0,0 +1,126 @@
+"""
+Read-through, in-process cache of full listing records, keyed by listing_id and token_mint.
+
+Entries are dropped as soon as this process commits a write to the listing (through
+database.main.listing_write_observers), or on Postgres as soon as the change feed
+(database.changes) reports another process's write. They are evicted least-recently-used
+beyond LISTING_CACHE_SIZE and expire after LISTING_CACHE_TTL_SECONDS, which bounds how long a
+change the feed doesn't cover (e.g. a valuation update) can go unseen. Records are immutable, so cached ones are shared between callers.
+"""
+import os
+import time
+import threading
+from collections import OrderedDict
+
+from . import aio
+from . import main as database
+
+# --- Configuration ---
+LISTING_CACHE_SIZE = int(os.getenv("LISTING_CACHE_SIZE", 10000))
+LISTING_CACHE_TTL_SECONDS = float(os.getenv("LISTING_CACHE_TTL_SECONDS", 300))
+
+class ListingCache:
+    def __init__(self, max_size: int = LISTING_CACHE_SIZE, ttl_seconds: float = LISTING_CACHE_TTL_SECONDS):
+        self.max_size = max_size
+        self.ttl_seconds = ttl_seconds
+        self._entries = OrderedDict()  # listing_id -> (expires_at, record), least recently used first
+        self._ids_by_mint = {}  # token_mint -> {listing_id} of cached entries
+        self._mint_lookups = {}  # token_mint -> listing_id that get_listing_by_mint returned
+        # Bumped by every invalidation; a read that raced one isn't cached
+        self._version = 0
+        # Invalidations also arrive from sync database functions running in worker threads
+        self._lock = threading.Lock()
+        # Counters for the worker's metrics
+        self.hits = 0
+        self.misses = 0
+
+    def __len__(self):
+        return len(self._entries)
+
+    def _lookup(self, listing_id: str):
+        entry = self._entries.get(listing_id)
+        if entry is None:
+            return None
+        if entry[0] < time.monotonic():
+            self._drop(listing_id)
+            return None
+        self._entries.move_to_end(listing_id)
+        return entry[1]
+
+    def _drop(self, listing_id: str):
+        _, record = self._entries.pop(listing_id)
+        mint = record.get('token_mint')
+        ids = self._ids_by_mint.get(mint)
+        if ids is not None:
+            ids.discard(listing_id)
+            if not ids:
+                del self._ids_by_mint[mint]
+        if self._mint_lookups.get(mint) == listing_id:
+            del self._mint_lookups[mint]
+
+    def _store(self, record, version: int, mint_lookup: str | None = None):
+        with self._lock:
+            if version != self._version:
+                return
+            listing_id = record['listing_id']
+            if listing_id in self._entries:
+                self._drop(listing_id)
+            self._entries[listing_id] = (time.monotonic() + self.ttl_seconds, record)
+            self._ids_by_mint.setdefault(record.get('token_mint'), set()).add(listing_id)
+            if mint_lookup is not None:
+                self._mint_lookups[mint_lookup] = listing_id
+            while len(self._entries) > self.max_size:
+                self._drop(next(iter(self._entries)))
+
+    def invalidate(self, listing_ids=(), mints=()):
+        with self._lock:
+            self._version += 1
+            for listing_id in listing_ids:
+                if listing_id in self._entries:
+                    self._drop(listing_id)
+            for mint in mints:
+                self._mint_lookups.pop(mint, None)
+                for listing_id in list(self._ids_by_mint.get(mint, ())):
+                    self._drop(listing_id)
+
+    def clear(self):
+        with self._lock:
+            self._version += 1
+            self._entries.clear()
+            self._ids_by_mint.clear()
+            self._mint_lookups.clear()
+
+    async def get_listing_by_id(self, listing_id: str):
+        with self._lock:
+            record = self._lookup(listing_id)
+            version = self._version
+        if record is not None:
+            self.hits += 1
+            return record
+        self.misses += 1
+        record = await aio.get_listing_by_id(listing_id)
+        if record is not None:
+            self._store(record, version)
+        return record
+
+    async def get_listing_by_mint(self, mint_address: str):
+        with self._lock:
+            listing_id = self._mint_lookups.get(mint_address)
+            record = self._lookup(listing_id) if listing_id is not None else None
+            version = self._version
+        if record is not None:
+            self.hits += 1
+            return record
+        self.misses += 1
+        record = await aio.get_listing_by_mint(mint_address)
+        if record is not None:
+            self._store(record, version, mint_lookup=mint_address)
+        return record
+
+listings = ListingCache()
+database.listing_write_observers.append(listings.invalidate)
+database.listing_resync_observers.append(listings.clear)
+
+get_listing_by_id = listings.get_listing_by_id
+get_listing_by_mint = listings.get_listing_by_mint
+invalidate = listings.invalidate
@@ -0,0 +1,179 @@
+"""
+Change feed of listing writes, so caches and in-memory views can invalidate exactly what
+changed instead of polling the table or waiting for entries to expire.
+
+On Postgres, a trigger on listings (migration 4) NOTIFYs database.main.LISTING_CHANGES_CHANNEL
+with a compact event for every committed insert, delete (archiving), delisting/relisting and
+category change, whichever process made it. The feed LISTENs on one dedicated connection and
+fans each event out to its subscribers. Events committed while that connection is down are
+lost, so after every (re)connect subscribers receive RESYNC and should start over.
+
+SQLite mode has no NOTIFY: the feed publishes this process's own committed writes
+(database.main.listing_write_observers) as "changed" events instead.
+
+    async for change in changes.subscribe():
+        if change is changes.RESYNC:
+            ...  # drop everything
+        else:
+            ...  # drop change.listing_id / change.token_mint
+"""
+import os
+import json
+import asyncio
+import logging
+from typing import AsyncIterator, NamedTuple
+
+import asyncpg
+
+from . import aio
+from . import main as database
+from .main import LISTING_CHANGES_CHANNEL
+
+logger = logging.getLogger(__name__)
+
+# --- Configuration ---
+# A subscriber this far behind is sent RESYNC in place of its backlog
+CHANGE_FEED_MAX_PENDING = int(os.getenv("CHANGE_FEED_MAX_PENDING", 10000))
+CHANGE_FEED_RETRY_SECONDS = float(os.getenv("CHANGE_FEED_RETRY_SECONDS", 1))
+CHANGE_FEED_MAX_RETRY_SECONDS = float(os.getenv("CHANGE_FEED_MAX_RETRY_SECONDS", 60))
+# An idle LISTEN connection is pinged this often, so a silently dropped one is noticed
+CHANGE_FEED_KEEPALIVE_SECONDS = float(os.getenv("CHANGE_FEED_KEEPALIVE_SECONDS", 30))
+
+class ListingChange(NamedTuple):
+    kind: str  # inserted, deleted, delisted, relisted, category_changed; "changed" in SQLite mode
+    listing_id: str | None = None
+    token_mint: str | None = None
+    cartel_category: str | None = None
+    is_listed: bool | None = None
+
+# Sent when changes may have been missed
+RESYNC = ListingChange("resync")
+
+def _listen_dsn() -> str:
+    """The async engine's database as a plain libpq DSN for a standalone asyncpg connection."""
+    url = aio.engine.url.set(drivername="postgresql", query={})
+    return url.render_as_string(hide_password=False)
+
+class ChangeFeed:
+    def __init__(self, max_pending: int = CHANGE_FEED_MAX_PENDING):
+        self.max_pending = max_pending
+        self.notifies = aio.engine.dialect.name == "postgresql"
+        self._subscribers = set()  # asyncio.Queue per subscriber
+        self._loop = None
+        self._task = None
+        # Counters for the worker's metrics
+        self.events = 0
+        self.resyncs = 0
+
+    def _publish(self, change: ListingChange):
+        if change is RESYNC:
+            self.resyncs += 1
+        else:
+            self.events += 1
+        for queue in self._subscribers:
+            if queue.qsize() >= self.max_pending:
+                # Too far behind to catch up event by event
+                while not queue.empty():
+                    queue.get_nowait()
+                queue.put_nowait(RESYNC)
+            else:
+                queue.put_nowait(change)
+
+    def _publish_all(self, changes: list[ListingChange]):
+        for change in changes:
+            self._publish(change)
+
+    def _notified(self, connection, pid, channel, payload):
+        try:
+            change = ListingChange(**json.loads(payload))
+        except (ValueError, TypeError) as e:
+            logger.error(f"Unreadable listing change event {payload!r}: {e}")
+            change = RESYNC
+        self._publish(change)
+
+    def _written(self, listing_ids, mints):
+        """SQLite mode: publishes this process's own writes. May be called from worker threads."""
+        loop = self._loop
+        if loop is None or not self._subscribers:
+            return
+        changes = [ListingChange("changed", listing_id=listing_id) for listing_id in listing_ids] + \
+                  [ListingChange("changed", token_mint=mint) for mint in mints]
+        try:
+            loop.call_soon_threadsafe(self._publish_all, changes)
+        except RuntimeError:
+            pass  # The loop has closed
+
+    async def _listen(self):
+        retry_seconds = CHANGE_FEED_RETRY_SECONDS
+        while True:
+            connection = None
+            try:
+                connection = await asyncpg.connect(_listen_dsn())
+                lost = asyncio.Event()
+                connection.add_termination_listener(lambda _: lost.set())
+                await connection.add_listener(LISTING_CHANGES_CHANNEL, self._notified)
+                logger.info(f"Listening for listing changes on '{LISTING_CHANGES_CHANNEL}'.")
+                retry_seconds = CHANGE_FEED_RETRY_SECONDS
+                # Subscribers may have read state that changed before this connection was listening
+                self._publish(RESYNC)
+                while not lost.is_set():
+                    try:
+                        await asyncio.wait_for(lost.wait(), CHANGE_FEED_KEEPALIVE_SECONDS)
+                    except asyncio.TimeoutError:
+                        await connection.execute("SELECT 1", timeout=CHANGE_FEED_KEEPALIVE_SECONDS)
+                logger.warning("Listing change feed connection closed, reconnecting.")
+            except Exception as e:
+                logger.warning(f"Listing change feed unavailable, retrying in {retry_seconds:g}s: {e}")
+                await asyncio.sleep(retry_seconds)
+                retry_seconds = min(retry_seconds * 2, CHANGE_FEED_MAX_RETRY_SECONDS)
+            finally:
+                if connection is not None and not connection.is_closed():
+                    connection.terminate()
+
+    def _start(self):
+        self._loop = asyncio.get_running_loop()
+        if self.notifies and (self._task is None or self._task.done()):
+            self._task = asyncio.create_task(self._listen(), name="db:change_feed")
+
+    async def subscribe(self) -> AsyncIterator[ListingChange]:
+        """Yields every listing change from now on, or RESYNC when some may have been missed."""
+        queue = asyncio.Queue()
+        self._subscribers.add(queue)
+        self._start()
+        try:
+            while True:
+                yield await queue.get()
+        finally:
+            self._subscribers.discard(queue)
+
+    async def sync_local_views(self):
+        """
+        Forwards the feed to database.main's listing write and resync observers (the listing
+        cache, the deal board) until cancelled, so they also see other processes' writes; this
+        process's own writes come back as a harmless second invalidation. In SQLite mode there
+        is nothing to forward: the observers already hear about this process's writes directly.
+        """
+        if not self.notifies:
+            return
+        async for change in self.subscribe():
+            if change is RESYNC:
+                database.listings_resynced()
+            else:
+                database.listings_written([change.listing_id] if change.listing_id else (),
+                                          [change.token_mint] if change.token_mint else ())
+
+    async def close(self):
+        """Stops listening. Call before the event loop that started the feed shuts down."""
+        if self._task:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+        self._loop = None
+
+feed = ChangeFeed()
+if not feed.notifies:
+    database.listing_write_observers.append(feed._written)
+
+subscribe = feed.subscribe
+sync_local_views = feed.sync_local_views
+close = feed.close
@@ -1,3 +1,7 @@
+"""
+Legacy SQLite module: a new connection per call and a commit per row. For a SQLite-backed
+deployment use database.main with DATABASE_BACKEND=sqlite instead.
+"""
 import sqlite3
 from datetime import datetime, timezone
 from pytz import timezone
@@ -0,0 +1,199 @@
+"""
+In-memory board of the active deals /cartel_deals lists, ranked newest first per category.
+
+The board is built from one query on first use and then maintained incrementally: listings
+this process writes (database.main.listing_write_observers) are marked dirty, and the next
+read re-reads just those by id or mint before answering, instead of scanning the category
+index. On Postgres, writes made by other processes arrive the same way through the change
+feed (database.changes); a full rebuild every DEAL_BOARD_REBUILD_SECONDS, or after the feed
+reconnects, catches anything it missed.
+"""
+import os
+import time
+import heapq
+import bisect
+import asyncio
+import itertools
+import threading
+from datetime import datetime
+from typing import NamedTuple
+
+from . import aio
+from . import main as database
+from .main import DEAL_FIELDS, listing_record_type
+
+# --- Configuration ---
+DEAL_BOARD_REBUILD_SECONDS = float(os.getenv("DEAL_BOARD_REBUILD_SECONDS", 300))
+# Past this many dirty listings one rebuild is cheaper than looking them all up
+DEAL_BOARD_MAX_DIRTY = int(os.getenv("DEAL_BOARD_MAX_DIRTY", 5000))
+
+# The categories /cartel_deals offers
+DEAL_CATEGORIES = ("AUTOBUY", "GOOD", "OK")
+BOARD_FIELDS = ("listing_id", "token_mint", "name", "listed_at", "cartel_category")
+
+class DealPage(NamedTuple):
+    deals: list
+    # Cursors to pass back as before=/after= for the neighbouring pages; None at either end
+    before: tuple | None
+    after: tuple | None
+
+def _rank(listing_id: str, listed_at: datetime | None) -> tuple:
+    """Sort key putting the newest listing first and undated ones last."""
+    return (-listed_at.timestamp() if listed_at else float("inf"), listing_id)
+
+class DealBoard:
+    def __init__(self, categories: tuple[str, ...] = DEAL_CATEGORIES, rebuild_seconds: float = DEAL_BOARD_REBUILD_SECONDS):
+        self.categories = frozenset(categories)
+        self.rebuild_seconds = rebuild_seconds
+        self._ranked = {category: [] for category in categories}  # category -> sorted [rank]
+        self._deals = {}  # listing_id -> (category, rank, token_mint, record)
+        self._ids_by_mint = {}  # token_mint -> {listing_id}
+        self._dirty_ids, self._dirty_mints = set(), set()
+        self._built_at = None
+        # Invalidations also arrive from sync database functions running in worker threads
+        self._lock = threading.Lock()
+        self._refresh_lock = asyncio.Lock()
+        self._make = listing_record_type(DEAL_FIELDS)._make
+        # Counters for the worker's metrics
+        self.rebuilds = 0
+        self.refreshes = 0
+
+    def __len__(self):
+        return len(self._deals)
+
+    def invalidate(self, listing_ids=(), mints=()):
+        with self._lock:
+            self._dirty_ids.update(listing_ids)
+            self._dirty_mints.update(mints)
+
+    def resync(self):
+        """Makes the next read rebuild the board."""
+        self._built_at = None
+
+    def _add(self, listing):
+        category, listing_id = listing['cartel_category'], listing['listing_id']
+        rank = _rank(listing_id, listing['listed_at'])
+        bisect.insort(self._ranked[category], rank)
+        self._deals[listing_id] = (category, rank, listing['token_mint'], self._make((listing['name'], listing_id)))
+        self._ids_by_mint.setdefault(listing['token_mint'], set()).add(listing_id)
+
+    def _remove(self, listing_id: str):
+        entry = self._deals.pop(listing_id, None)
+        if entry is None:
+            return
+        category, rank, mint, _ = entry
+        ranked = self._ranked[category]
+        del ranked[bisect.bisect_left(ranked, rank)]
+        ids = self._ids_by_mint[mint]
+        ids.discard(listing_id)
+        if not ids:
+            del self._ids_by_mint[mint]
+
+    async def _rebuild(self):
+        with self._lock:
+            # Anything written from here on is dirty again and re-read on the next call
+            self._dirty_ids, self._dirty_mints = set(), set()
+        listings = await aio.get_active_deals(list(self.categories), BOARD_FIELDS)
+        with self._lock:
+            self._ranked = {category: [] for category in self.categories}
+            self._deals, self._ids_by_mint = {}, {}
+            for listing in listings:
+                self._add(listing)
+        self._built_at = time.monotonic()
+        self.rebuilds += 1
+
+    async def _refresh_dirty(self):
+        with self._lock:
+            listing_ids, mints = self._dirty_ids, self._dirty_mints
+            self._dirty_ids, self._dirty_mints = set(), set()
+        try:
+            listings = await aio.get_active_deals(list(self.categories), BOARD_FIELDS, listing_ids, mints)
+        except BaseException:
+            with self._lock:
+                self._dirty_ids |= listing_ids
+                self._dirty_mints |= mints
+            raise
+        with self._lock:
+            for mint in mints:
+                listing_ids.update(self._ids_by_mint.get(mint, ()))
+            for listing_id in listing_ids:
+                self._remove(listing_id)
+            for listing in listings:
+                self._remove(listing['listing_id'])
+                self._add(listing)
+        self.refreshes += 1
+
+    async def refresh(self):
+        """Brings the board up to date: a full rebuild when it's due, otherwise a re-read of what's dirty."""
+        async with self._refresh_lock:
+            if self._built_at is None or time.monotonic() - self._built_at >= self.rebuild_seconds \
+                    or len(self._dirty_ids) + len(self._dirty_mints) > DEAL_BOARD_MAX_DIRTY:
+                await self._rebuild()
+            elif self._dirty_ids or self._dirty_mints:
+                await self._refresh_dirty()
+
+    async def get_active_deals_by_category(self, categories: list, limit: int = 25) -> list:
+        """Drop-in for aio.get_active_deals_by_category, answered from memory for the board's categories."""
+        if not categories:
+            return []
+        if not self.categories.issuperset(categories):
+            return await aio.get_active_deals_by_category(categories, limit)
+        await self.refresh()
+        with self._lock:
+            newest_first = heapq.merge(*(self._ranked[category] for category in set(categories)))
+            return [self._deals[listing_id][3] for _, listing_id in itertools.islice(newest_first, limit)]
+
+    async def get_active_deals_page(self, categories: list, limit: int = 25, after: tuple | None = None, before: tuple | None = None) -> DealPage:
+        """
+        One page of active deals, newest first: the first page, or the page after/before a cursor
+        of an earlier DealPage. Pages are found by bisecting each category's ranking, never by
+        skipping the deals in front of them. Other categories are paged by a keyset query.
+        """
+        if not categories:
+            return DealPage([], None, None)
+        if not self.categories.issuperset(categories):
+            return await _query_deals_page(categories, limit, after, before)
+        await self.refresh()
+        with self._lock:
+            ranked = [self._ranked[category] for category in set(categories)]
+            if before is None:
+                starts = [bisect.bisect_right(ranks, after) if after else 0 for ranks in ranked]
+                page = list(itertools.islice(heapq.merge(*(
+                    map(ranks.__getitem__, range(start, len(ranks))) for ranks, start in zip(ranked, starts)
+                )), limit + 1))
+                has_previous, has_next = any(starts), len(page) > limit
+                page = page[:limit]
+            else:
+                ends = [bisect.bisect_left(ranks, before) for ranks in ranked]
+                page = list(itertools.islice(heapq.merge(*(
+                    map(ranks.__getitem__, range(end - 1, -1, -1)) for ranks, end in zip(ranked, ends)
+                ), reverse=True), limit + 1))
+                has_previous, has_next = len(page) > limit, any(end < len(ranks) for ranks, end in zip(ranked, ends))
+                page = page[:limit][::-1]
+            return DealPage(
+                [self._deals[listing_id][3] for _, listing_id in page],
+                page[0] if page and has_previous else None,
+                page[-1] if page and has_next else None,
+            )
+
+async def _query_deals_page(categories: list, limit: int, after: tuple | None, before: tuple | None) -> DealPage:
+    rows = await aio.get_active_deals_page(categories, limit, after, before)
+    more = len(rows) > limit
+    rows = rows[:limit] if before is None else rows[:limit][::-1]
+    make = listing_record_type(DEAL_FIELDS)._make
+    cursors = [(row['listed_at'], row['listing_id']) for row in rows]
+    has_previous, has_next = (after is not None, more) if before is None else (more, True)
+    return DealPage(
+        [make((row['name'], row['listing_id'])) for row in rows],
+        cursors[0] if rows and has_previous else None,
+        cursors[-1] if rows and has_next else None,
+    )
+
+board = DealBoard()
+database.listing_write_observers.append(board.invalidate)
+database.listing_resync_observers.append(board.resync)
+
+get_active_deals_by_category = board.get_active_deals_by_category
+get_active_deals_page = board.get_active_deals_page
+invalidate = board.invalidate
+refresh = board.refresh
@@ -1,13 +1,31 @@
 import os
+import time
 import logging
-from datetime import datetime
-from sqlalchemy import create_engine, Column, String, Float, Integer, Boolean, DateTime, func
+import functools
+from datetime import datetime, timedelta, timezone
+from typing import Iterator, Generator
+from contextlib import closing
+from sqlalchemy import create_engine, event, select, update, delete, union_all, bindparam, Column, String, Float, Integer, BigInteger, Boolean, DateTime, JSON, Index, func, text, or_, and_
+from sqlalchemy.types import TypeDecorator
+from sqlalchemy.sql import Select, Update, Subquery
 from sqlalchemy.orm import sessionmaker, declarative_base
-from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.pool import SingletonThreadPool
+from sqlalchemy.dialects import postgresql, sqlite
+
+from .records import Record, record_type
 
 logger = logging.getLogger(__name__)
 
 # --- Configuration ---
+# 'postgres' (default) or 'sqlite' for single-node installs; job queue sharing and leader election need Postgres
+DATABASE_BACKEND = os.getenv("DATABASE_BACKEND", "postgres").lower()
+SQLITE_PATH = os.getenv("SQLITE_PATH", "data/listings.db")
+SQLITE_BUSY_TIMEOUT_MS = int(os.getenv("SQLITE_BUSY_TIMEOUT_MS", 5000))
+SQLITE_CACHE_SIZE_KB = int(os.getenv("SQLITE_CACHE_SIZE_KB", 65536))
+SQLITE_MMAP_SIZE = int(os.getenv("SQLITE_MMAP_SIZE", 256 * 2**20))
+# Prepared statements the sqlite3 module keeps per connection
+SQLITE_STATEMENT_CACHE_SIZE = int(os.getenv("SQLITE_STATEMENT_CACHE_SIZE", 256))
+
 # It is recommended to use environment variables for database credentials
 DB_USER = os.getenv("POSTGRES_USER", "user")
 DB_PASSWORD = os.getenv("POSTGRES_PASSWORD", "password")
@@ -15,16 +33,89 @@ DB_HOST = os.getenv("POSTGRES_HOST", "localhost")
 DB_PORT = os.getenv("POSTGRES_PORT", "5432")
 DB_NAME = os.getenv("POSTGRES_DB", "cards_cartel")
 
-DATABASE_URL = f"postgresql+psycopg2://{DB_USER}:{DB_PASSWORD}@{DB_HOST}:{DB_PORT}/{DB_NAME}"
+if DATABASE_BACKEND == "sqlite":
+    DATABASE_URL = f"sqlite:///{SQLITE_PATH}"
+else:
+    DATABASE_URL = f"postgresql+psycopg2://{DB_USER}:{DB_PASSWORD}@{DB_HOST}:{DB_PORT}/{DB_NAME}"
+# Per engine: the sync engine here and the async one in database/aio.py each get their own pool
+DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", 10))
+DB_MAX_OVERFLOW = int(os.getenv("DB_MAX_OVERFLOW", 10))
+DB_POOL_TIMEOUT = float(os.getenv("DB_POOL_TIMEOUT", 30))
+# Rows per chunk for the iter_* readers, which stream full-table reads through a server-side cursor,
+# or read them in keyset pages where the caller is slow to work through each chunk
+DB_STREAM_CHUNK_SIZE = int(os.getenv("DB_STREAM_CHUNK_SIZE", 1000))
+
+def apply_sqlite_pragmas(dbapi_connection):
+    """
+    Tunes a new SQLite connection: WAL so readers never block the writer, synchronous=NORMAL
+    (durable at each checkpoint rather than each commit), a busy timeout instead of instant
+    'database is locked' errors, and a larger page cache and memory map.
+    """
+    cursor = dbapi_connection.cursor()
+    cursor.execute("PRAGMA journal_mode=WAL")
+    cursor.execute("PRAGMA synchronous=NORMAL")
+    cursor.execute(f"PRAGMA busy_timeout={SQLITE_BUSY_TIMEOUT_MS}")
+    cursor.execute(f"PRAGMA cache_size=-{SQLITE_CACHE_SIZE_KB}")
+    cursor.execute(f"PRAGMA mmap_size={SQLITE_MMAP_SIZE}")
+    cursor.execute("PRAGMA temp_store=MEMORY")
+    cursor.close()
+
+def _create_engine():
+    if DATABASE_BACKEND != "sqlite":
+        return create_engine(DATABASE_URL, pool_size=DB_POOL_SIZE, max_overflow=DB_MAX_OVERFLOW, pool_timeout=DB_POOL_TIMEOUT)
+    if os.path.dirname(SQLITE_PATH):
+        os.makedirs(os.path.dirname(SQLITE_PATH), exist_ok=True)
+    # One persistent connection per thread, so each keeps its pragmas and statement cache
+    sqlite_engine = create_engine(
+        DATABASE_URL,
+        poolclass=SingletonThreadPool,
+        pool_size=DB_POOL_SIZE + DB_MAX_OVERFLOW,
+        connect_args={"cached_statements": SQLITE_STATEMENT_CACHE_SIZE, "timeout": SQLITE_BUSY_TIMEOUT_MS / 1000},
+    )
+    event.listen(sqlite_engine, "connect", lambda dbapi_connection, _: apply_sqlite_pragmas(dbapi_connection))
+    return sqlite_engine
 
-engine = create_engine(DATABASE_URL)
+engine = _create_engine()
+insert = sqlite.insert if engine.dialect.name == "sqlite" else postgresql.insert
+# Scalar LEAST(); SQLite's two-argument min() is the same thing
+least = func.min if engine.dialect.name == "sqlite" else func.least
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 Base = declarative_base()
 
 # --- SQLAlchemy Model ---
-class Listing(Base):
-    __tablename__ = "listings"
+class UTCDateTime(TypeDecorator):
+    """
+    A timestamptz column that also accepts the ISO-8601 strings (and epoch seconds or
+    milliseconds) that ME hands us, so callers can pass listing dicts through unchanged.
+    Values are stored in UTC and read back timezone-aware on both backends (SQLite keeps
+    them as naive UTC text).
+    """
+    impl = DateTime(timezone=True)
+    cache_ok = True
+
+    def process_bind_param(self, value, dialect):
+        if value is None or isinstance(value, datetime):
+            parsed = value
+        elif isinstance(value, (int, float)) or str(value).isdigit():
+            seconds = float(value)
+            parsed = datetime.fromtimestamp(seconds / 1000 if seconds > 1e11 else seconds, tz=timezone.utc)
+        else:
+            try:
+                parsed = datetime.fromisoformat(str(value).replace('Z', '+00:00'))
+            except ValueError:
+                logger.warning(f"Unparseable timestamp {value!r}; storing NULL.")
+                return None
+        if parsed is not None and parsed.tzinfo is None:
+            parsed = parsed.replace(tzinfo=timezone.utc)
+        return parsed.astimezone(timezone.utc) if parsed is not None else None
 
+    def process_result_value(self, value, dialect):
+        if value is not None and value.tzinfo is None:
+            return value.replace(tzinfo=timezone.utc)
+        return value
+
+class ListingColumns:
+    """The columns shared by live listings and the archive."""
     listing_id = Column(String, primary_key=True)
     name = Column(String)
     grade_num = Column(Float)
@@ -37,7 +128,7 @@ class Listing(Base):
     token_mint = Column(String)
     price_amount = Column(Float)
     price_currency = Column(String)
-    listed_at = Column(String) # Consider using DateTime for this
+    listed_at = Column(UTCDateTime)
     alt_value = Column(Float)
     avg_price = Column(Float)
     supply = Column(Integer)
@@ -47,7 +138,85 @@ class Listing(Base):
     alt_value_confidence = Column(Float)
     cartel_category = Column(String, nullable=False, default='NEW')
     is_listed = Column(Boolean, default=True)
-    last_analyzed_at = Column(DateTime(timezone=True), server_default=func.now())
+    last_analyzed_at = Column(UTCDateTime, server_default=func.now())
+    # When is_listed last went false; NULL while listed
+    delisted_at = Column(UTCDateTime)
+    # How many times the backlog drainer has claimed this row while it sat in 'NEW'
+    claim_attempts = Column(Integer, nullable=False, default=0, server_default=text('0'))
+    # When the rechecker last found it still listed on ME; NULL if it never has
+    last_verified_at = Column(UTCDateTime)
+
+class Listing(ListingColumns, Base):
+    __tablename__ = "listings"
+
+    # Existing databases get these from database/migrations.py, built CONCURRENTLY.
+    __table_args__ = (
+        # Reaper and rechecker look listings up and flag them delisted by mint.
+        Index('ix_listings_token_mint', 'token_mint'),
+        # /cartel_deals: active listings in a few categories, newest first.
+        Index('ix_listings_active_category_listed_at', 'cartel_category', 'listed_at', postgresql_where=text('is_listed'), sqlite_where=text('is_listed')),
+        # Partial index backing the rechecker's staleness query over active listings.
+        Index('ix_listings_active_last_analyzed_at', 'last_analyzed_at', postgresql_where=text('is_listed'), sqlite_where=text('is_listed')),
+        # Small partial index over rows still waiting for enrichment, used by the backlog drainer.
+        Index('ix_listings_new_last_analyzed_at', 'last_analyzed_at', postgresql_where=text("cartel_category = 'NEW'"), sqlite_where=text("cartel_category = 'NEW'")),
+        # The archiver's scan for listings delisted long enough ago.
+        Index('ix_listings_delisted_at', 'delisted_at', postgresql_where=text('NOT is_listed'), sqlite_where=text('NOT is_listed')),
+    )
+
+class ArchivedListing(ListingColumns, Base):
+    """
+    Cold storage for listings delisted long ago, moved here in batches by
+    archive_delisted_listings so the live table stays small. Historical reads go through
+    listing_history(), or the listings_history view outside this code.
+    """
+    __tablename__ = "listings_archive"
+
+    archived_at = Column(UTCDateTime, nullable=False, server_default=func.now())
+
+    __table_args__ = (
+        Index('ix_listings_archive_token_mint', 'token_mint'),
+        Index('ix_listings_archive_listed_at', 'listed_at'),
+    )
+
+class ReaperSchedule(Base):
+    """The reaper's durable work set: when each watched mint is next due and what we saw last time."""
+    __tablename__ = "reaper_schedule"
+
+    token_mint = Column(String, primary_key=True)
+    next_check_at = Column(UTCDateTime, nullable=False, index=True)
+    last_status = Column(String(16)) # 'LISTED', 'ERROR'
+    last_checked_at = Column(UTCDateTime)
+    failures = Column(Integer, nullable=False, default=0)
+
+class Job(Base):
+    """
+    A durable unit of work shared by every worker process. Jobs are claimed with
+    FOR UPDATE SKIP LOCKED under a lease, retried with backoff and dead-lettered
+    (status 'DEAD') after max_attempts. Finished jobs are deleted. A dead job gives up its
+    dedupe_key, so the same work can be queued again.
+    """
+    __tablename__ = "jobs"
+
+    # SQLite only assigns ids to an INTEGER PRIMARY KEY
+    id = Column(BigInteger().with_variant(Integer, "sqlite"), primary_key=True, autoincrement=True)
+    kind = Column(String(32), nullable=False) # 'enrich', 'verify'
+    payload = Column(JSON, nullable=False)
+    # At most one live job per key, e.g. 'enrich:<listing_id>'; NULL once dead-lettered
+    dedupe_key = Column(String, unique=True)
+    status = Column(String(16), nullable=False, default='PENDING') # 'PENDING', 'RUNNING', 'DEAD'
+    priority = Column(Integer, nullable=False, default=0) # Lower runs first
+    run_at = Column(UTCDateTime, nullable=False)
+    attempts = Column(Integer, nullable=False, default=0)
+    max_attempts = Column(Integer, nullable=False, default=5)
+    lease_expires_at = Column(UTCDateTime)
+    locked_by = Column(String)
+    last_error = Column(String)
+    created_at = Column(UTCDateTime, server_default=func.now())
+
+    __table_args__ = (
+        Index('ix_jobs_claimable', 'priority', 'run_at', postgresql_where=text("status = 'PENDING'"), sqlite_where=text("status = 'PENDING'")),
+        Index('ix_jobs_running_lease', 'lease_expires_at', postgresql_where=text("status = 'RUNNING'"), sqlite_where=text("status = 'RUNNING'")),
+    )
 
 class User(Base):
     __tablename__ = "users"
@@ -55,8 +224,8 @@ class User(Base):
     wallet_address = Column(String(44), primary_key=True)
     tier = Column(String(10), default='NORMAL') # 'GOLD', 'NORMAL', 'BLOCKED'
     status = Column(String(10), default='ACTIVE') # 'ACTIVE', 'SUSPENDED'
-    created_at = Column(DateTime(timezone=True), server_default=func.now())
-    last_login_at = Column(DateTime(timezone=True))
+    created_at = Column(UTCDateTime, server_default=func.now())
+    last_login_at = Column(UTCDateTime)
 
 class UserSettings(Base):
     __tablename__ = "user_settings"
@@ -66,185 +235,784 @@ class UserSettings(Base):
     priority_fee = Column(Float, default=0.005)
     slippage = Column(Float, default=1.0)
     auto_buy_enabled = Column(Boolean, default=False)
-    updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
+    updated_at = Column(UTCDateTime, server_default=func.now(), onupdate=func.now())
+
+# --- Projections ---
+# Reads select only the columns a caller asks for and return compact records (see records.py)
+# instead of ORM objects. Callers that need a few columns pass a narrower tuple as `fields`.
+LISTING_FIELDS = tuple(column.key for column in Listing.__table__.columns)
+USER_FIELDS = tuple(column.key for column in User.__table__.columns)
+USER_SETTINGS_FIELDS = tuple(column.key for column in UserSettings.__table__.columns)
+
+def listing_query(fields: tuple[str, ...] = LISTING_FIELDS) -> Select:
+    """A Core select of the given listings columns, returning them in `fields` order."""
+    return select(*(Listing.__table__.c[name] for name in fields))
+
+def listing_history(fields: tuple[str, ...] = LISTING_FIELDS) -> Subquery:
+    """Live and archived listings as one subquery (UNION ALL) with the given columns, for historical reads."""
+    archive = ArchivedListing.__table__
+    return union_all(listing_query(fields), select(*(archive.c[name] for name in fields))).subquery("listing_history")
+
+def listing_record_type(fields: tuple[str, ...] = LISTING_FIELDS) -> type[Record]:
+    """The record type returned for listings read with these columns."""
+    return record_type("ListingRecord", tuple(fields))
+
+def _records(result, fields: tuple[str, ...], name: str = "ListingRecord") -> list[Record]:
+    make = record_type(name, tuple(fields))._make
+    return [make(row) for row in result]
+
+def _first_record(result, fields: tuple[str, ...], name: str = "ListingRecord") -> Record | None:
+    row = result.first()
+    return record_type(name, tuple(fields))._make(row) if row else None
+
+def _stream_records(query, fields: tuple[str, ...], chunk_size: int) -> Iterator[list[Record]]:
+    """
+    Yields the query's rows as lists of up to chunk_size listing records, fetched through a
+    server-side cursor so only one chunk is held at a time. The connection stays checked out
+    until the generator is exhausted or closed.
+    """
+    make = listing_record_type(fields)._make
+    with engine.connect().execution_options(stream_results=True, yield_per=chunk_size) as connection:
+        for partition in connection.execute(query).partitions():
+            yield [make(row) for row in partition]
+
+def _read_pages(pages: Generator, fields: tuple[str, ...]) -> Iterator[list[Record]]:
+    """
+    Runs a keyset pager (see stale_listing_pages), each page on its own short-lived connection,
+    and yields the non-empty pages as lists of listing records.
+    """
+    try:
+        query = next(pages)
+        while True:
+            with engine.connect() as connection:
+                chunk = _records(connection.execute(query), fields)
+            if chunk:
+                yield chunk
+            query = pages.send(chunk)
+    except StopIteration:
+        return
+
+# --- Prepared statements ---
+# The per-listing hot path runs the same few statements over and over. They're built once per
+# shape and reused with bound values: building and cache-keying a fresh statement costs more
+# than the indexed SQLite read or write itself, and a reused statement also hits the driver's
+# prepared statement cache. Values are bound as b_<key> for the WHERE and v_<column> for SET.
+insert_new_listings = insert(Listing.__table__).on_conflict_do_nothing(index_elements=['listing_id'])
+
+@functools.cache
+def listing_lookup(fields: tuple[str, ...], key: str) -> Select:
+    """SELECT `fields` of the first listing whose `key` column equals :b_<key>."""
+    return listing_query(fields).where(Listing.__table__.c[key] == bindparam(f"b_{key}")).limit(1)
+
+@functools.cache
+def listing_update(columns: tuple[str, ...], key: str = "listing_id") -> Update:
+    """UPDATE `columns` (to :v_<column>) on the listings whose `key` column equals :b_<key>."""
+    table = Listing.__table__
+    return update(table).where(table.c[key] == bindparam(f"b_{key}")) \
+        .values({column: bindparam(f"v_{column}") for column in columns})
+
+def listing_update_params(key_value, values: dict, key: str = "listing_id") -> dict:
+    """The parameters for listing_update(tuple(values), key)."""
+    return {f"b_{key}": key_value, **{f"v_{column}": value for column, value in values.items()}}
+
+def listing_status_values(is_listed: bool) -> dict:
+    """SET values for an is_listed change: delisting stamps delisted_at (keeping an earlier stamp), relisting clears it."""
+    return {"is_listed": is_listed, "delisted_at": None if is_listed else func.coalesce(Listing.delisted_at, func.now())}
+
+@functools.cache
+def listing_status_update(is_listed: bool, key: str = "token_mint") -> Update:
+    """Sets is_listed (see listing_status_values) on the listings whose `key` column equals :b_<key>."""
+    table = Listing.__table__
+    return update(table).where(table.c[key] == bindparam(f"b_{key}")).values(listing_status_values(is_listed))
+
+# --- Instrumentation ---
+# Optional callable(query_name, seconds, failed) invoked after every database function.
+# The worker points it at its metrics registry; this module never imports the worker.
+query_observer = None
+
+# Callables(listing_ids, mints) run after a write to listings rows commits, so in-process
+# caches can drop what changed. Either collection may be empty.
+listing_write_observers = []
+
+# On Postgres a trigger on listings (migration 4) NOTIFYs this channel with a JSON event for
+# every committed insert, delete, delisting/relisting and category change; see database/changes.py.
+LISTING_CHANGES_CHANNEL = "listing_changes"
+
+def listings_written(listing_ids=(), mints=()):
+    """Tells every listing write observer which listings a committed write touched."""
+    for observer in listing_write_observers:
+        observer(listing_ids, mints)
+
+# Callables() run when changes may have been missed (e.g. the change feed reconnected), so
+# in-process caches start over instead of trusting what they hold.
+listing_resync_observers = []
+
+def listings_resynced():
+    """Tells every listing resync observer to drop everything it holds."""
+    for observer in listing_resync_observers:
+        observer()
+
+def _observed(func):
+    """Reports the duration of a database function to query_observer, if one is installed."""
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        started_at = time.perf_counter()
+        failed = True
+        try:
+            result = func(*args, **kwargs)
+            failed = False
+            return result
+        finally:
+            if query_observer is not None:
+                query_observer(func.__name__, time.perf_counter() - started_at, failed)
+    return wrapper
+
+# --- Operations ---
+# Each database function is written once, as an operation: a generator that yields the statements
+# it runs (a statement, or a (statement, params) pair) and is sent back each one's result. They
+# run in one transaction, committed when the operation returns, or earlier where it yields COMMIT
+# so that post-commit work (telling listing write observers, logging) only sees committed rows.
+# @operation builds the synchronous function from it; database.aio runs the same generator on
+# its async engine.
+COMMIT = object()
+
+# Operation generator functions by name, for database.aio
+operations = {}
+
+def run(steps: Generator):
+    """Runs an operation's statements on this module's engine and returns its value."""
+    try:
+        step = next(steps)
+    except StopIteration as stop:
+        return stop.value
+    with engine.connect() as connection, closing(steps):
+        while True:
+            if step is COMMIT:
+                connection.commit()
+                result = None
+            else:
+                statement, params = step if isinstance(step, tuple) else (step, None)
+                result = connection.execute(statement, params)
+            try:
+                step = steps.send(result)
+            except StopIteration as stop:
+                connection.commit()
+                return stop.value
+
+def operation(func):
+    """Registers an operation and returns the synchronous database function that runs it."""
+    operations[func.__name__] = func
 
+    @functools.wraps(func)
+    def run_operation(*args, **kwargs):
+        return run(func(*args, **kwargs))
+    return _observed(run_operation)
 # --- Database Functions ---
+def insert_groups(rows: list[dict]) -> Iterator[tuple[tuple[str, ...], list[dict]]]:
+    """
+    Groups rows by the columns they set, so each group can go out as one executemany of the
+    same INSERT. Unlike a multi-row INSERT ... VALUES, that statement compiles once and is
+    reused from the compiled cache, and the driver handles batching and bind parameter limits.
+    """
+    groups = {}
+    for row in rows:
+        groups.setdefault(tuple(row), []).append(row)
+    return iter(groups.items())
+
 def init_db():
     """
     Initializes the database and creates the 'listings' table.
     """
+    # Imported here because migrations builds on this module's engine and models.
+    from .migrations import run_migrations
     Base.metadata.create_all(bind=engine)
+    # create_all skips tables that already exist; migrations bring older schemas up to date.
+    run_migrations(engine)
 
 def get_session():
     """Returns a new session from the session factory."""
     return SessionLocal()
 
+@operation
 def save_listing(listings: list):
     """Saves new listings with a 'NEW' status."""
     if not listings:
         return
-    
-    with get_session() as session:
-        insert_stmt = insert(Listing).values(listings)
-        do_nothing_stmt = insert_stmt.on_conflict_do_nothing(index_elements=['listing_id'])
-        session.execute(do_nothing_stmt)
-        session.commit()
+    for _, rows in insert_groups(listings):
+        yield insert_new_listings, rows
+    yield COMMIT
+    listings_written([listing.get('listing_id') for listing in listings], [listing.get('token_mint') for listing in listings])
 
+def alt_data_columns(alt_data: dict) -> dict:
+    """Maps the ALT fields of a snipe_details dict onto their listings columns."""
+    return {
+        "alt_asset_id": alt_data.get('alt_asset_id'),
+        "alt_value": alt_data.get('alt_value'),
+        "avg_price": alt_data.get('avg_price'),
+        "supply": alt_data.get('supply'),
+        "alt_value_lower_bound": alt_data.get('lower_bound'),
+        "alt_value_upper_bound": alt_data.get('upper_bound'),
+        "alt_value_confidence": alt_data.get('confidence'),
+    }
+
+@operation
 def update_listing(listing_id: str, alt_data: dict, cartel_category: str):
     """
     Updates an existing listing with its enriched ALT data and final category,
     and updates the last_analyzed_at timestamp.
     """
-    with get_session() as session:
-        session.query(Listing).filter(Listing.listing_id == listing_id).update({
-            "alt_asset_id": alt_data.get('alt_asset_id'),
-            "alt_value": alt_data.get('alt_value'),
-            "avg_price": alt_data.get('avg_price'),
-            "supply": alt_data.get('supply'),
-            "alt_value_lower_bound": alt_data.get('lower_bound'),
-            "alt_value_upper_bound": alt_data.get('upper_bound'),
-            "alt_value_confidence": alt_data.get('confidence'),
-            "cartel_category": cartel_category,
-            "last_analyzed_at": func.now()
-        })
-        session.commit()
+    values = {**alt_data_columns(alt_data), "cartel_category": cartel_category, "last_analyzed_at": datetime.now(timezone.utc)}
+    yield listing_update(tuple(values)), listing_update_params(listing_id, values)
+    yield COMMIT
+    listings_written([listing_id])
 
+@operation
 def skip_listing(listing_id: str, cartel_category: str):
     """
     Updates an existing listing with its enriched ALT data and final category.
     """
-    with get_session() as session:
-        session.query(Listing).filter(Listing.listing_id == listing_id).update({
-            "cartel_category": cartel_category
-        })
-        session.commit()
+    yield listing_update(("cartel_category",)), {"b_listing_id": listing_id, "v_cartel_category": cartel_category}
+    yield COMMIT
+    listings_written([listing_id])
 
-def get_unprocessed_listings() -> list[dict]:
+@operation
+def apply_listing_updates(by_listing_id: dict[str, dict], is_listed_by_mint: dict[str, bool],
+                          verified_at_by_mint: dict[str, datetime]):
+    """
+    Applies many listing updates in one transaction: column values keyed by listing_id, and
+    is_listed flags and last_verified_at stamps keyed by token_mint. Rows updating the same set
+    of columns go out as one executemany, as do the stamps, and the flags as one UPDATE per value.
+    """
+    groups = {}
+    for listing_id, values in by_listing_id.items():
+        groups.setdefault(tuple(sorted(values)), []).append(listing_update_params(listing_id, values))
+    mints_by_flag = {}
+    for mint, is_listed in is_listed_by_mint.items():
+        mints_by_flag.setdefault(is_listed, []).append(mint)
+
+    for columns, rows in groups.items():
+        yield listing_update(columns), rows
+    for is_listed, mints in mints_by_flag.items():
+        yield update(Listing).where(Listing.token_mint.in_(mints)).values(listing_status_values(is_listed))
+    if verified_at_by_mint:
+        yield listing_update(("last_verified_at",), "token_mint"), [
+            listing_update_params(mint, {"last_verified_at": verified_at}, "token_mint")
+            for mint, verified_at in verified_at_by_mint.items()
+        ]
+    yield COMMIT
+    listings_written(by_listing_id.keys(), [*is_listed_by_mint, *verified_at_by_mint])
+
+@operation
+def get_unprocessed_listings(fields: tuple[str, ...] = LISTING_FIELDS) -> list[Record]:
     """Fetches all listings that have status 'NEW'."""
-    with get_session() as session:
-        rows = session.query(Listing).filter(Listing.cartel_category == 'NEW').all()
-        return [row.__dict__ for row in rows]
+    return _records((yield listing_query(fields).where(Listing.cartel_category == 'NEW')), fields)
+
+@operation
+def claim_unprocessed_listings(limit: int, saved_before: datetime, max_claims: int,
+                               fields: tuple[str, ...] = LISTING_FIELDS) -> list[Record]:
+    """
+    Claims up to `limit` listings stuck in 'NEW' that were saved before `saved_before`, oldest first.
+    For a 'NEW' row last_analyzed_at is still its insert time; claiming bumps it to now(), so a
+    claimed row isn't handed out again until the same grace period has passed. A row already
+    claimed max_claims times is given up on instead: it moves to 'SKIP', where /cartel_recheck
+    can still retry it.
+    """
+    make = listing_record_type(fields)._make
+    due = and_(Listing.cartel_category == 'NEW', Listing.last_analyzed_at < saved_before)
+    abandoned_ids = (yield update(Listing).where(due, Listing.claim_attempts >= max_claims)
+                     .values(cartel_category='SKIP').returning(Listing.listing_id)).scalars().all()
+    rows = (yield select(Listing.listing_id, *listing_query(fields).selected_columns).where(due)
+            .order_by(Listing.last_analyzed_at).limit(limit).with_for_update(skip_locked=True)).all()
+    if rows:
+        yield update(Listing).where(Listing.listing_id.in_([row[0] for row in rows])) \
+            .values(last_analyzed_at=func.now(), claim_attempts=Listing.claim_attempts + 1)
+    yield COMMIT
+    if abandoned_ids:
+        logger.warning(f"Gave up on {len(abandoned_ids)} 'NEW' listings after {max_claims} claims; moved them to 'SKIP'.")
+    listings_written([*abandoned_ids, *(row[0] for row in rows)])
+    return [make(row[1:]) for row in rows]
+
+@operation
+def get_unprocessed_backlog_stats() -> dict:
+    """Returns the number of listings still in 'NEW' and the listed_at of the oldest one."""
+    count, oldest_listed_at = (yield select(
+        func.count(Listing.listing_id), func.min(Listing.listed_at)
+    ).where(Listing.cartel_category == 'NEW')).one()
+    return {"count": count, "oldest_listed_at": oldest_listed_at}
 
+@operation
 def get_all_listing_ids() -> set:
     """Retrieves all listing_ids from the database."""
-    with get_session() as session:
-        rows = session.query(Listing.listing_id).all()
-        return {row[0] for row in rows}
+    return set((yield select(Listing.listing_id)).scalars())
 
+def initial_reaper_queue_query() -> Select:
+    return select(Listing.token_mint).where(Listing.is_listed == True, Listing.cartel_category != 'SKIP')
+
+@operation
 def get_initial_reaper_queue_items() -> list[str]:
     """Queries the DB for all active, relevant listings to populate the reaper queue."""
-    with get_session() as session:
-        rows = session.query(Listing.token_mint).filter(Listing.is_listed == True, Listing.cartel_category != 'SKIP').all()
-        logger.info(f"Found {len(rows)} items for the initial reaper queue.")
-        return [row[0] for row in rows]
+    mints = (yield initial_reaper_queue_query()).scalars().all()
+    logger.info(f"Found {len(mints)} items for the initial reaper queue.")
+    return mints
 
+@operation
+def seed_reaper_schedule() -> int:
+    """
+    Populates an empty reaper_schedule from the active, relevant listings. This is a one-off
+    migration from the old in-memory queue; once the table has rows it returns immediately.
+    """
+    if (yield select(ReaperSchedule.token_mint).limit(1)).first():
+        return 0
+    mints = [mint for mint in (yield initial_reaper_queue_query()).scalars() if mint]
+    if mints:
+        now = datetime.now(timezone.utc)
+        yield insert(ReaperSchedule).values([{"token_mint": mint, "next_check_at": now} for mint in mints]) \
+            .on_conflict_do_nothing(index_elements=['token_mint'])
+    logger.info(f"Seeded reaper_schedule with {len(mints)} mints.")
+    return len(mints)
+
+@operation
+def schedule_verification(mint_addresses: list[str], next_check_at: datetime | None = None):
+    """
+    Adds mints to the reaper's schedule, due at next_check_at (default: now).
+    A mint that is already scheduled keeps whichever due time is earlier.
+    """
+    mint_addresses = [mint for mint in mint_addresses if mint]
+    if not mint_addresses:
+        return
+    due_at = next_check_at or datetime.now(timezone.utc)
+    stmt = insert(ReaperSchedule).values([{"token_mint": mint, "next_check_at": due_at} for mint in mint_addresses])
+    yield stmt.on_conflict_do_update(
+        index_elements=['token_mint'],
+        set_={"next_check_at": least(ReaperSchedule.next_check_at, stmt.excluded.next_check_at)}
+    )
+
+@operation
+def claim_due_verifications(limit: int, lease_seconds: int) -> list[dict]:
+    """
+    Claims up to `limit` mints whose next_check_at has passed, most overdue first, using the
+    next_check_at index. Claimed rows are pushed `lease_seconds` into the future, so if this
+    process dies before recording a result the mint simply comes due again.
+    """
+    now = datetime.now(timezone.utc)
+    rows = yield select(ReaperSchedule.token_mint, ReaperSchedule.failures).where(
+        ReaperSchedule.next_check_at <= now
+    ).order_by(ReaperSchedule.next_check_at).limit(limit).with_for_update(skip_locked=True)
+    claimed = [{"token_mint": row[0], "failures": row[1]} for row in rows]
+    if claimed:
+        yield update(ReaperSchedule).where(
+            ReaperSchedule.token_mint.in_([item['token_mint'] for item in claimed])
+        ).values(next_check_at=now + timedelta(seconds=lease_seconds))
+    return claimed
+
+@operation
+def record_verification(mint_address: str, status: str, next_check_at: datetime, failed: bool = False):
+    """Stores the outcome of a reaper check and when the mint is next due."""
+    yield update(ReaperSchedule).where(ReaperSchedule.token_mint == mint_address).values(
+        last_status=status,
+        last_checked_at=datetime.now(timezone.utc),
+        next_check_at=next_check_at,
+        failures=ReaperSchedule.failures + 1 if failed else 0
+    )
+
+@operation
+def unschedule_verification(mint_address: str):
+    """Removes a mint from the reaper's schedule, e.g. once it has been delisted."""
+    yield delete(ReaperSchedule).where(ReaperSchedule.token_mint == mint_address)
+
+@operation
+def count_due_verifications() -> int:
+    """Number of scheduled mints whose next check is due."""
+    return (yield select(func.count(ReaperSchedule.token_mint)).where(
+        ReaperSchedule.next_check_at <= datetime.now(timezone.utc)
+    )).scalar()
+
+@operation
+def enqueue_jobs(jobs: list[dict]) -> int:
+    """
+    Inserts jobs given as dicts with 'kind', 'payload' and optionally 'priority', 'run_at',
+    'dedupe_key' and 'max_attempts'. Jobs whose dedupe_key is already queued are ignored.
+    Returns the number of jobs actually inserted.
+    """
+    if not jobs:
+        return 0
+    now = datetime.now(timezone.utc)
+    rows = [{
+        "kind": job['kind'],
+        "payload": job['payload'],
+        "dedupe_key": job.get('dedupe_key'),
+        "status": 'PENDING',
+        "priority": job.get('priority', 0),
+        "run_at": job.get('run_at') or now,
+        "attempts": 0,
+        "max_attempts": job.get('max_attempts', 5),
+    } for job in jobs]
+    return (yield insert(Job).values(rows).on_conflict_do_nothing(index_elements=['dedupe_key'])).rowcount
+
+@operation
+def claim_jobs(kinds: list[str], limit: int, lease_seconds: int, worker_id: str) -> list[dict]:
+    """
+    Claims up to `limit` runnable jobs of the given kinds, by priority then run_at, with
+    FOR UPDATE SKIP LOCKED so concurrent workers never receive the same job. A job whose
+    lease expired (its worker died) is claimable again, unless it has used up its attempts,
+    in which case it is dead-lettered here.
+    """
+    now = datetime.now(timezone.utc)
+    yield update(Job).where(
+        Job.status == 'RUNNING',
+        Job.lease_expires_at < now,
+        Job.attempts >= Job.max_attempts
+    ).values(status='DEAD', dedupe_key=None, last_error='lease expired', locked_by=None)
+
+    rows = yield select(Job.id, Job.kind, Job.payload, Job.attempts, Job.max_attempts).where(
+        Job.kind.in_(kinds),
+        or_(
+            and_(Job.status == 'PENDING', Job.run_at <= now),
+            and_(Job.status == 'RUNNING', Job.lease_expires_at < now)
+        )
+    ).order_by(Job.priority, Job.run_at).limit(limit).with_for_update(skip_locked=True)
+
+    claimed = [{
+        "id": row[0], "kind": row[1], "payload": row[2], "attempts": row[3] + 1, "max_attempts": row[4]
+    } for row in rows]
+    if claimed:
+        yield update(Job).where(Job.id.in_([job['id'] for job in claimed])).values(
+            status='RUNNING',
+            attempts=Job.attempts + 1,
+            lease_expires_at=now + timedelta(seconds=lease_seconds),
+            locked_by=worker_id
+        )
+    return claimed
+
+@operation
+def complete_job(job_id: int):
+    """Removes a successfully finished job."""
+    yield delete(Job).where(Job.id == job_id)
+
+@operation
+def fail_job(job_id: int, error: str, retry_delay_seconds: float):
+    """
+    Records a failed attempt. The job is retried after retry_delay_seconds, or moved to
+    status 'DEAD' if it has used up its attempts.
+    """
+    job = (yield select(Job.kind, Job.attempts, Job.max_attempts).where(Job.id == job_id).with_for_update()).first()
+    if not job:
+        return
+    values = {"last_error": error[:2000], "locked_by": None, "lease_expires_at": None}
+    if job.attempts >= job.max_attempts:
+        values.update(status='DEAD', dedupe_key=None)
+        logger.warning(f"Job {job_id} ({job.kind}) dead-lettered after {job.attempts} attempts: {error}")
+    else:
+        values.update(status='PENDING', run_at=datetime.now(timezone.utc) + timedelta(seconds=retry_delay_seconds))
+    yield update(Job).where(Job.id == job_id).values(values)
+
+@operation
+def requeue_dead_jobs(kind: str | None = None) -> int:
+    """
+    Moves dead-lettered jobs back to 'PENDING' with a fresh set of attempts. They no longer
+    hold a dedupe_key, so they may run alongside a job queued for the same work since.
+    """
+    stmt = update(Job).where(Job.status == 'DEAD')
+    if kind:
+        stmt = stmt.where(Job.kind == kind)
+    return (yield stmt.values(status='PENDING', attempts=0, run_at=datetime.now(timezone.utc), last_error=None)).rowcount
+
+@operation
+def get_job_counts() -> dict:
+    """Returns {(kind, status): count} over the whole jobs table."""
+    rows = yield select(Job.kind, Job.status, func.count(Job.id)).group_by(Job.kind, Job.status)
+    return {(row[0], row[1]): row[2] for row in rows}
+# --- Leader election ---
+# Session-level advisory locks belong to one connection, so the leader keeps a dedicated
+# connection open for as long as it leads. Closing it (or Postgres dropping it) releases the lock.
+
+def open_lock_connection(keepalive_seconds: int = 5):
+    """
+    Opens a connection for holding advisory locks. Server-side TCP keepalives are tightened
+    so a leader whose host disappears loses its lock within a few keepalive intervals.
+    """
+    connection = engine.connect().execution_options(isolation_level="AUTOCOMMIT")
+    keepalive_seconds = int(keepalive_seconds)
+    connection.execute(text(f"SET tcp_keepalives_idle = {keepalive_seconds}"))
+    connection.execute(text(f"SET tcp_keepalives_interval = {keepalive_seconds}"))
+    connection.execute(text("SET tcp_keepalives_count = 2"))
+    connection.execute(text(f"SET statement_timeout = {keepalive_seconds * 1000}"))
+    return connection
+
+def try_advisory_lock(connection, key: int) -> bool:
+    """Takes the session-level advisory lock `key` on the connection if nobody else holds it."""
+    return bool(connection.execute(text("SELECT pg_try_advisory_lock(:key)"), {"key": key}).scalar())
+
+def holds_advisory_lock(connection, key: int) -> bool:
+    """Confirms the connection is alive and its session still holds the advisory lock `key`."""
+    return bool(connection.execute(text(
+        "SELECT EXISTS (SELECT 1 FROM pg_locks WHERE locktype = 'advisory' AND granted "
+        "AND pid = pg_backend_pid() AND ((classid::bigint << 32) | objid::bigint) = :key)"
+    ), {"key": key}).scalar())
+
+def close_lock_connection(connection):
+    """Closes a lock connection for good (it never goes back to the pool), releasing its locks."""
+    try:
+        connection.invalidate()
+    finally:
+        connection.close()
+
+@operation
 def update_listing_status(mint_address: str, is_listed: bool):
     """Updates the is_listed flag for a given listing."""
-    with get_session() as session:
-        session.query(Listing).filter(Listing.token_mint == mint_address).update({"is_listed": is_listed})
-        session.commit()
-        logger.info(f"Set is_listed={is_listed} for mint {mint_address}")
+    yield listing_status_update(is_listed), {"b_token_mint": mint_address}
+    yield COMMIT
+    logger.info(f"Set is_listed={is_listed} for mint {mint_address}")
+    listings_written(mints=[mint_address])
+
+DEAL_FIELDS = ("name", "listing_id")
+
+def active_deals_query(categories: list, fields: tuple[str, ...] = DEAL_FIELDS) -> Select:
+    """Active listings in the given cartel_categories, newest first."""
+    return listing_query(fields).where(Listing.is_listed == True, Listing.cartel_category.in_(categories)) \
+        .order_by(Listing.listed_at.desc())
+
+# A keyset page also reads listed_at, for the (listed_at, listing_id) cursors
+DEAL_PAGE_FIELDS = DEAL_FIELDS + ("listed_at",)
+
+def _deals_after(listed_at: datetime | None, listing_id: str):
+    """Deals after (listed_at, listing_id) in the deal list's order: newest first, ties by listing_id, undated last."""
+    if listed_at is None:
+        return and_(Listing.listed_at.is_(None), Listing.listing_id > listing_id)
+    return or_(Listing.listed_at < listed_at, and_(Listing.listed_at == listed_at, Listing.listing_id > listing_id),
+               Listing.listed_at.is_(None))
 
-def get_active_deals_by_category(categories: list, limit: int = 25) -> list[dict]:
+def _deals_before(listed_at: datetime | None, listing_id: str):
+    if listed_at is None:
+        return or_(Listing.listed_at.is_not(None), Listing.listing_id < listing_id)
+    return or_(Listing.listed_at > listed_at, and_(Listing.listed_at == listed_at, Listing.listing_id < listing_id))
+
+def active_deals_page_query(categories: list, limit: int, after: tuple | None = None, before: tuple | None = None) -> Select:
+    """
+    A keyset page of active deals over ix_listings_active_category_listed_at: the first `limit`
+    after the (listed_at, listing_id) cursor `after`, or the last `limit` before `before`, read
+    backwards (the caller reverses them). One extra row tells whether another page follows.
+    """
+    query = listing_query(DEAL_PAGE_FIELDS).where(Listing.is_listed == True, Listing.cartel_category.in_(categories))
+    if before is not None:
+        return query.where(_deals_before(*before)) \
+            .order_by(Listing.listed_at.asc().nulls_first(), Listing.listing_id.desc()).limit(limit + 1)
+    if after is not None:
+        query = query.where(_deals_after(*after))
+    return query.order_by(Listing.listed_at.desc().nulls_last(), Listing.listing_id).limit(limit + 1)
+
+@operation
+def get_active_deals_by_category(categories: list, limit: int = 25) -> list[Record]:
     """
     Fetches active deals for a given list of cartel_categories.
     """
     if not categories:
         return []
-    with get_session() as session:
-        rows = session.query(Listing.name, Listing.listing_id).filter(
-            Listing.is_listed == True,
-            Listing.cartel_category.in_(categories)
-        ).order_by(Listing.listed_at.desc()).limit(limit).all()
-        return [{"name": row[0], "listing_id": row[1]} for row in rows]
+    return _records((yield active_deals_query(categories).limit(limit)), DEAL_FIELDS)
+
+@operation
+def get_active_deals_page(categories: list, limit: int, after: tuple | None = None, before: tuple | None = None) -> list[Record]:
+    """Runs active_deals_page_query: up to limit + 1 deals (DEAL_PAGE_FIELDS) in the query's order."""
+    return _records((yield active_deals_page_query(categories, limit, after, before)), DEAL_PAGE_FIELDS)
 
-def get_listing_by_id(listing_id: str) -> dict | None:
+@operation
+def get_active_deals(categories: list, fields: tuple[str, ...], listing_ids=None, mints=None) -> list[Record]:
     """
-    Fetches all details for a single listing by its ID.
+    Fetches every active deal in the given cartel_categories, or only those among the given
+    listing_ids or mints when either is passed.
     """
-    with get_session() as session:
-        row = session.query(Listing).filter(Listing.listing_id == listing_id).first()
-        return row.__dict__ if row else None
+    query = active_deals_query(categories, fields)
+    if listing_ids is not None or mints is not None:
+        query = query.where(or_(Listing.listing_id.in_(listing_ids or ()), Listing.token_mint.in_(mints or ())))
+    return _records((yield query), fields)
 
+@operation
+def get_listing_by_id(listing_id: str, fields: tuple[str, ...] = LISTING_FIELDS) -> Record | None:
+    """
+    Fetches all details (or just `fields`) for a single listing by its ID.
+    """
+    return _first_record((yield listing_lookup(tuple(fields), "listing_id"), {"b_listing_id": listing_id}), fields)
+
+@operation
 def update_listing_details(listing_id: str, payload: dict):
     """
     Updates an existing listing with a dictionary of new values.
     """
     if not payload:
         return
-    with get_session() as session:
-        session.query(Listing).filter(Listing.listing_id == listing_id).update(payload)
-        session.commit()
+    yield listing_update(tuple(payload)), listing_update_params(listing_id, payload)
+    yield COMMIT
+    listings_written([listing_id])
+
+def active_listings_query(fields: tuple[str, ...] = LISTING_FIELDS) -> Select:
+    return listing_query(fields).where(Listing.is_listed == True)
 
-def get_all_active_listings() -> list[dict]:
+@operation
+def get_all_active_listings(fields: tuple[str, ...] = LISTING_FIELDS) -> list[Record]:
     """Fetches all listings that are currently marked as listed."""
-    with get_session() as session:
-        rows = session.query(Listing).filter(Listing.is_listed == True).all()
-        return [row.__dict__ for row in rows]
+    return _records((yield active_listings_query(fields)), fields)
+
+def iter_active_listings(fields: tuple[str, ...] = LISTING_FIELDS, chunk_size: int = DB_STREAM_CHUNK_SIZE) -> Iterator[list[Record]]:
+    """Streaming get_all_active_listings: yields chunks of up to chunk_size records."""
+    return _stream_records(active_listings_query(fields), fields, chunk_size)
+
+STALE_LISTING_FIELDS = ("listing_id", "token_mint", "last_analyzed_at")
+
+def stale_active_listings_query(analyzed_before: datetime) -> Select:
+    return listing_query(STALE_LISTING_FIELDS).where(
+        Listing.is_listed == True,
+        Listing.last_analyzed_at < analyzed_before,
+        # Skips listings the rechecker has found still listed since
+        or_(Listing.last_verified_at == None, Listing.last_verified_at < analyzed_before)
+    ).order_by(Listing.last_analyzed_at, Listing.listing_id)
+
+def stale_active_listings_page_query(analyzed_before: datetime, limit: int, after: tuple | None = None) -> Select:
+    """
+    A keyset page of stale_active_listings_query: the first `limit` after the (last_analyzed_at,
+    listing_id) cursor `after`. The >= bound keeps it a range scan of ix_listings_active_last_analyzed_at.
+    """
+    query = stale_active_listings_query(analyzed_before)
+    if after is not None:
+        last_analyzed_at, listing_id = after
+        query = query.where(Listing.last_analyzed_at >= last_analyzed_at,
+                            or_(Listing.last_analyzed_at > last_analyzed_at, Listing.listing_id > listing_id))
+    return query.limit(limit)
+
+def stale_listing_pages(analyzed_before: datetime, chunk_size: int) -> Generator:
+    """
+    The keyset pager behind iter_stale_active_listings: yields each page's query and is sent
+    back that page's records, stopping after the first short page.
+    """
+    after = None
+    while True:
+        chunk = yield stale_active_listings_page_query(analyzed_before, chunk_size, after)
+        if len(chunk) < chunk_size:
+            return
+        after = chunk[-1]['last_analyzed_at'], chunk[-1]['listing_id']
 
-def get_listing_by_mint(mint_address: str) -> dict | None:
-    """Fetches all details for a single listing by its mint address."""
-    with get_session() as session:
-        row = session.query(Listing).filter(Listing.token_mint == mint_address).first()
-        return row.__dict__ if row else None
+@operation
+def get_stale_active_listings(analyzed_before: datetime) -> list[Record]:
+    """
+    Fetches the mint of every active listing last analyzed, and last verified if ever, before
+    the given timestamp, oldest first. The filter runs in SQL against ix_listings_active_last_analyzed_at.
+    """
+    return _records((yield stale_active_listings_query(analyzed_before)), STALE_LISTING_FIELDS)
+
+def iter_stale_active_listings(analyzed_before: datetime, chunk_size: int = DB_STREAM_CHUNK_SIZE) -> Iterator[list[Record]]:
+    """
+    Paged get_stale_active_listings: yields chunks of up to chunk_size records, oldest first.
+    Each chunk is its own short keyset query, so no transaction stays open while the caller
+    works through a chunk at the ME rate limit.
+    """
+    return _read_pages(stale_listing_pages(analyzed_before, chunk_size), STALE_LISTING_FIELDS)
+
+@operation
+def get_listing_by_mint(mint_address: str, fields: tuple[str, ...] = LISTING_FIELDS) -> Record | None:
+    """Fetches all details (or just `fields`) for a single listing by its mint address."""
+    return _first_record((yield listing_lookup(tuple(fields), "token_mint"), {"b_token_mint": mint_address}), fields)
+
+def archive_delisted_statements(listing_ids: list[str]) -> tuple:
+    """
+    The INSERT and DELETE that move these listings into listings_archive. A listing_id already
+    archived (relisted and delisted again since) is overwritten with the newer row.
+    """
+    archive = ArchivedListing.__table__
+    copy = insert(archive).from_select(LISTING_FIELDS, listing_query().where(Listing.listing_id.in_(listing_ids)))
+    copy = copy.on_conflict_do_update(
+        index_elements=['listing_id'],
+        set_={**{name: copy.excluded[name] for name in LISTING_FIELDS if name != 'listing_id'}, "archived_at": func.now()}
+    )
+    return copy, delete(Listing.__table__).where(Listing.listing_id.in_(listing_ids))
 
-def get_skipped_listings(since: datetime | None) -> list[dict]:
+def delisted_listings_query(delisted_before: datetime, limit: int) -> Select:
+    """The ids of up to `limit` listings delisted before the cutoff, oldest first, locked for archiving."""
+    return select(Listing.listing_id).where(Listing.is_listed == False, Listing.delisted_at < delisted_before) \
+        .order_by(Listing.delisted_at).limit(limit).with_for_update(skip_locked=True)
+
+@operation
+def archive_delisted_listings(delisted_before: datetime, batch_size: int) -> int:
+    """
+    Moves up to batch_size listings delisted before the cutoff into listings_archive, in one
+    transaction. Returns how many were moved; call again until it returns less than batch_size.
+    """
+    listing_ids = (yield delisted_listings_query(delisted_before, batch_size)).scalars().all()
+    if not listing_ids:
+        return 0
+    for statement in archive_delisted_statements(listing_ids):
+        yield statement
+    yield COMMIT
+    listings_written(listing_ids)
+    return len(listing_ids)
+
+@operation
+def get_listing_history_by_id(listing_id: str, fields: tuple[str, ...] = LISTING_FIELDS) -> Record | None:
+    """get_listing_by_id, falling back to the archive for listings that have been moved there."""
+    history = listing_history(fields)
+    return _first_record((yield select(history).where(history.c.listing_id == listing_id).limit(1)), fields)
+
+@operation
+def get_skipped_listings(since: datetime | None, fields: tuple[str, ...] = LISTING_FIELDS) -> list[Record]:
     """
     Fetches all active listings with 'SKIP' category, optionally filtered by a timestamp.
 
     Args:
         since (datetime | None): If provided, only returns listings analyzed after this timestamp.
                                  The timestamp should be timezone-aware (UTC).
+        fields (tuple[str, ...]): The columns to read; every column by default.
 
     Returns:
-        list[dict]: A list of listing dictionaries.
+        list[Record]: Read-only, dict-like listing records.
     """
-    with get_session() as session:
-        query = session.query(Listing).filter(
-            Listing.is_listed == True,
-            Listing.cartel_category == 'SKIP'
-        )
-        if since:
-            query = query.filter(Listing.last_analyzed_at >= since)
-        rows = query.all()
-        return [row.__dict__ for row in rows]
+    return _records((yield skipped_listings_query(since, fields)), fields)
+
+def skipped_listings_query(since: datetime | None, fields: tuple[str, ...] = LISTING_FIELDS) -> Select:
+    query = listing_query(fields).where(
+        Listing.is_listed == True,
+        Listing.cartel_category == 'SKIP'
+    )
+    if since:
+        query = query.where(Listing.last_analyzed_at >= since)
+    return query
 
-def create_user(wallet_address: str, tier: str = 'NORMAL') -> dict:
+def iter_skipped_listings(since: datetime | None, fields: tuple[str, ...] = LISTING_FIELDS,
+                          chunk_size: int = DB_STREAM_CHUNK_SIZE) -> Iterator[list[Record]]:
+    """Streaming get_skipped_listings: yields chunks of up to chunk_size records."""
+    return _stream_records(skipped_listings_query(since, fields), fields, chunk_size)
+
+@operation
+def create_user(wallet_address: str, tier: str = 'NORMAL') -> Record:
     """
     Creates a new user if they don't exist. Returns the user dict.
     """
-    with get_session() as session:
-        user = session.query(User).filter(User.wallet_address == wallet_address).first()
-        if not user:
-            user = User(wallet_address=wallet_address, tier=tier)
-            session.add(user)
-            # Create default settings for the user
-            settings = UserSettings(user_wallet=wallet_address)
-            session.add(settings)
-            session.commit()
-            logger.info(f"Created new user: {wallet_address} ({tier})")
-        return user.__dict__
+    if not (yield select(User.wallet_address).where(User.wallet_address == wallet_address)).first():
+        yield insert(User).values(wallet_address=wallet_address, tier=tier)
+        # Create default settings for the user
+        yield insert(UserSettings).values(user_wallet=wallet_address)
+        yield COMMIT
+        logger.info(f"Created new user: {wallet_address} ({tier})")
+    return _first_record((yield user_query(wallet_address)), USER_FIELDS, "UserRecord")
+
+def user_query(wallet_address: str) -> Select:
+    return select(User.__table__).where(User.wallet_address == wallet_address).limit(1)
 
-def get_user(wallet_address: str) -> dict | None:
+@operation
+def get_user(wallet_address: str) -> Record | None:
     """
     Fetches a user by wallet address.
     """
-    with get_session() as session:
-        user = session.query(User).filter(User.wallet_address == wallet_address).first()
-        return user.__dict__ if user else None
+    return _first_record((yield user_query(wallet_address)), USER_FIELDS, "UserRecord")
 
-def get_user_settings(wallet_address: str) -> dict | None:
+@operation
+def get_user_settings(wallet_address: str) -> Record | None:
     """
     Fetches settings for a specific user.
     """
-    with get_session() as session:
-        settings = session.query(UserSettings).filter(UserSettings.user_wallet == wallet_address).first()
-        return settings.__dict__ if settings else None
+    query = select(UserSettings.__table__).where(UserSettings.user_wallet == wallet_address).limit(1)
+    return _first_record((yield query), USER_SETTINGS_FIELDS, "UserSettingsRecord")
 
+@operation
 def update_user_settings(wallet_address: str, settings_update: dict):
     """
     Updates the settings for a user.
     """
-    with get_session() as session:
-        session.query(UserSettings).filter(UserSettings.user_wallet == wallet_address).update(settings_update)
-        session.commit()
+    yield update(UserSettings).where(UserSettings.user_wallet == wallet_address).values(settings_update)
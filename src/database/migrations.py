@@ -0,0 +1,343 @@
+"""
+Versioned schema migrations, applied in order by init_db() after create_all().
+
+create_all() builds a fresh database straight at the current schema, so every migration must
+also be a no-op against one. Applied versions are recorded in schema_migrations, and on
+Postgres a session advisory lock makes concurrently starting replicas apply them one at a
+time. Postgres migrations avoid long table locks: indexes are built CONCURRENTLY and column
+type changes go expand -> batched backfill -> swap. On SQLite (single node) each migration
+does the simpler equivalent, e.g. for a database created by the old database/core.py.
+"""
+import os
+import time
+import logging
+from sqlalchemy import inspect, text, select, union_all, null
+from sqlalchemy.schema import CreateIndex
+
+from .main import Base, Listing, ArchivedListing, Job, LISTING_CHANGES_CHANNEL
+
+logger = logging.getLogger(__name__)
+
+# --- Configuration ---
+MIGRATIONS_LOCK_KEY = int(os.getenv("MIGRATIONS_LOCK_KEY", 0x63617275))
+MIGRATION_BATCH_SIZE = int(os.getenv("MIGRATION_BATCH_SIZE", 5000))
+# The swap waits at most this long for the table lock instead of queueing every writer behind it
+MIGRATION_LOCK_TIMEOUT = os.getenv("MIGRATION_LOCK_TIMEOUT", "5s")
+
+MIGRATIONS = [] # (version, name, apply(engine)) in order
+
+def migration(version: int, name: str):
+    """Registers a migration. Versions must be added in increasing order and never reused."""
+    def register(apply):
+        assert not MIGRATIONS or version > MIGRATIONS[-1][0], "migration versions must increase"
+        MIGRATIONS.append((version, name, apply))
+        return apply
+    return register
+
+def _autocommit(engine):
+    return engine.connect().execution_options(isolation_level="AUTOCOMMIT")
+
+def _buildable_indexes(connection):
+    """The declared indexes, by table, whose columns all exist in the database."""
+    inspector = inspect(connection)
+    for table in Base.metadata.sorted_tables:
+        existing = {column["name"] for column in inspector.get_columns(table.name)}
+        for index in sorted(table.indexes, key=lambda index: index.name):
+            if all(column.name in existing for column in index.columns):
+                yield index
+
+def create_declared_indexes(engine):
+    """
+    Builds every index declared on the models that the database doesn't have yet, with
+    CREATE INDEX CONCURRENTLY so writes continue meanwhile. A build that failed part-way
+    leaves an INVALID index behind; it is dropped and rebuilt. On SQLite they're simply created.
+    Indexes over columns a later migration adds are left for that migration to build.
+    """
+    if engine.dialect.name == "sqlite":
+        with engine.begin() as connection:
+            for index in _buildable_indexes(connection):
+                index.create(connection, checkfirst=True)
+        return
+    with _autocommit(engine) as connection:
+        for index in _buildable_indexes(connection):
+            valid = connection.execute(text(
+                "SELECT i.indisvalid FROM pg_index i JOIN pg_class c ON c.oid = i.indexrelid "
+                "WHERE c.relname = :name AND pg_table_is_visible(c.oid)"
+            ), {"name": index.name}).scalar()
+            if valid:
+                continue
+            if valid is False:
+                logger.warning(f"Dropping invalid index {index.name} left by an interrupted build.")
+                connection.execute(text(f'DROP INDEX CONCURRENTLY IF EXISTS "{index.name}"'))
+            ddl = str(CreateIndex(index).compile(dialect=engine.dialect))
+            ddl = ddl.replace("CREATE INDEX", "CREATE INDEX CONCURRENTLY IF NOT EXISTS", 1)
+            ddl = ddl.replace("CREATE UNIQUE INDEX", "CREATE UNIQUE INDEX CONCURRENTLY IF NOT EXISTS", 1)
+            started_at = time.perf_counter()
+            connection.execute(text(ddl))
+            logger.info(f"Built index {index.name} in {time.perf_counter() - started_at:.1f}s.")
+
+# Parses the formats ME has used for listed_at; anything else becomes NULL rather than failing the migration.
+_PARSE_LISTED_AT_SQL = r"""
+CREATE OR REPLACE FUNCTION cartel_parse_listed_at(value text) RETURNS timestamptz
+LANGUAGE plpgsql IMMUTABLE AS $$
+BEGIN
+    IF value ~ '^\d{13}$' THEN
+        RETURN to_timestamp(value::bigint / 1000.0);
+    ELSIF value ~ '^\d{9,10}$' THEN
+        RETURN to_timestamp(value::bigint);
+    END IF;
+    RETURN value::timestamptz;
+EXCEPTION WHEN others THEN
+    RETURN NULL;
+END $$
+"""
+
+_SYNC_LISTED_AT_SQL = """
+CREATE OR REPLACE FUNCTION cartel_sync_listed_at() RETURNS trigger LANGUAGE plpgsql AS $$
+BEGIN
+    NEW.listed_at_ts := cartel_parse_listed_at(NEW.listed_at);
+    RETURN NEW;
+END $$
+"""
+
+# SQLite has no column types to change; legacy ISO/epoch text is rewritten to the UTC format
+# that sorts and compares correctly against CURRENT_TIMESTAMP. Unparseable values become NULL.
+# The expression is also used to read listed_at out of legacy databases (scripts/migrate_prod_to_postgres.py).
+SQLITE_LISTED_AT_UTC_SQL = """CASE
+    WHEN listed_at NOT GLOB '*[^0-9]*' AND length(listed_at) = 13 THEN strftime('%Y-%m-%d %H:%M:%f', listed_at / 1000.0, 'unixepoch')
+    WHEN listed_at NOT GLOB '*[^0-9]*' THEN strftime('%Y-%m-%d %H:%M:%f', listed_at, 'unixepoch')
+    ELSE strftime('%Y-%m-%d %H:%M:%f', listed_at)
+END"""
+
+_NORMALIZE_SQLITE_LISTED_AT_SQL = f"""
+UPDATE listings SET listed_at = {SQLITE_LISTED_AT_UTC_SQL}
+WHERE listed_at IS NOT NULL AND listed_at NOT GLOB '[0-9][0-9][0-9][0-9]-[0-9][0-9]-[0-9][0-9] [0-9][0-9]:*'
+"""
+
+@migration(1, "listings.listed_at text -> timestamptz")
+def listed_at_to_timestamptz(engine):
+    if engine.dialect.name == "sqlite":
+        with engine.begin() as connection:
+            connection.execute(text(_NORMALIZE_SQLITE_LISTED_AT_SQL))
+        return
+
+    with engine.connect() as connection:
+        data_type = connection.execute(text(
+            "SELECT data_type FROM information_schema.columns "
+            "WHERE table_schema = current_schema() AND table_name = 'listings' AND column_name = 'listed_at'"
+        )).scalar()
+    if data_type != 'text' and data_type != 'character varying':
+        return # Created by create_all at the current schema
+
+    # 1. Expand: a shadow column that a trigger keeps current for rows written from now on.
+    with engine.begin() as connection:
+        connection.execute(text(_PARSE_LISTED_AT_SQL))
+        connection.execute(text(_SYNC_LISTED_AT_SQL))
+        connection.execute(text("ALTER TABLE listings ADD COLUMN IF NOT EXISTS listed_at_ts timestamptz"))
+        connection.execute(text("DROP TRIGGER IF EXISTS cartel_sync_listed_at ON listings"))
+        connection.execute(text(
+            "CREATE TRIGGER cartel_sync_listed_at BEFORE INSERT OR UPDATE OF listed_at ON listings "
+            "FOR EACH ROW EXECUTE FUNCTION cartel_sync_listed_at()"
+        ))
+
+    # 2. Backfill existing rows in short keyset-paginated batches, one transaction each.
+    after, total = "", 0
+    while True:
+        with engine.begin() as connection:
+            ids = connection.execute(text(
+                "UPDATE listings l SET listed_at_ts = cartel_parse_listed_at(l.listed_at) "
+                "FROM (SELECT listing_id FROM listings WHERE listing_id > :after ORDER BY listing_id LIMIT :limit) batch "
+                "WHERE l.listing_id = batch.listing_id RETURNING l.listing_id"
+            ), {"after": after, "limit": MIGRATION_BATCH_SIZE}).scalars().all()
+        if not ids:
+            break
+        after = max(ids)
+        total += len(ids)
+        logger.info(f"Backfilled listed_at for {total} listings...")
+
+    # 3. Swap the columns in one short transaction.
+    with engine.begin() as connection:
+        connection.execute(text(f"SET LOCAL lock_timeout = '{MIGRATION_LOCK_TIMEOUT}'"))
+        connection.execute(text("LOCK TABLE listings IN ACCESS EXCLUSIVE MODE"))
+        unparsed = connection.execute(text(
+            "SELECT count(*) FROM listings WHERE listed_at IS NOT NULL AND listed_at_ts IS NULL"
+        )).scalar()
+        if unparsed:
+            logger.warning(f"{unparsed} listings had a listed_at that couldn't be parsed; it is now NULL.")
+        connection.execute(text("DROP TRIGGER cartel_sync_listed_at ON listings"))
+        connection.execute(text("ALTER TABLE listings DROP COLUMN listed_at"))
+        connection.execute(text("ALTER TABLE listings RENAME COLUMN listed_at_ts TO listed_at"))
+        connection.execute(text("DROP FUNCTION cartel_sync_listed_at()"))
+        connection.execute(text("DROP FUNCTION cartel_parse_listed_at(text)"))
+
+    # The planner has no statistics for the new column until the table is analyzed.
+    with _autocommit(engine) as connection:
+        connection.execute(text("ANALYZE listings"))
+
+@migration(2, "indexes for mint lookups, category filters and listed_at ordering")
+def listings_indexes(engine):
+    create_declared_indexes(engine)
+
+def create_history_view(engine):
+    """
+    (Re)creates the listings_history view: live and archived listings in one relation for
+    analytics and backtests run outside this code. The view selects the current model's
+    columns, so only the latest migration that changes the listings columns may call this
+    (earlier ones run before those columns exist); a new such migration takes the call over.
+    """
+    live, archive = Listing.__table__, ArchivedListing.__table__
+    view = union_all(
+        select(*live.columns, null().label("archived_at")),
+        select(*(archive.c[column.key] for column in live.columns), archive.c.archived_at),
+    )
+    with engine.begin() as connection:
+        connection.execute(text("DROP VIEW IF EXISTS listings_history"))
+        connection.execute(text(f"CREATE VIEW listings_history AS {view.compile(dialect=engine.dialect)}"))
+
+@migration(3, "listings.delisted_at, the listings_archive table and the listings_history view")
+def listings_archive(engine):
+    # listings_archive itself is new, so create_all() has already built it.
+    if engine.dialect.name == "sqlite":
+        with engine.begin() as connection:
+            columns = {row[1] for row in connection.execute(text("PRAGMA table_info(listings)"))}
+            if "delisted_at" not in columns:
+                connection.execute(text("ALTER TABLE listings ADD COLUMN delisted_at DATETIME"))
+            # When they were delisted is unknown; their archive clock starts now.
+            connection.execute(text("UPDATE listings SET delisted_at = CURRENT_TIMESTAMP WHERE NOT is_listed AND delisted_at IS NULL"))
+    else:
+        with engine.begin() as connection:
+            connection.execute(text("ALTER TABLE listings ADD COLUMN IF NOT EXISTS delisted_at timestamptz"))
+        # Backfill in short keyset-paginated batches, one transaction each.
+        after, total = "", 0
+        while True:
+            with engine.begin() as connection:
+                last_id, batch_size = connection.execute(text(
+                    "WITH batch AS (SELECT listing_id FROM listings WHERE listing_id > :after ORDER BY listing_id LIMIT :limit), "
+                    "stamped AS (UPDATE listings l SET delisted_at = now() FROM batch "
+                    "WHERE l.listing_id = batch.listing_id AND NOT l.is_listed AND l.delisted_at IS NULL) "
+                    "SELECT max(listing_id), count(*) FROM batch"
+                ), {"after": after, "limit": MIGRATION_BATCH_SIZE}).one()
+            if not batch_size:
+                break
+            after = last_id
+            total += batch_size
+            logger.info(f"Backfilled delisted_at over {total} listings...")
+    create_declared_indexes(engine)
+    # listings_history is built by the latest migration to change the listings columns, once every column it selects exists.
+
+# Publishes a compact JSON event on LISTING_CHANGES_CHANNEL (see database/changes.py) when
+# a listing is inserted, deleted (archived), delisted or relisted, or changes category. NOTIFY
+# is transactional: listeners hear about a change once it commits, and never about a rollback.
+_NOTIFY_LISTING_CHANGE_SQL = f"""
+CREATE OR REPLACE FUNCTION cartel_notify_listing_change() RETURNS trigger LANGUAGE plpgsql AS $$
+DECLARE
+    changed record;
+    kind text;
+BEGIN
+    IF TG_OP = 'INSERT' THEN
+        changed := NEW; kind := 'inserted';
+    ELSIF TG_OP = 'DELETE' THEN
+        changed := OLD; kind := 'deleted';
+    ELSIF NEW.is_listed IS DISTINCT FROM OLD.is_listed THEN
+        changed := NEW; kind := CASE WHEN NEW.is_listed THEN 'relisted' ELSE 'delisted' END;
+    ELSIF NEW.cartel_category IS DISTINCT FROM OLD.cartel_category THEN
+        changed := NEW; kind := 'category_changed';
+    ELSE
+        RETURN NULL;
+    END IF;
+    PERFORM pg_notify('{LISTING_CHANGES_CHANNEL}', json_build_object(
+        'kind', kind, 'listing_id', changed.listing_id, 'token_mint', changed.token_mint,
+        'cartel_category', changed.cartel_category, 'is_listed', changed.is_listed
+    )::text);
+    RETURN NULL;
+END $$
+"""
+
+@migration(4, "listing change notifications (LISTEN/NOTIFY)")
+def listing_change_notifications(engine):
+    if engine.dialect.name != "postgresql":
+        return # SQLite mode has no NOTIFY; database/changes.py falls back to this process's own writes
+    with engine.begin() as connection:
+        connection.execute(text(_NOTIFY_LISTING_CHANGE_SQL))
+        connection.execute(text("DROP TRIGGER IF EXISTS cartel_listing_changes ON listings"))
+        connection.execute(text(
+            "CREATE TRIGGER cartel_listing_changes AFTER INSERT OR DELETE OR UPDATE OF cartel_category, is_listed "
+            "ON listings FOR EACH ROW EXECUTE FUNCTION cartel_notify_listing_change()"
+        ))
+
+@migration(5, "release the dedupe keys of dead-lettered jobs")
+def release_dead_job_keys(engine):
+    # Dead jobs used to keep their dedupe_key, which stopped the same work from ever being queued again.
+    with engine.begin() as connection:
+        connection.execute(text("UPDATE jobs SET dedupe_key = NULL WHERE status = 'DEAD' AND dedupe_key IS NOT NULL"))
+
+@migration(6, "listings.claim_attempts, so the backlog drainer gives up on listings it can't enrich")
+def listings_claim_attempts(engine):
+    # A constant default makes this a catalog-only change on Postgres 11+, with no table rewrite.
+    with engine.begin() as connection:
+        for table in ("listings", "listings_archive"):
+            if engine.dialect.name == "sqlite":
+                columns = {row[1] for row in connection.execute(text(f"PRAGMA table_info({table})"))}
+                if "claim_attempts" not in columns:
+                    connection.execute(text(f"ALTER TABLE {table} ADD COLUMN claim_attempts INTEGER NOT NULL DEFAULT 0"))
+            else:
+                connection.execute(text(f"ALTER TABLE {table} ADD COLUMN IF NOT EXISTS claim_attempts integer NOT NULL DEFAULT 0"))
+
+@migration(7, "jobs.id as an INTEGER PRIMARY KEY on SQLite")
+def sqlite_job_ids(engine):
+    if engine.dialect.name != "sqlite":
+        return
+    with engine.begin() as connection:
+        id_type = next(row[2] for row in connection.execute(text("PRAGMA table_info(jobs)")) if row[1] == "id")
+        if id_type.upper() != "INTEGER":
+            # A BIGINT key never got an id, so no job was ever inserted; the table is rebuilt empty.
+            Job.__table__.drop(connection)
+            Job.__table__.create(connection)
+
+@migration(8, "listings.last_verified_at, so the rechecker skips listings it found still listed")
+def listings_last_verified_at(engine):
+    with engine.begin() as connection:
+        for table in ("listings", "listings_archive"):
+            if engine.dialect.name == "sqlite":
+                columns = {row[1] for row in connection.execute(text(f"PRAGMA table_info({table})"))}
+                if "last_verified_at" not in columns:
+                    connection.execute(text(f"ALTER TABLE {table} ADD COLUMN last_verified_at DATETIME"))
+            else:
+                connection.execute(text(f"ALTER TABLE {table} ADD COLUMN IF NOT EXISTS last_verified_at timestamptz"))
+    # The latest migration to change the listings columns, so it (re)builds listings_history
+    create_history_view(engine)
+
+def _apply_pending(engine, execute):
+    """Runs each unrecorded migration in order, recording it through execute(sql, params)."""
+    execute(
+        "CREATE TABLE IF NOT EXISTS schema_migrations ("
+        "version integer PRIMARY KEY, name text NOT NULL, applied_at timestamptz NOT NULL DEFAULT CURRENT_TIMESTAMP)"
+    )
+    applied = {row[0] for row in execute("SELECT version FROM schema_migrations")}
+    for version, name, apply in MIGRATIONS:
+        if version in applied:
+            continue
+        logger.info(f"Applying migration {version}: {name}")
+        started_at = time.perf_counter()
+        apply(engine)
+        execute("INSERT INTO schema_migrations (version, name) VALUES (:version, :name)", {"version": version, "name": name})
+        logger.info(f"Migration {version} applied in {time.perf_counter() - started_at:.1f}s.")
+
+def run_migrations(engine):
+    """Applies every migration not yet recorded in schema_migrations."""
+    if engine.dialect.name != "postgresql":
+        # Single node, so nothing to lock against. SQLite hands each thread one shared connection,
+        # so each bookkeeping statement gets its own short transaction instead of holding one open.
+        def execute(sql, params=None):
+            with engine.begin() as connection:
+                result = connection.execute(text(sql), params or {})
+                return result.all() if result.returns_rows else None
+        _apply_pending(engine, execute)
+        return
+
+    with _autocommit(engine) as connection:
+        connection.execute(text("SELECT pg_advisory_lock(:key)"), {"key": MIGRATIONS_LOCK_KEY})
+        try:
+            _apply_pending(engine, lambda sql, params=None: connection.execute(text(sql), params or {}))
+        finally:
+            connection.execute(text("SELECT pg_advisory_unlock(:key)"), {"key": MIGRATIONS_LOCK_KEY})
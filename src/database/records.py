@@ -0,0 +1,53 @@
+"""
+Compact read-only records for rows read through Core selects.
+
+A record type is built once per projection (the tuple of column names a query selects) and
+keeps its values in __slots__, so a row costs one small object instead of an ORM instance,
+its instance state and a per-row __dict__. Records are Mappings: existing dict-style
+callers (record['name'], record.get('alt_value'), 'x' in record, {**record}) keep working,
+and fields are also readable as attributes. Use {**record, ...} to derive a modified copy.
+"""
+import functools
+from collections.abc import Mapping
+
+class Record(Mapping):
+    __slots__ = ()
+    _fields = ()
+    _setters = ()
+
+    @classmethod
+    def _make(cls, values):
+        """Builds a record from a row (or any iterable) with values in _fields order."""
+        record = cls.__new__(cls)
+        for setter, value in zip(cls._setters, values):
+            setter(record, value)
+        return record
+
+    def __getitem__(self, key):
+        try:
+            return getattr(self, key)
+        except (AttributeError, TypeError):
+            raise KeyError(key) from None
+
+    def get(self, key, default=None):
+        return getattr(self, key, default) if key in self._fields else default
+
+    def __contains__(self, key):
+        return key in self._fields
+
+    def __iter__(self):
+        return iter(self._fields)
+
+    def __len__(self):
+        return len(self._fields)
+
+    def __repr__(self):
+        values = ", ".join(f"{name}={getattr(self, name)!r}" for name in self._fields)
+        return f"{type(self).__name__}({values})"
+
+@functools.cache
+def record_type(name: str, fields: tuple[str, ...]) -> type[Record]:
+    """Returns the Record subclass for a projection, creating it on first use."""
+    cls = type(name, (Record,), {"__slots__": fields, "_fields": fields})
+    cls._setters = tuple(getattr(cls, field).__set__ for field in fields)
+    return cls
@@ -0,0 +1,172 @@
+"""
+Write-behind buffer for the pipeline's per-listing updates.
+
+update_listing, skip_listing, update_listing_status and mark_verified return as soon as the
+change is buffered. Changes to the same listing_id (or token_mint) are merged, and the buffer is
+flushed in one transaction every WRITE_BUFFER_FLUSH_MS or once WRITE_BUFFER_MAX_ROWS rows
+are waiting. get_listing_by_id/get_listing_by_mint read through the listing cache and overlay
+unflushed changes so readers see their own writes; other queries see them after the next
+flush, or call flush() first.
+Call close() on shutdown to flush what's left.
+"""
+import os
+import asyncio
+import logging
+from datetime import datetime, timezone
+
+from . import aio
+from . import cache
+from . import main as database
+
+logger = logging.getLogger(__name__)
+
+# --- Configuration ---
+WRITE_BUFFER_FLUSH_MS = float(os.getenv("WRITE_BUFFER_FLUSH_MS", 20))
+WRITE_BUFFER_MAX_ROWS = int(os.getenv("WRITE_BUFFER_MAX_ROWS", 500))
+# Writers wait for a flush once this many rows are pending (e.g. while the database is down)
+WRITE_BUFFER_MAX_PENDING = int(os.getenv("WRITE_BUFFER_MAX_PENDING", 20000))
+WRITE_BUFFER_RETRY_SECONDS = float(os.getenv("WRITE_BUFFER_RETRY_SECONDS", 1))
+
+class WriteBuffer:
+    def __init__(self):
+        self._pending_listings = {}  # listing_id -> {column: value}
+        self._pending_statuses = {}  # token_mint -> is_listed
+        self._pending_verified = {}  # token_mint -> last_verified_at
+        self._flushing_listings = {}
+        self._flushing_statuses = {}
+        self._flushing_verified = {}
+        self._wakeup = asyncio.Event()
+        self._full = asyncio.Event()
+        self._flush_lock = asyncio.Lock()
+        self._task = None
+        # Counters for the worker's metrics
+        self.writes = 0
+        self.rows_flushed = 0
+        self.flushes = 0
+        self.flush_errors = 0
+
+    def pending(self) -> int:
+        return len(self._pending_listings) + len(self._pending_statuses) + len(self._pending_verified)
+
+    async def _add(self):
+        self.writes += 1
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._run(), name="db:write_buffer")
+        self._wakeup.set()
+        size = self.pending()
+        if size >= WRITE_BUFFER_MAX_ROWS:
+            self._full.set()
+        if size >= WRITE_BUFFER_MAX_PENDING:
+            await self.flush()
+
+    async def update_listing(self, listing_id: str, alt_data: dict, cartel_category: str):
+        self._pending_listings.setdefault(listing_id, {}).update({
+            **database.alt_data_columns(alt_data),
+            "cartel_category": cartel_category,
+            "last_analyzed_at": datetime.now(timezone.utc),
+        })
+        await self._add()
+
+    async def skip_listing(self, listing_id: str, cartel_category: str):
+        self._pending_listings.setdefault(listing_id, {})["cartel_category"] = cartel_category
+        await self._add()
+
+    async def update_listing_status(self, mint_address: str, is_listed: bool):
+        self._pending_statuses[mint_address] = is_listed
+        await self._add()
+
+    async def mark_verified(self, mint_address: str):
+        """Stamps last_verified_at on a mint just confirmed still listed, so the rechecker skips it until it's stale again."""
+        self._pending_verified[mint_address] = datetime.now(timezone.utc)
+        await self._add()
+
+    def overlay(self, listing: dict | None) -> dict | None:
+        """Applies unflushed changes (in-flight first, then pending) to a listing read from the database."""
+        if listing is None:
+            return None
+        listing_id, mint = listing.get('listing_id'), listing.get('token_mint')
+        for by_id, by_mint, verified in ((self._flushing_listings, self._flushing_statuses, self._flushing_verified),
+                                         (self._pending_listings, self._pending_statuses, self._pending_verified)):
+            if listing_id in by_id:
+                listing = {**listing, **by_id[listing_id]}
+            if mint in by_mint:
+                listing = {**listing, 'is_listed': by_mint[mint]}
+            if mint in verified:
+                listing = {**listing, 'last_verified_at': verified[mint]}
+        return listing
+
+    async def get_listing_by_id(self, listing_id: str) -> dict | None:
+        return self.overlay(await cache.get_listing_by_id(listing_id))
+
+    async def get_listing_by_mint(self, mint_address: str) -> dict | None:
+        return self.overlay(await cache.get_listing_by_mint(mint_address))
+
+    async def flush(self):
+        """Writes everything buffered so far in one transaction. On failure the changes are kept for the next try."""
+        async with self._flush_lock:
+            if not self.pending():
+                return
+            self._flushing_listings, self._pending_listings = self._pending_listings, {}
+            self._flushing_statuses, self._pending_statuses = self._pending_statuses, {}
+            self._flushing_verified, self._pending_verified = self._pending_verified, {}
+            self._wakeup.clear()
+            self._full.clear()
+            rows = len(self._flushing_listings) + len(self._flushing_statuses) + len(self._flushing_verified)
+            try:
+                await aio.apply_listing_updates(self._flushing_listings, self._flushing_statuses, self._flushing_verified)
+                self.flushes += 1
+                self.rows_flushed += rows
+            except BaseException:
+                # Also on cancellation, so close() can still write the batch
+                self.flush_errors += 1
+                # Put the batch back underneath anything written since, which is newer
+                for listing_id, values in self._flushing_listings.items():
+                    self._pending_listings[listing_id] = {**values, **self._pending_listings.get(listing_id, {})}
+                for mint, is_listed in self._flushing_statuses.items():
+                    self._pending_statuses.setdefault(mint, is_listed)
+                for mint, verified_at in self._flushing_verified.items():
+                    self._pending_verified.setdefault(mint, verified_at)
+                self._wakeup.set()
+                raise
+            finally:
+                self._flushing_listings, self._flushing_statuses, self._flushing_verified = {}, {}, {}
+
+    async def _run(self):
+        while True:
+            await self._wakeup.wait()
+            # Let a burst coalesce for up to the flush interval, unless a full batch is already waiting
+            try:
+                await asyncio.wait_for(self._full.wait(), WRITE_BUFFER_FLUSH_MS / 1000)
+            except asyncio.TimeoutError:
+                pass
+            try:
+                await self.flush()
+            except Exception as e:
+                logger.error(f"Write buffer flush of {self.pending()} rows failed, retrying: {e}")
+                await asyncio.sleep(WRITE_BUFFER_RETRY_SECONDS)
+
+    async def close(self, attempts: int = 5):
+        """Stops the background flusher and flushes what's left, retrying a few times."""
+        if self._task:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+        for attempt in range(1, attempts + 1):
+            try:
+                await self.flush()
+                return
+            except Exception as e:
+                logger.error(f"Final write buffer flush failed (attempt {attempt}/{attempts}): {e}")
+                await asyncio.sleep(WRITE_BUFFER_RETRY_SECONDS)
+        logger.critical(f"Dropping {self.pending()} buffered listing updates that could not be written.")
+
+buffer = WriteBuffer()
+
+update_listing = buffer.update_listing
+skip_listing = buffer.skip_listing
+update_listing_status = buffer.update_listing_status
+mark_verified = buffer.mark_verified
+get_listing_by_id = buffer.get_listing_by_id
+get_listing_by_mint = buffer.get_listing_by_mint
+flush = buffer.flush
+close = buffer.close
@@ -0,0 +1,63 @@
+"""
+The Discord bot as its own process (DISCORD_BOT_MODE=process). The worker starts it and sends
+it alerts and command replies over core/bot_ipc.py; slash commands that read the database run
+here against this process's own connections, listing cache and deal board.
+
+    python -m worker.app.bot_process
+"""
+import os
+from dotenv import load_dotenv
+import logging
+import logging.config
+import yaml
+
+# Same environment as the worker that started it
+if os.path.exists('.env.local'):
+    load_dotenv(dotenv_path='.env.local')
+else:
+    load_dotenv()
+
+import asyncio
+from database import aio as db
+from database import changes as change_feed
+from worker.app.core import utils
+from worker.app.core import bot_ipc
+from worker.app import discord_bot
+
+# --- Setup Logging ---
+script_dir = os.path.dirname(os.path.abspath(__file__))
+config_path = os.path.join(script_dir, '..', 'logging_config.yaml')
+with open(config_path, 'r') as f:
+    config = yaml.safe_load(f.read())
+    # Two processes rotating the same file would clobber each other's logs
+    config['handlers']['file']['filename'] = 'discord_bot.log'
+    logging.config.dictConfig(config)
+logger = logging.getLogger(__name__)
+
+async def main():
+    snipe_queue = utils.AlertQueue()
+    link = bot_ipc.WorkerLink(snipe_queue)
+    await link.connect()
+
+    # Other processes' listing writes (the worker's included) keep /cartel_deals' board current
+    change_feed_task = asyncio.create_task(change_feed.sync_local_views(), name="db:change_feed_sync")
+    bot_task = asyncio.create_task(discord_bot.start_discord_bot(snipe_queue, recheck_skipped_callback=link.recheck,
+                                                                 accept_interactions=link.accept_interactions), name="discord:gateway")
+    link_task = asyncio.create_task(link.run(), name="discord:worker_link")
+    try:
+        # Exits with the worker, which restarts this process if it exits on its own
+        done, _ = await asyncio.wait([bot_task, link_task], return_when=asyncio.FIRST_COMPLETED)
+        for task in done:
+            task.result()
+    finally:
+        for task in (bot_task, link_task, change_feed_task):
+            task.cancel()
+        await asyncio.gather(bot_task, link_task, change_feed_task, return_exceptions=True)
+        await change_feed.close()
+        await db.dispose()
+
+if __name__ == "__main__":
+    try:
+        asyncio.run(main())
+    except KeyboardInterrupt:
+        logger.info("Shutting down the Discord bot process.")
@@ -5,6 +5,9 @@ from datetime import datetime, timedelta
 from collections import defaultdict
 import logging
 
+from . import metrics
+from . import utils
+
 logger = logging.getLogger(__name__)
 
 GRAPHQL_URL = "https://alt-platform-server.production.internal.onlyalt.com/graphql/"
@@ -27,8 +30,27 @@ HEADERS = {
 # Create a single, reusable async client
 async_client = httpx.AsyncClient(headers=HEADERS, timeout=20)
 
+# At most 10 concurrent ALT lookups across the process. Freed slots go to the lowest priority value,
+# so live listings go ahead of the backlog drain and bulk inspects.
+ALT_API_SEMAPHORE_SIZE = 10
+ALT_API_SEMAPHORE = utils.PrioritySemaphore(ALT_API_SEMAPHORE_SIZE)
+
 CERT_ID_TO_ASSET_ID_CACHE = {}
 
+# --- Metrics ---
+ALT_REQUESTS = metrics.Counter("cartel_alt_requests_total", "ALT GraphQL requests by operation and outcome.", ["operation", "outcome"])
+ALT_REQUEST_SECONDS = metrics.Histogram("cartel_alt_request_seconds", "ALT GraphQL request latency.", ["operation"])
+ALT_CERT_CACHE = metrics.Counter("cartel_alt_cert_cache_total", "cert_id -> asset_id cache lookups.", ["result"])
+metrics.CallbackGauge("cartel_alt_cert_cache_size", "Entries in the cert_id -> asset_id cache.", lambda: len(CERT_ID_TO_ASSET_ID_CACHE))
+_CERT_OK = ALT_REQUESTS.labels(operation="cert", outcome="ok")
+_CERT_ERROR = ALT_REQUESTS.labels(operation="cert", outcome="error")
+_CERT_SECONDS = ALT_REQUEST_SECONDS.labels(operation="cert")
+_DETAILS_OK = ALT_REQUESTS.labels(operation="asset_details", outcome="ok")
+_DETAILS_ERROR = ALT_REQUESTS.labels(operation="asset_details", outcome="error")
+_DETAILS_SECONDS = ALT_REQUEST_SECONDS.labels(operation="asset_details")
+_CERT_CACHE_HIT = ALT_CERT_CACHE.labels(result="hit")
+_CERT_CACHE_MISS = ALT_CERT_CACHE.labels(result="miss")
+
 async def get_asset_id_async(cert_id: str, retries: int = 5, initial_delay: float = 1.0):
     """
     Looks up an asset's internal ID using its certification number, asynchronously.
@@ -41,9 +63,11 @@ async def get_asset_id_async(cert_id: str, retries: int = 5, initial_delay: floa
     delay = initial_delay
     for attempt in range(retries):
         try:
-            response = await async_client.post(url=GRAPHQL_URL, json=payload)
+            with _CERT_SECONDS.time():
+                response = await async_client.post(url=GRAPHQL_URL, json=payload)
             response.raise_for_status()
             data = response.json()
+            _CERT_OK.inc()
 
             if not data:
                 logger.warning(f"Received empty JSON response for cert '{cert_id}'. Assuming not found.")
@@ -57,6 +81,7 @@ async def get_asset_id_async(cert_id: str, retries: int = 5, initial_delay: floa
                 return None
                 
         except httpx.RequestError as e:
+            _CERT_ERROR.inc()
             if isinstance(e, httpx.HTTPStatusError):
                 logger.warning(
                     f"ALT API call (get_asset_id_async) failed for cert '{cert_id}' on attempt {attempt + 1} "
@@ -78,7 +103,10 @@ async def get_alt_data_async(cert_id: str, grade: str, company: str, retries: in
     Main async orchestrator. Returns a dict with: alt_value, avg_price, supply, and confidence data.
     """
     asset_id = CERT_ID_TO_ASSET_ID_CACHE.get(cert_id)
-    if not asset_id:
+    if asset_id:
+        _CERT_CACHE_HIT.inc()
+    else:
+        _CERT_CACHE_MISS.inc()
         asset_id = await get_asset_id_async(cert_id)
         if not asset_id: return None
         CERT_ID_TO_ASSET_ID_CACHE[cert_id] = asset_id
@@ -147,12 +175,14 @@ async def get_alt_data_async(cert_id: str, grade: str, company: str, retries: in
     for attempt in range(retries):
         try:
             # Run both GraphQL queries concurrently
-            details_response, trans_response = await asyncio.gather(
-                async_client.post(url=GRAPHQL_URL, json=details_payload),
-                async_client.post(url=GRAPHQL_URL, json=trans_payload)
-            )
+            with _DETAILS_SECONDS.time():
+                details_response, trans_response = await asyncio.gather(
+                    async_client.post(url=GRAPHQL_URL, json=details_payload),
+                    async_client.post(url=GRAPHQL_URL, json=trans_payload)
+                )
             details_response.raise_for_status()
             trans_response.raise_for_status()
+            _DETAILS_OK.inc()
 
             details_json = details_response.json()
             trans_json = trans_response.json()
@@ -200,6 +230,7 @@ async def get_alt_data_async(cert_id: str, grade: str, company: str, retries: in
                 "confidence": confidence_data.get('currentConfidenceMetric') or 0.0
             }
         except httpx.RequestError as e:
+            _DETAILS_ERROR.inc()
             if isinstance(e, httpx.HTTPStatusError):
                 logger.warning(
                     f"ALT API data fetch failed for asset {asset_id} on attempt {attempt + 1} with status {e.response.status_code}: {e.response.text}"
@@ -0,0 +1,59 @@
+import os
+import time
+import logging
+import asyncio
+from datetime import datetime, timedelta, timezone
+
+from apscheduler.schedulers.asyncio import AsyncIOScheduler
+
+from database import aio as db
+
+logger = logging.getLogger(__name__)
+
+# --- Configuration ---
+ARCHIVE_INTERVAL_MINUTES = int(os.getenv("ARCHIVE_INTERVAL_MINUTES", 60))
+# Listings delisted longer ago than this move from listings to listings_archive
+ARCHIVE_DELISTED_AFTER_DAYS = float(os.getenv("ARCHIVE_DELISTED_AFTER_DAYS", 30))
+ARCHIVE_BATCH_SIZE = int(os.getenv("ARCHIVE_BATCH_SIZE", 1000))
+# Pause between batches so the live pipeline's writes aren't starved by a large first run
+ARCHIVE_BATCH_PAUSE_SECONDS = float(os.getenv("ARCHIVE_BATCH_PAUSE_SECONDS", 0.5))
+
+async def archive_delisted_listings():
+    """Moves listings delisted more than ARCHIVE_DELISTED_AFTER_DAYS ago into the archive, one short batch at a time."""
+    # APScheduler creates this task unnamed; name it so the loop monitor can attribute it.
+    asyncio.current_task().set_name("archiver")
+
+    delisted_before = datetime.now(timezone.utc) - timedelta(days=ARCHIVE_DELISTED_AFTER_DAYS)
+    started_at = time.monotonic()
+    total = 0
+    while True:
+        # Replicas running this together lock disjoint batches (SKIP LOCKED), so no listing moves twice.
+        moved = await db.archive_delisted_listings(delisted_before, ARCHIVE_BATCH_SIZE)
+        total += moved
+        if moved < ARCHIVE_BATCH_SIZE:
+            break
+        logger.info(f"Archived {total} delisted listings so far...")
+        await asyncio.sleep(ARCHIVE_BATCH_PAUSE_SECONDS)
+
+    if total:
+        logger.info(f"Archived {total} listings delisted before {delisted_before:%Y-%m-%d} in {time.monotonic() - started_at:.1f}s.")
+    else:
+        logger.info("No delisted listings due for archiving.")
+
+def start_archiver() -> AsyncIOScheduler:
+    """
+    Starts the scheduler for the archiver. Must be called from within the running event loop.
+    The first run happens immediately so a backlog is worked off on boot.
+    """
+    scheduler = AsyncIOScheduler()
+    scheduler.add_job(
+        archive_delisted_listings, 'interval',
+        minutes=ARCHIVE_INTERVAL_MINUTES,
+        next_run_time=datetime.now(timezone.utc),
+        coalesce=True,
+        max_instances=1
+    )
+    scheduler.start()
+    logger.info(f"Archiver scheduled to run every {ARCHIVE_INTERVAL_MINUTES} minutes "
+                f"for listings delisted over {ARCHIVE_DELISTED_AFTER_DAYS:g} days ago.")
+    return scheduler
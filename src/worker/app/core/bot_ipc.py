@@ -0,0 +1,233 @@
+"""
+Local IPC between the worker and the Discord bot when the bot runs as its own process
+(DISCORD_BOT_MODE=process), so gateway events never compete with ingestion for the worker's
+event loop.
+
+The worker listens on the Unix socket DISCORD_IPC_SOCKET and starts the bot process
+(worker.app.bot_process), restarting it whenever it exits. The bot process exits when it
+loses the worker, so an orphaned bot never outlives it. Messages are JSON lines:
+
+    worker -> bot   {"type": "alert", "alert": {...}}               a snipe_queue item
+                    {"type": "status", "is_leader": bool}           every heartbeat
+                    {"type": "reply", "id": n, "content": "..."}    a command's reply
+                    {"type": "done", "id": n}                       the command finished
+    bot -> worker   {"type": "recheck", "id": n, "timeframe": "1H"} /cartel_recheck
+"""
+import os
+import sys
+import json
+import asyncio
+import itertools
+import contextlib
+import logging
+from typing import Awaitable, Callable
+
+logger = logging.getLogger(__name__)
+
+# --- Configuration ---
+# 'inline' runs the bot in the worker's event loop; 'process' runs it as a child process
+DISCORD_BOT_MODE = os.getenv("DISCORD_BOT_MODE", "inline").lower()
+DISCORD_IPC_SOCKET = os.getenv("DISCORD_IPC_SOCKET", "/tmp/cards-cartel-bot.sock")
+DISCORD_IPC_HEARTBEAT_SECONDS = float(os.getenv("DISCORD_IPC_HEARTBEAT_SECONDS", 1))
+BOT_PROCESS_RESTART_SECONDS = float(os.getenv("BOT_PROCESS_RESTART_SECONDS", 5))
+# How long the bot process keeps trying to reach the worker's socket on startup
+BOT_PROCESS_CONNECT_SECONDS = float(os.getenv("BOT_PROCESS_CONNECT_SECONDS", 30))
+IPC_MAX_MESSAGE_BYTES = 1024 * 1024
+
+if DISCORD_BOT_MODE not in ("inline", "process"):
+    raise ValueError(f"DISCORD_BOT_MODE must be 'inline' or 'process', not '{DISCORD_BOT_MODE}'.")
+
+# reply(content) sends one message back to whoever issued a command
+Reply = Callable[[str], Awaitable[None]]
+
+def alert_payload(item: dict) -> dict:
+    """A snipe_queue item as plain JSON: SQLAlchemy state dropped and datetimes stringified."""
+    listing_data = {k: v for k, v in item['listing_data'].items() if not k.startswith('_')}
+    return json.loads(json.dumps({**item, 'listing_data': listing_data}, default=str))
+
+async def _send(writer: asyncio.StreamWriter | None, message: dict):
+    if writer is None or writer.is_closing():
+        raise ConnectionError("The other end of the bot link is not connected.")
+    writer.write(json.dumps(message).encode() + b"\n")
+    await writer.drain()
+
+class BotLink:
+    """The worker's end: serves the socket, supervises the bot process and forwards alerts to it."""
+    def __init__(self, snipe_queue: asyncio.Queue, run_recheck: Callable[[str, Reply], Awaitable[None]], forward_alerts: bool = True):
+        self.snipe_queue = snipe_queue
+        self.run_recheck = run_recheck
+        # False when alerts go out through webhooks and the bot only serves slash commands
+        self.forward_alerts = forward_alerts
+        self._writer = None
+        self._connected = asyncio.Event()
+        self._commands = set()
+        self._is_leader = lambda: False
+
+    async def _run_command(self, command_id: int, command: Callable[..., Awaitable[None]], *args):
+        async def reply(content: str):
+            await _send(self._writer, {"type": "reply", "id": command_id, "content": content})
+        try:
+            await command(*args, reply)
+        except Exception as e:
+            logger.error(f"Command {command_id} from the Discord bot failed: {e}", exc_info=True)
+            with contextlib.suppress(ConnectionError):
+                await reply(f"An unexpected error occurred: {e}")
+        finally:
+            with contextlib.suppress(ConnectionError):
+                await _send(self._writer, {"type": "done", "id": command_id})
+
+    async def _handle_connection(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        if self._writer is not None:
+            self._writer.close()  # A restarted bot process replaces the old connection
+        self._writer = writer
+        self._connected.set()
+        logger.info("Discord bot process connected.")
+        try:
+            await self._send_status()
+            async for line in reader:
+                message = json.loads(line)
+                if message['type'] == 'recheck':
+                    task = asyncio.create_task(self._run_command(message['id'], self.run_recheck, message['timeframe']),
+                                               name="recheck:cartel_recheck")
+                    self._commands.add(task)
+                    task.add_done_callback(self._commands.discard)
+                else:
+                    logger.warning(f"Ignoring unknown message from the Discord bot process: {message['type']}")
+        except (ConnectionError, ValueError, KeyError) as e:
+            logger.warning(f"Dropping the Discord bot process connection: {e!r}")
+        finally:
+            writer.close()
+            if self._writer is writer:
+                self._writer = None
+                self._connected.clear()
+                logger.warning("Discord bot process disconnected.")
+
+    async def _forward_alerts(self):
+        while True:
+            await self._connected.wait()
+            item = await self.snipe_queue.get()
+            try:
+                await _send(self._writer, {"type": "alert", "alert": alert_payload(item)})
+            except ConnectionError:
+                if self._writer is None or self._writer.is_closing():
+                    # The disconnect may not have been handled yet; without this the loop would
+                    # spin on the requeued alert without ever yielding to the handler
+                    self._connected.clear()
+                # Kept for the bot process that connects next
+                self.snipe_queue.put_nowait(item)
+            finally:
+                self.snipe_queue.task_done()
+
+    async def _send_status(self):
+        # Only the leader's bot answers commands, as with the inline bot
+        await _send(self._writer, {"type": "status", "is_leader": self._is_leader()})
+
+    async def _heartbeat(self):
+        while True:
+            with contextlib.suppress(ConnectionError):
+                await self._send_status()
+            await asyncio.sleep(DISCORD_IPC_HEARTBEAT_SECONDS)
+
+    async def _run_bot_process(self):
+        while True:
+            process = await asyncio.create_subprocess_exec(sys.executable, "-m", "worker.app.bot_process")
+            logger.info(f"Started Discord bot process {process.pid}.")
+            try:
+                code = await process.wait()
+            except asyncio.CancelledError:
+                process.terminate()
+                try:
+                    await asyncio.wait_for(process.wait(), 10)
+                except asyncio.TimeoutError:
+                    process.kill()
+                raise
+            logger.error(f"Discord bot process exited with code {code}, restarting in {BOT_PROCESS_RESTART_SECONDS:g}s.")
+            await asyncio.sleep(BOT_PROCESS_RESTART_SECONDS)
+
+    async def serve(self, is_leader: Callable[[], bool]):
+        """Runs the link and the bot process until cancelled."""
+        self._is_leader = is_leader
+        with contextlib.suppress(FileNotFoundError):
+            os.unlink(DISCORD_IPC_SOCKET)
+        server = await asyncio.start_unix_server(self._handle_connection, DISCORD_IPC_SOCKET, limit=IPC_MAX_MESSAGE_BYTES)
+        tasks = [
+            asyncio.create_task(self._run_bot_process(), name="discord:bot_process"),
+            asyncio.create_task(self._heartbeat(), name="discord:bot_heartbeat"),
+        ]
+        if self.forward_alerts:
+            tasks.append(asyncio.create_task(self._forward_alerts(), name="discord:bot_alerts"))
+        try:
+            await asyncio.gather(*tasks)
+        finally:
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+            server.close()
+            if self._writer is not None:
+                self._writer.close()
+            with contextlib.suppress(FileNotFoundError):
+                os.unlink(DISCORD_IPC_SOCKET)
+
+class WorkerLink:
+    """The bot process's end: queues the worker's alerts and relays commands and their replies."""
+    def __init__(self, snipe_queue: asyncio.Queue):
+        self.snipe_queue = snipe_queue
+        self.is_leader = False
+        self._reader = None
+        self._writer = None
+        self._interactions = {}  # command id -> discord.Interaction awaiting replies
+        self._ids = itertools.count(1)
+
+    def accept_interactions(self) -> bool:
+        return self._writer is not None and self.is_leader
+
+    async def connect(self):
+        """Connects to the worker's socket, retrying for up to BOT_PROCESS_CONNECT_SECONDS."""
+        deadline = asyncio.get_running_loop().time() + BOT_PROCESS_CONNECT_SECONDS
+        while True:
+            try:
+                self._reader, self._writer = await asyncio.open_unix_connection(DISCORD_IPC_SOCKET, limit=IPC_MAX_MESSAGE_BYTES)
+                logger.info(f"Connected to the worker on {DISCORD_IPC_SOCKET}.")
+                return
+            except OSError as e:
+                if asyncio.get_running_loop().time() >= deadline:
+                    raise
+                logger.warning(f"Worker not reachable on {DISCORD_IPC_SOCKET}, retrying: {e}")
+                await asyncio.sleep(1)
+
+    async def _reply(self, interaction, content: str):
+        try:
+            await interaction.followup.send(content, ephemeral=True)
+        except Exception as e:
+            logger.error(f"Could not relay a command reply to Discord: {e}")
+
+    async def run(self):
+        """Handles the worker's messages until it goes away."""
+        try:
+            async for line in self._reader:
+                message = json.loads(line)
+                kind = message['type']
+                if kind == 'alert':
+                    await self.snipe_queue.put(message['alert'])
+                elif kind == 'status':
+                    self.is_leader = message['is_leader']
+                elif kind == 'reply':
+                    interaction = self._interactions.get(message['id'])
+                    if interaction is not None:
+                        asyncio.create_task(self._reply(interaction, message['content']), name="discord:command_reply")
+                elif kind == 'done':
+                    self._interactions.pop(message['id'], None)
+        finally:
+            self._writer.close()
+            self._writer = None
+        logger.warning("The worker closed the bot link.")
+
+    async def recheck(self, timeframe: str, interaction):
+        """recheck_skipped_callback for start_discord_bot: runs /cartel_recheck in the worker."""
+        command_id = next(self._ids)
+        self._interactions[command_id] = interaction
+        try:
+            await _send(self._writer, {"type": "recheck", "id": command_id, "timeframe": timeframe})
+        except ConnectionError:
+            self._interactions.pop(command_id, None)
+            await self._reply(interaction, "❌ The worker is not reachable right now. Please try again shortly.")
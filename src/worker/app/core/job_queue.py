@@ -0,0 +1,83 @@
+import os
+import socket
+import asyncio
+import logging
+from typing import Awaitable, Callable
+
+from database import aio as db
+from worker.app.core import metrics
+
+logger = logging.getLogger(__name__)
+
+# --- Configuration ---
+# 'local' keeps all work on in-process queues; 'postgres' routes enrichment and one-off
+# verifications through the shared jobs table so several workers can split the load.
+WORK_QUEUE_MODE = os.getenv("WORK_QUEUE_MODE", "local").lower()
+JOB_RUNNER_CONCURRENCY = int(os.getenv("JOB_RUNNER_CONCURRENCY", 10))
+JOB_LEASE_SECONDS = int(os.getenv("JOB_LEASE_SECONDS", 120))
+JOB_POLL_SECONDS = float(os.getenv("JOB_POLL_SECONDS", 0.25))
+JOB_MAX_ATTEMPTS = int(os.getenv("JOB_MAX_ATTEMPTS", 5))
+JOB_RETRY_BASE_SECONDS = float(os.getenv("JOB_RETRY_BASE_SECONDS", 5))
+
+WORKER_ID = f"{socket.gethostname()}:{os.getpid()}"
+
+# --- Metrics ---
+JOBS = metrics.Counter("cartel_jobs_total", "Jobs run by this worker, by kind and outcome.", ["kind", "outcome"])
+JOB_SECONDS = metrics.Histogram("cartel_job_seconds", "Duration of job handlers.", ["kind"])
+
+_handlers: dict[str, Callable[[dict], Awaitable[None]]] = {}
+
+def is_distributed() -> bool:
+    return WORK_QUEUE_MODE == "postgres"
+
+def register_handler(kind: str, handler: Callable[[dict], Awaitable[None]]):
+    """Registers the coroutine that runs jobs of the given kind. Raising marks the attempt as failed."""
+    _handlers[kind] = handler
+
+async def enqueue(kind: str, payload: dict, priority: int = 0, dedupe_key: str | None = None) -> bool:
+    """Adds one job to the shared queue. Returns False if a job with the same dedupe_key is already queued."""
+    job = {'kind': kind, 'payload': payload, 'priority': priority, 'dedupe_key': dedupe_key, 'max_attempts': JOB_MAX_ATTEMPTS}
+    return await db.enqueue_jobs([job]) > 0
+
+async def _run_job(job: dict):
+    kind = job['kind']
+    try:
+        with JOB_SECONDS.labels(kind=kind).time():
+            await _handlers[kind](job['payload'])
+    except Exception as e:
+        retry_delay = JOB_RETRY_BASE_SECONDS * 2 ** (job['attempts'] - 1)
+        logger.error(f"Job {job['id']} ({kind}) failed on attempt {job['attempts']}/{job['max_attempts']}: {e}", exc_info=True)
+        JOBS.labels(kind=kind, outcome="failed").inc()
+        await db.fail_job(job['id'], repr(e), retry_delay)
+    else:
+        JOBS.labels(kind=kind, outcome="done").inc()
+        await db.complete_job(job['id'])
+
+async def run_jobs(kinds: list[str] | None = None):
+    """
+    Claims jobs of the given kinds (default: every registered kind) from the shared queue
+    and runs up to JOB_RUNNER_CONCURRENCY of them at a time. Runs forever.
+    """
+    kinds = list(kinds or _handlers)
+    logger.info(f"--- Starting job runner {WORKER_ID} for {kinds} ---")
+    in_flight = set()
+    while True:
+        claimed = []
+        capacity = JOB_RUNNER_CONCURRENCY - len(in_flight)
+        if capacity > 0:
+            try:
+                claimed = await db.claim_jobs(kinds, capacity, JOB_LEASE_SECONDS, WORKER_ID)
+            except Exception as e:
+                logger.error(f"Error claiming jobs: {e}", exc_info=True)
+            for job in claimed:
+                task = asyncio.create_task(_run_job(job), name=f"jobs:{job['kind']}")
+                in_flight.add(task)
+                task.add_done_callback(in_flight.discard)
+
+        # Poll again right away while there is work and spare capacity; otherwise wait for a slot or the poll interval.
+        if claimed and len(in_flight) < JOB_RUNNER_CONCURRENCY:
+            continue
+        if in_flight:
+            await asyncio.wait(in_flight, timeout=JOB_POLL_SECONDS, return_when=asyncio.FIRST_COMPLETED)
+        else:
+            await asyncio.sleep(JOB_POLL_SECONDS)
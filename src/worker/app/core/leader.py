@@ -0,0 +1,97 @@
+import os
+import asyncio
+import logging
+from typing import Callable
+
+from database import main as database
+from worker.app.core import metrics
+from worker.app.core import job_queue
+
+logger = logging.getLogger(__name__)
+
+# --- Configuration ---
+# Only one replica may poll ME and post alerts. Election is only needed when replicas share
+# the database, so it follows WORK_QUEUE_MODE unless set explicitly.
+LEADER_ELECTION_ENABLED = os.getenv("LEADER_ELECTION_ENABLED", "1" if job_queue.is_distributed() else "0") == "1"
+LEADER_LOCK_KEY = int(os.getenv("LEADER_LOCK_KEY", 0x63617274))
+LEADER_POLL_SECONDS = float(os.getenv("LEADER_POLL_SECONDS", 2))
+# How long Postgres waits on a silent leader connection between keepalive probes (it gives up after two)
+LEADER_KEEPALIVE_SECONDS = int(os.getenv("LEADER_KEEPALIVE_SECONDS", 5))
+
+# --- Metrics ---
+IS_LEADER = metrics.Gauge("cartel_is_leader", "1 while this replica runs the leader-only duties.")
+LEADER_TRANSITIONS = metrics.Counter("cartel_leader_transitions_total", "Times this replica gained or lost leadership.", ["transition"])
+
+_is_leader = False
+
+def is_leader() -> bool:
+    """True while this replica holds leadership (always True when election is disabled)."""
+    return _is_leader
+
+def _set_leader(value: bool):
+    global _is_leader
+    _is_leader = value
+    IS_LEADER.set(1 if value else 0)
+
+async def _stop_duties(duties: list[asyncio.Task]):
+    for task in duties:
+        task.cancel()
+    await asyncio.gather(*duties, return_exceptions=True)
+
+async def run_leader_election(start_duties: Callable[[], list[asyncio.Task]]):
+    """
+    Campaigns for the leader lock forever and runs the tasks returned by start_duties() only
+    while this replica holds it. Standby replicas keep polling, so one takes over within
+    LEADER_POLL_SECONDS of the old leader's session ending. A leader that can't confirm its
+    lock, or whose duties exit, cancels them and steps down.
+    """
+    if not LEADER_ELECTION_ENABLED:
+        _set_leader(True)
+        await asyncio.gather(*start_duties())
+        return
+
+    logger.info(f"--- Starting leader election (lock {LEADER_LOCK_KEY}) ---")
+    connection = None
+    duties = []
+    try:
+        while True:
+            try:
+                if connection is None:
+                    connection = await asyncio.to_thread(database.open_lock_connection, LEADER_KEEPALIVE_SECONDS)
+
+                if not _is_leader:
+                    if await asyncio.to_thread(database.try_advisory_lock, connection, LEADER_LOCK_KEY):
+                        _set_leader(True)
+                        LEADER_TRANSITIONS.labels(transition="elected").inc()
+                        logger.warning("This replica is now the leader. Starting leader-only duties.")
+                        duties = start_duties()
+                else:
+                    # Don't let a hung connection keep us leading past the point Postgres would have dropped us
+                    still_held = await asyncio.wait_for(
+                        asyncio.to_thread(database.holds_advisory_lock, connection, LEADER_LOCK_KEY),
+                        timeout=LEADER_KEEPALIVE_SECONDS
+                    )
+                    if not still_held:
+                        raise RuntimeError("the leader lock is no longer held")
+                    finished = [task for task in duties if task.done()]
+                    if finished:
+                        raise RuntimeError(f"leader duty '{finished[0].get_name()}' exited")
+            except Exception as e:
+                if _is_leader:
+                    logger.error(f"Stepping down as leader: {e}")
+                    LEADER_TRANSITIONS.labels(transition="stepped_down").inc()
+                    await _stop_duties(duties)
+                    duties = []
+                    _set_leader(False)
+                else:
+                    logger.error(f"Error during leader election: {e}")
+                if connection is not None:
+                    await asyncio.to_thread(database.close_lock_connection, connection)
+                    connection = None
+
+            await asyncio.sleep(LEADER_POLL_SECONDS)
+    finally:
+        await _stop_duties(duties)
+        _set_leader(False)
+        if connection is not None:
+            await asyncio.to_thread(database.close_lock_connection, connection)
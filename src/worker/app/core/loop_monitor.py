@@ -0,0 +1,141 @@
+import os
+import sys
+import time
+import asyncio
+import logging
+import threading
+import traceback
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+
+logger = logging.getLogger(__name__)
+
+# --- Configuration ---
+LOOP_MONITOR_ENABLED = os.getenv("LOOP_MONITOR_ENABLED", "1") == "1"
+LOOP_MONITOR_INTERVAL_SECONDS = float(os.getenv("LOOP_MONITOR_INTERVAL_SECONDS", 0.1))
+# A loop that hasn't ticked for this long is reported as stalled, with the stack of whatever is blocking it
+LOOP_STALL_THRESHOLD_SECONDS = float(os.getenv("LOOP_STALL_THRESHOLD_SECONDS", 0.25))
+LOOP_MONITOR_REPORT_SECONDS = float(os.getenv("LOOP_MONITOR_REPORT_SECONDS", 60))
+# Size of the default executor behind every asyncio.to_thread call
+THREAD_POOL_SIZE = int(os.getenv("THREAD_POOL_SIZE", min(32, (os.cpu_count() or 1) + 4)))
+
+def task_subsystem(task: asyncio.Task) -> str:
+    """
+    Maps a task to the subsystem that owns it. Tasks are named '<subsystem>:<detail>'
+    (e.g. 'watchdog:process_listing'); asyncio's default 'Task-N' names count as 'unnamed'.
+    """
+    name = task.get_name()
+    if name.startswith('Task-'):
+        return 'unnamed'
+    return name.split(':', 1)[0].strip()
+
+class LoopMonitor:
+    """
+    Measures event-loop lag and default thread-pool backlog, logs the stack of the loop thread
+    whenever it stalls, and counts live tasks per subsystem.
+    """
+    def __init__(self, loop: asyncio.AbstractEventLoop, executor: ThreadPoolExecutor):
+        self.loop = loop
+        self.executor = executor
+        self.loop_thread_id = threading.get_ident()
+        self.last_lag = 0.0
+        self.max_lag = 0.0
+        self.stall_count = 0
+        self._heartbeat = time.monotonic()
+        self._reported_heartbeat = None
+        self._stopped = threading.Event()
+        self._tasks = []
+
+    def thread_pool_queue_depth(self) -> int:
+        """Number of to_thread calls waiting for a free worker thread."""
+        return self.executor._work_queue.qsize()
+
+    def count_tasks(self) -> Counter:
+        return Counter(task_subsystem(task) for task in asyncio.all_tasks(self.loop))
+
+    def snapshot(self) -> dict:
+        return {
+            'loop_lag_seconds': self.last_lag,
+            'max_loop_lag_seconds': self.max_lag,
+            'loop_stalls': self.stall_count,
+            'thread_pool_queue_depth': self.thread_pool_queue_depth(),
+            'thread_pool_threads': len(self.executor._threads),
+            'tasks_by_subsystem': dict(self.count_tasks()),
+        }
+
+    def start(self):
+        # asyncio only logs slow callbacks itself in debug mode (PYTHONASYNCIODEBUG=1); keep it on the same threshold.
+        self.loop.slow_callback_duration = LOOP_STALL_THRESHOLD_SECONDS
+        self._tasks = [
+            self.loop.create_task(self._probe_lag(), name="loop_monitor:probe"),
+            self.loop.create_task(self._report(), name="loop_monitor:report"),
+        ]
+        threading.Thread(target=self._watch_for_stalls, name="loop-monitor", daemon=True).start()
+        logger.info(f"Loop monitor started (stall threshold {LOOP_STALL_THRESHOLD_SECONDS * 1000:.0f}ms, "
+                    f"thread pool size {THREAD_POOL_SIZE}).")
+
+    def stop(self):
+        self._stopped.set()
+        for task in self._tasks:
+            task.cancel()
+
+    async def _probe_lag(self):
+        """Sleeps for a fixed interval and records how much later than requested the loop woke us up."""
+        while True:
+            started_at = self.loop.time()
+            await asyncio.sleep(LOOP_MONITOR_INTERVAL_SECONDS)
+            lag = max(0.0, self.loop.time() - started_at - LOOP_MONITOR_INTERVAL_SECONDS)
+            self._heartbeat = time.monotonic()
+            self.last_lag = lag
+            self.max_lag = max(self.max_lag, lag)
+            if lag >= LOOP_STALL_THRESHOLD_SECONDS:
+                self.stall_count += 1
+                logger.warning(f"Event loop stalled for {lag * 1000:.0f}ms "
+                               f"(thread pool queue depth: {self.thread_pool_queue_depth()}).")
+
+    async def _report(self):
+        while True:
+            await asyncio.sleep(LOOP_MONITOR_REPORT_SECONDS)
+            snapshot = self.snapshot()
+            tasks = ", ".join(f"{name}={count}" for name, count in sorted(snapshot['tasks_by_subsystem'].items()))
+            logger.info(
+                f"Loop: lag {snapshot['loop_lag_seconds'] * 1000:.1f}ms (max {snapshot['max_loop_lag_seconds'] * 1000:.1f}ms), "
+                f"{snapshot['loop_stalls']} stalls, thread pool {snapshot['thread_pool_threads']}/{THREAD_POOL_SIZE} threads "
+                f"with {snapshot['thread_pool_queue_depth']} queued. Tasks: {tasks}"
+            )
+            self.max_lag = 0.0
+
+    def _watch_for_stalls(self):
+        """
+        Runs in a separate thread. While the loop is blocked, its heartbeat stops advancing;
+        once that exceeds the threshold we log the loop thread's stack, which shows the
+        callback or coroutine that is hogging it. Logged once per stall.
+        """
+        while not self._stopped.wait(LOOP_MONITOR_INTERVAL_SECONDS):
+            heartbeat = self._heartbeat
+            blocked_for = time.monotonic() - heartbeat - LOOP_MONITOR_INTERVAL_SECONDS
+            if blocked_for < LOOP_STALL_THRESHOLD_SECONDS or heartbeat == self._reported_heartbeat:
+                continue
+            self._reported_heartbeat = heartbeat
+
+            frame = sys._current_frames().get(self.loop_thread_id)
+            if frame is None:
+                continue
+            current_task = asyncio.current_task(self.loop)
+            task_name = current_task.get_name() if current_task else "<callback>"
+            stack = "".join(traceback.format_stack(frame))
+            logger.warning(f"Event loop blocked for {blocked_for * 1000:.0f}ms in {task_name}. Stack:\n{stack}")
+
+def start_loop_monitor() -> LoopMonitor | None:
+    """
+    Installs a sized default executor for asyncio.to_thread and starts the monitor.
+    Call it first thing inside the running loop so every to_thread call lands on the monitored pool.
+    """
+    if not LOOP_MONITOR_ENABLED:
+        return None
+    loop = asyncio.get_running_loop()
+    executor = ThreadPoolExecutor(max_workers=THREAD_POOL_SIZE, thread_name_prefix="to_thread")
+    loop.set_default_executor(executor)
+    monitor = LoopMonitor(loop, executor)
+    monitor.start()
+    return monitor
@@ -1,8 +1,12 @@
+import os
 import httpx
 import json
 import asyncio
 import logging
 
+from . import metrics
+from . import utils
+
 # Initialize a logger for this module
 logger = logging.getLogger(__name__)
 
@@ -20,6 +24,21 @@ HEADERS = {
 # Create a single, reusable async client
 async_client = httpx.AsyncClient(headers=HEADERS, timeout=20)
 
+# Bulk status checks (the rechecker, /cartel_inspect_bulk) share one request budget
+ME_STATUS_REQUESTS_PER_SECOND = float(os.getenv("ME_STATUS_REQUESTS_PER_SECOND", 4))
+status_rate_limiter = utils.AsyncRateLimiter(ME_STATUS_REQUESTS_PER_SECOND)
+
+# --- Metrics ---
+ME_REQUESTS = metrics.Counter("cartel_me_requests_total", "Magic Eden API requests by endpoint and outcome.", ["endpoint", "outcome"])
+ME_REQUEST_SECONDS = metrics.Histogram("cartel_me_request_seconds", "Magic Eden API request latency.", ["endpoint"])
+_LISTINGS_OK = ME_REQUESTS.labels(endpoint="listings", outcome="ok")
+_LISTINGS_ERROR = ME_REQUESTS.labels(endpoint="listings", outcome="error")
+_LISTINGS_SECONDS = ME_REQUEST_SECONDS.labels(endpoint="listings")
+_TOKEN_LISTED = ME_REQUESTS.labels(endpoint="token", outcome="ok")
+_TOKEN_NOT_FOUND = ME_REQUESTS.labels(endpoint="token", outcome="not_found")
+_TOKEN_ERROR = ME_REQUESTS.labels(endpoint="token", outcome="error")
+_TOKEN_SECONDS = ME_REQUEST_SECONDS.labels(endpoint="token")
+
 def _get_attribute_value(attributes_list: list, target_trait: str):
     """Finds the value for a specific traitType within a list of attributes."""
     if not attributes_list: return None
@@ -92,9 +111,11 @@ async def _fetch_with_retries_async(url: str, params: dict, retries: int = 5, in
     delay = initial_delay
     for i in range(retries):
         try:
-            response = await async_client.get(url, params=params)
+            with _LISTINGS_SECONDS.time():
+                response = await async_client.get(url, params=params)
             response.raise_for_status()
             data = response.json()
+            _LISTINGS_OK.inc()
             if isinstance(data, dict):
                 return data.get('results', [])
             if isinstance(data, list):
@@ -102,6 +123,7 @@ async def _fetch_with_retries_async(url: str, params: dict, retries: int = 5, in
             logger.warning(f"Unexpected data type from ME API: {type(data)}")
             return []
         except httpx.RequestError as e:
+            _LISTINGS_ERROR.inc()
             logger.warning(f"ME API connection error (attempt {i+1}/{retries}): {e}")
             if i < retries - 1:
                 await asyncio.sleep(delay)
@@ -276,15 +298,19 @@ async def check_listing_status_async(mint_address: str, retries: int = 5, initia
     delay = initial_delay
     for attempt in range(retries):
         try:
-            response = await async_client.get(url)
+            with _TOKEN_SECONDS.time():
+                response = await async_client.get(url)
             if response.status_code == 200:
                 data = response.json()
+                _TOKEN_LISTED.inc()
                 return data
             elif response.status_code == 404:
+                _TOKEN_NOT_FOUND.inc()
                 return "not_found"
             else:
                 response.raise_for_status() # Raise an exception for other bad statuses to trigger a retry
         except httpx.RequestError as e:
+            _TOKEN_ERROR.inc()
             logger.warning(f"ME API check for {mint_address} failed on attempt {attempt + 1}/{retries}: {e}")
             if attempt < retries - 1:
                 await asyncio.sleep(delay)
@@ -0,0 +1,235 @@
+import os
+import time
+import asyncio
+import logging
+import threading
+import contextlib
+from abc import ABC, abstractmethod
+from bisect import bisect_left
+
+logger = logging.getLogger(__name__)
+
+# --- Configuration ---
+METRICS_ENABLED = os.getenv("METRICS_ENABLED", "1") == "1"
+METRICS_HOST = os.getenv("METRICS_HOST", "127.0.0.1")
+METRICS_PORT = int(os.getenv("METRICS_PORT", 9100))
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+# Every metric registers itself here on creation, in definition order
+_registry = []
+
+def _escape(value) -> str:
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+def _format_labels(labelnames: tuple, labelvalues: tuple, extra: str = "") -> str:
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(labelnames, labelvalues)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+class _Metric:
+    """Base for all metrics: registers itself and renders its samples under a HELP/TYPE header."""
+    kind = "untyped"
+
+    def __init__(self, name: str, documentation: str, labelnames: tuple = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        _registry.append(self)
+
+    def _samples(self) -> list[str]:
+        return []
+
+    def render(self) -> list[str]:
+        return [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.kind}", *self._samples()]
+
+class _RecordedMetric(_Metric, ABC):
+    """
+    A metric recorded by the code. Labelled children are created once by labels() and should be
+    bound at import time on hot paths, so recording is a single locked add.
+    """
+    def __init__(self, name: str, documentation: str, labelnames: tuple = ()):
+        super().__init__(name, documentation, labelnames)
+        self._children = {}
+        self._lock = threading.Lock()
+
+    def labels(self, **labels):
+        key = tuple(str(labels[name]) for name in self.labelnames)
+        child = self._children.get(key)
+        if child is None:
+            with self._lock:
+                child = self._children.setdefault(key, self._new_child())
+        return child
+
+    @abstractmethod
+    def _new_child(self):
+        """A fresh child holding one label combination's value."""
+
+    def _unlabelled(self):
+        return self.labels()
+
+    def _samples(self) -> list[str]:
+        lines = []
+        for key, child in list(self._children.items()):
+            lines.extend(child.render(self.name, self.labelnames, key))
+        return lines
+
+class _ValueChild:
+    def __init__(self):
+        self._value = 0.0
+        self._lock = threading.Lock()
+
+    def inc(self, amount: float = 1.0):
+        with self._lock:
+            self._value += amount
+
+    def set(self, value: float):
+        self._value = value
+
+    def render(self, name: str, labelnames: tuple, key: tuple) -> list[str]:
+        return [f"{name}{_format_labels(labelnames, key)} {self._value}"]
+
+class Counter(_RecordedMetric):
+    kind = "counter"
+
+    def _new_child(self):
+        return _ValueChild()
+
+    def inc(self, amount: float = 1.0):
+        self._unlabelled().inc(amount)
+
+class Gauge(_RecordedMetric):
+    kind = "gauge"
+
+    def _new_child(self):
+        return _ValueChild()
+
+    def set(self, value: float):
+        self._unlabelled().set(value)
+
+class _CallbackMetric(_Metric):
+    """
+    A metric evaluated at scrape time. The callback returns either a number or, for labelled
+    metrics, a dict mapping label-value tuples to numbers.
+    """
+    def __init__(self, name: str, documentation: str, callback, labelnames: tuple = ()):
+        super().__init__(name, documentation, labelnames)
+        self.callback = callback
+
+    def _samples(self) -> list[str]:
+        try:
+            values = self.callback()
+        except Exception as e:
+            logger.warning(f"Metric callback for {self.name} failed: {e}")
+            return []
+        if not isinstance(values, dict):
+            values = {(): values}
+        lines = []
+        for key, value in values.items():
+            key = key if isinstance(key, tuple) else (key,)
+            lines.append(f"{self.name}{_format_labels(self.labelnames, key)} {float(value)}")
+        return lines
+
+class CallbackGauge(_CallbackMetric):
+    kind = "gauge"
+
+class CallbackCounter(_CallbackMetric):
+    """A counter read at scrape time from a count that only ever goes up, such as a stats attribute."""
+    kind = "counter"
+
+class _HistogramChild:
+    def __init__(self, buckets: tuple):
+        self._buckets = buckets
+        self._counts = [0] * (len(buckets) + 1)
+        self._sum = 0.0
+        self._lock = threading.Lock()
+
+    def observe(self, value: float):
+        index = bisect_left(self._buckets, value)
+        with self._lock:
+            self._counts[index] += 1
+            self._sum += value
+
+    @contextlib.contextmanager
+    def time(self):
+        started_at = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - started_at)
+
+    def render(self, name: str, labelnames: tuple, key: tuple) -> list[str]:
+        lines = []
+        cumulative = 0
+        for bound, count in zip(self._buckets + (float("inf"),), self._counts):
+            cumulative += count
+            le = 'le="+Inf"' if bound == float("inf") else f'le="{bound}"'
+            lines.append(f"{name}_bucket{_format_labels(labelnames, key, le)} {cumulative}")
+        lines.append(f"{name}_sum{_format_labels(labelnames, key)} {self._sum}")
+        lines.append(f"{name}_count{_format_labels(labelnames, key)} {cumulative}")
+        return lines
+
+class Histogram(_RecordedMetric):
+    kind = "histogram"
+
+    def __init__(self, name: str, documentation: str, labelnames: tuple = (), buckets: tuple = DEFAULT_BUCKETS):
+        self.buckets = tuple(sorted(buckets))
+        super().__init__(name, documentation, labelnames)
+
+    def _new_child(self):
+        return _HistogramChild(self.buckets)
+
+    def observe(self, value: float):
+        self._unlabelled().observe(value)
+
+    def time(self):
+        return self._unlabelled().time()
+
+def render_metrics() -> str:
+    """Renders every registered metric in the Prometheus text exposition format."""
+    lines = []
+    for metric in _registry:
+        lines.extend(metric.render())
+    return "\n".join(lines) + "\n"
+
+# --- DB layer metrics ---
+# database/main.py can't import the worker, so it exposes a query_observer hook that main() points here.
+DB_QUERY_SECONDS = Histogram("cartel_db_query_seconds", "Duration of database layer calls.", ["query"])
+DB_QUERY_ERRORS = Counter("cartel_db_query_errors_total", "Database layer calls that raised.", ["query"])
+
+def observe_db_query(query: str, seconds: float, failed: bool):
+    DB_QUERY_SECONDS.labels(query=query).observe(seconds)
+    if failed:
+        DB_QUERY_ERRORS.labels(query=query).inc()
+
+# --- HTTP endpoint ---
+async def _handle_request(reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+    try:
+        request_line = await reader.readline()
+        # Drain the request headers; we don't need any of them
+        while (await reader.readline()) not in (b"\r\n", b"\n", b""):
+            pass
+        parts = request_line.split()
+        path = parts[1].split(b"?")[0] if len(parts) >= 2 else b""
+        if path == b"/metrics":
+            status, body = "200 OK", render_metrics().encode()
+        else:
+            status, body = "404 Not Found", b"Not Found\n"
+        writer.write(
+            f"HTTP/1.1 {status}\r\nContent-Type: text/plain; version=0.0.4; charset=utf-8\r\n"
+            f"Content-Length: {len(body)}\r\nConnection: close\r\n\r\n".encode() + body
+        )
+        await writer.drain()
+    except Exception as e:
+        logger.warning(f"Error serving metrics request: {e}")
+    finally:
+        writer.close()
+
+async def start_metrics_server() -> asyncio.AbstractServer | None:
+    """Starts serving /metrics on METRICS_HOST:METRICS_PORT."""
+    if not METRICS_ENABLED:
+        return None
+    server = await asyncio.start_server(_handle_request, METRICS_HOST, METRICS_PORT)
+    logger.info(f"Serving Prometheus metrics on http://{METRICS_HOST}:{METRICS_PORT}/metrics")
+    return server
@@ -1,57 +1,123 @@
-
+import os
 import logging
+import time
+import contextlib
 from datetime import datetime, timedelta, timezone
 import asyncio
 
 from apscheduler.schedulers.asyncio import AsyncIOScheduler
 
-from database import main as database
+from database import aio as db
+from database import write_buffer
 from worker.app.core import magic_eden as me
+from worker.app.core import job_queue
 
 logger = logging.getLogger(__name__)
 
+# --- Configuration ---
+RECHECK_INTERVAL_MINUTES = int(os.getenv("RECHECK_INTERVAL_MINUTES", 60))
+RECHECK_STALE_AFTER_HOURS = float(os.getenv("RECHECK_STALE_AFTER_HOURS", 24))
+# Stale mints are verified concurrently, but never faster than me.ME_STATUS_REQUESTS_PER_SECOND allows.
+RECHECK_CONCURRENCY = int(os.getenv("RECHECK_CONCURRENCY", 5))
+
+async def verify_mint(token_mint: str) -> str:
+    """
+    Checks one mint on ME and marks it unlisted (and unschedules it from the reaper) if it's gone.
+    Returns 'delisted', 'still_listed' or 'failed'. Every caller, local or a 'verify' job on any
+    worker, waits its turn at me.status_rate_limiter.
+    """
+    await me.status_rate_limiter.acquire()
+    status = await me.check_listing_status_async(token_mint)
+    if status == 'not_found' or (isinstance(status, dict) and status.get('listStatus') != 'listed'):
+        logger.info(f"Mint {token_mint} is no longer active. Updating status to unlisted.")
+        await write_buffer.update_listing_status(token_mint, is_listed=False)
+        await db.unschedule_verification(token_mint)
+        return 'delisted'
+    if status is None:
+        return 'failed'
+    # Without the stamp it stays stale, and every run would check it again
+    await write_buffer.mark_verified(token_mint)
+    return 'still_listed'
+
+async def verify_job_handler(payload: dict):
+    """Runs a 'verify' job from the shared queue; a failed ME check raises so the job is retried."""
+    if await verify_mint(payload['token_mint']) == 'failed':
+        raise RuntimeError(f"ME status check failed for {payload['token_mint']}")
+
+async def _verify_worker(stale_listings, results: dict):
+    """Pulls listings from the shared iterator and verifies each one's status on ME."""
+    for listing in stale_listings:
+        token_mint = listing.get('token_mint')
+        if not token_mint:
+            logger.debug(f"Skipping listing {listing.get('listing_id')} because it has no token_mint.")
+            continue
+        try:
+            results[await verify_mint(token_mint)] += 1
+        except Exception as e:
+            logger.error(f"Error re-checking listing {listing.get('listing_id')}: {e}", exc_info=True)
+            results['failed'] += 1
+
 async def recheck_listings():
     """
     Re-checks active listings to verify their status if they haven't been checked in the last 24 hours.
     """
     logger.info("Starting automated re-checking service for stale listings...")
-    
-    active_listings = await asyncio.to_thread(database.get_all_active_listings)
-    now = datetime.now(timezone.utc)
-    
-    for listing in active_listings:
-        last_analyzed_str = listing.get('last_analyzed_at')
-        
-        if not last_analyzed_str:
-            logger.debug(f"Skipping listing {listing.get('listing_id')} because last_analyzed_at is missing.")
-            continue
+    # APScheduler creates this task unnamed; name it so the loop monitor can attribute it.
+    asyncio.current_task().set_name("rechecker")
 
-        try:
-            # Assuming the timestamp from the DB is a string like 'YYYY-MM-DD HH:MM:SS' and is in UTC
-            last_analyzed_at = datetime.strptime(last_analyzed_str, '%Y-%m-%d %H:%M:%S').replace(tzinfo=timezone.utc)
-        except (ValueError, TypeError):
-            logger.warning(f"Could not parse last_analyzed_at: '{last_analyzed_str}' for listing {listing.get('listing_id')}. Skipping.")
-            continue
-            
-        age = now - last_analyzed_at
-        logger.info(f"Listing {listing.get('listing_id')} was last analyzed {age} ago.")
-
-        if age > timedelta(hours=24):
-            logger.info(f"Re-checking listing: {listing['listing_id']} (last checked {age} ago).")
-            status = await me.check_listing_status_async(listing['token_mint'])
-            
-            if status == 'not_found':
-                logger.info(f"Listing {listing['listing_id']} is no longer active. Updating status to unlisted.")
-                await asyncio.to_thread(database.update_listing_status, listing['token_mint'], is_listed=False)
-        else:
-            logger.info(f"Skipping re-check for listing {listing['listing_id']} as it was checked within 24 hours.")
-
-
-def start_rechecker():
+    analyzed_before = datetime.now(timezone.utc) - timedelta(hours=RECHECK_STALE_AFTER_HOURS)
+    started_at = time.monotonic()
+    results = {'delisted': 0, 'still_listed': 0, 'failed': 0}
+    total = queued = 0
+
+    # Stale listings are read in keyset pages, the next one read while this one is verified,
+    # so a large backlog never has to fit in memory at once and no transaction stays open
+    # for the minutes a page takes at the ME rate limit.
+    async with contextlib.aclosing(db.prefetch(db.iter_stale_active_listings(analyzed_before))) as chunks:
+        async for stale_listings in chunks:
+            total += len(stale_listings)
+            if job_queue.is_distributed():
+                # Hand the checks to the shared queue so every worker takes a share; dedupe keys stop
+                # replicas that run this same job from queueing a mint twice.
+                queued += await db.enqueue_jobs([{
+                    'kind': 'verify',
+                    'payload': {'token_mint': listing['token_mint']},
+                    'priority': 20,
+                    'dedupe_key': f"verify:{listing['token_mint']}",
+                    'max_attempts': job_queue.JOB_MAX_ATTEMPTS,
+                } for listing in stale_listings if listing.get('token_mint')])
+                continue
+
+            logger.info(f"Re-checking {len(stale_listings)} stale listings ({total} so far) with {RECHECK_CONCURRENCY} "
+                        f"workers at up to {me.ME_STATUS_REQUESTS_PER_SECOND:g} requests/s.")
+            # The workers share one iterator, so each stale listing is verified exactly once.
+            listings_iter = iter(stale_listings)
+            await asyncio.gather(*(
+                _verify_worker(listings_iter, results) for _ in range(RECHECK_CONCURRENCY)
+            ))
+
+    if not total:
+        logger.info("No stale active listings to re-check.")
+    elif job_queue.is_distributed():
+        logger.info(f"Queued {queued} of {total} stale listings for verification on the shared job queue.")
+    else:
+        logger.info(f"Re-check of {total} listings complete in {time.monotonic() - started_at:.1f}s: "
+                    f"{results['delisted']} delisted, {results['still_listed']} still listed, {results['failed']} failed.")
+
+
+def start_rechecker() -> AsyncIOScheduler:
     """
-    Starts the scheduler for the re-checking service.
+    Starts the scheduler for the re-checking service. Must be called from within the running event loop.
+    The first run happens immediately so stale listings are caught on boot.
     """
     scheduler = AsyncIOScheduler()
-    scheduler.add_job(recheck_listings, 'interval', hours=1)
+    scheduler.add_job(
+        recheck_listings, 'interval',
+        minutes=RECHECK_INTERVAL_MINUTES,
+        next_run_time=datetime.now(timezone.utc),
+        coalesce=True,
+        max_instances=1
+    )
     scheduler.start()
-    logger.info("Automated re-checking service scheduled to run every hour.")
+    logger.info(f"Automated re-checking service scheduled to run every {RECHECK_INTERVAL_MINUTES} minutes.")
+    return scheduler
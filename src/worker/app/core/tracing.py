@@ -0,0 +1,192 @@
+import os
+import sys
+import time
+import asyncio
+import logging
+import contextlib
+from collections import defaultdict, deque
+
+from opentelemetry import trace, propagate, context
+from opentelemetry.sdk.resources import Resource
+from opentelemetry.sdk.trace import TracerProvider, SpanProcessor, ReadableSpan
+from opentelemetry.sdk.trace.export import BatchSpanProcessor, ConsoleSpanExporter
+from opentelemetry.instrumentation.httpx import HTTPXClientInstrumentor
+
+from . import utils
+
+# Configured in logging_config.yaml
+logger = logging.getLogger("tracing")
+
+# --- Configuration ---
+TRACING_ENABLED = os.getenv("TRACING_ENABLED", "1") == "1"
+# 'file' (default), 'console', 'otlp' (uses the standard OTEL_EXPORTER_OTLP_* variables) or 'none'
+TRACING_EXPORTER = os.getenv("TRACING_EXPORTER", "file").lower()
+TRACING_FILE = os.getenv("TRACING_FILE", "traces.jsonl")
+TRACING_REPORT_SECONDS = float(os.getenv("TRACING_REPORT_SECONDS", 300))
+# Number of most recent samples per stage used for the p50/p99 report
+TRACING_STAGE_SAMPLES = int(os.getenv("TRACING_STAGE_SAMPLES", 2000))
+
+# Span attribute marking a span as one stage of the listing -> alert pipeline
+STAGE_ATTRIBUTE = "cartel.stage"
+STAGES = ("detect", "persist", "alt_enrichment", "classify", "record", "queue_wait", "discord_send", "time_to_alert")
+
+# Resolves to a no-op tracer until setup_tracing() installs a provider
+tracer = trace.get_tracer("cards_cartel.worker")
+
+class StageLatencyRecorder(SpanProcessor):
+    """Keeps a rolling window of durations for every span tagged with a pipeline stage."""
+    def __init__(self, max_samples: int = TRACING_STAGE_SAMPLES):
+        self._samples = defaultdict(lambda: deque(maxlen=max_samples))
+
+    def record(self, stage: str, seconds: float):
+        self._samples[stage].append(seconds)
+
+    def on_end(self, span: ReadableSpan):
+        stage = span.attributes.get(STAGE_ATTRIBUTE) if span.attributes else None
+        if stage and span.end_time and span.start_time:
+            self.record(stage, (span.end_time - span.start_time) / 1e9)
+
+    def percentiles(self) -> dict:
+        """Returns {stage: (count, p50, p99)} in seconds, in pipeline order."""
+        summary = {}
+        for stage in sorted(self._samples, key=lambda s: STAGES.index(s) if s in STAGES else len(STAGES)):
+            samples = sorted(self._samples[stage])
+            if samples:
+                summary[stage] = (len(samples), samples[len(samples) // 2], samples[min(len(samples) - 1, int(len(samples) * 0.99))])
+        return summary
+
+stage_recorder = None
+
+def _span_line_formatter(span: ReadableSpan) -> str:
+    return span.to_json(indent=None) + "\n"
+
+class FileSpanExporter(ConsoleSpanExporter):
+    """Appends spans to a file, one JSON object per line, and closes it when the provider shuts down."""
+    def __init__(self, path: str):
+        self._file = open(path, "a", encoding="utf8")
+        super().__init__(out=self._file, formatter=_span_line_formatter)
+
+    def shutdown(self):
+        self._file.close()
+
+def setup_tracing(http_clients: list) -> TracerProvider | None:
+    """
+    Installs the global tracer provider with the configured exporter and instruments the
+    given module-level httpx clients, so every ME/ALT/CoinGecko call gets its own span.
+    Shut the returned provider down on exit to flush the last spans and close the exporter.
+    """
+    global stage_recorder
+    if not TRACING_ENABLED:
+        logger.info("Tracing is disabled.")
+        return None
+
+    provider = TracerProvider(resource=Resource.create({"service.name": "cards-cartel-worker"}))
+    stage_recorder = StageLatencyRecorder()
+    provider.add_span_processor(stage_recorder)
+
+    if TRACING_EXPORTER == "file":
+        exporter = FileSpanExporter(TRACING_FILE)
+    elif TRACING_EXPORTER == "console":
+        exporter = ConsoleSpanExporter(out=sys.stdout, formatter=_span_line_formatter)
+    elif TRACING_EXPORTER == "otlp":
+        from opentelemetry.exporter.otlp.proto.grpc.trace_exporter import OTLPSpanExporter
+        exporter = OTLPSpanExporter()
+    else:
+        exporter = None
+    if exporter:
+        provider.add_span_processor(BatchSpanProcessor(exporter))
+
+    trace.set_tracer_provider(provider)
+    for client in http_clients:
+        HTTPXClientInstrumentor.instrument_client(client, tracer_provider=provider)
+
+    logger.info(f"Tracing enabled with '{TRACING_EXPORTER}' exporter.")
+    return provider
+
+def stage_span(stage: str, **attributes):
+    """Starts a child span of the current context tagged as the given pipeline stage."""
+    return tracer.start_as_current_span(stage, attributes={STAGE_ATTRIBUTE: stage, **attributes})
+
+def _listed_at_ns(listing: dict) -> int | None:
+    listed_at = utils.to_utc_datetime(listing.get('listed_at'))
+    if listed_at is None:
+        return None
+    listed_at_ns = int(listed_at.timestamp() * 1e9)
+    # Guard against clock skew: a listing can't have been listed in our future
+    return min(listed_at_ns, time.time_ns())
+
+@contextlib.contextmanager
+def listing_span(listing: dict, detected_at_ns: int):
+    """
+    Root span for one listing, starting at its ME listed_at. A 'detect' child span covers the
+    gap between the listing going live and the watchdog picking it up.
+    """
+    listed_at_ns = _listed_at_ns(listing) or detected_at_ns
+    attributes = {
+        "listing.id": listing.get('listing_id') or "",
+        "listing.name": listing.get('name') or "",
+        "listing.token_mint": listing.get('token_mint') or "",
+    }
+    with tracer.start_as_current_span("listing", start_time=listed_at_ns, attributes=attributes) as span:
+        detect_span = tracer.start_span("detect", start_time=listed_at_ns, attributes={STAGE_ATTRIBUTE: "detect"})
+        detect_span.end(end_time=max(detected_at_ns, listed_at_ns))
+        yield span
+
+def inject_context() -> dict:
+    """Serializes the current trace context (W3C traceparent) so another task or process can continue it."""
+    carrier = {}
+    propagate.inject(carrier)
+    return carrier
+
+@contextlib.contextmanager
+def attached_context(carrier: dict | None):
+    """Makes a context captured with inject_context() current for the duration of the block."""
+    token = context.attach(propagate.extract(carrier or {}))
+    try:
+        yield
+    finally:
+        context.detach(token)
+
+def queue_context(listing: dict) -> dict:
+    """Extra fields for a snipe_queue item so the consumer can continue the listing's trace."""
+    return {
+        'trace_context': inject_context(),
+        'enqueued_at_ns': time.time_ns(),
+        'listed_at_ns': _listed_at_ns(listing),
+    }
+
+@contextlib.contextmanager
+def alert_delivery_span(snipe_data: dict):
+    """
+    Continues the listing's trace in the Discord consumer: records how long the alert sat in
+    snipe_queue, spans the send itself and, once sent, the overall time-to-alert.
+    """
+    parent_context = propagate.extract(snipe_data.get('trace_context') or {})
+    enqueued_at_ns = snipe_data.get('enqueued_at_ns')
+    if enqueued_at_ns:
+        wait_span = tracer.start_span("queue_wait", context=parent_context, start_time=enqueued_at_ns,
+                                      attributes={STAGE_ATTRIBUTE: "queue_wait"})
+        wait_span.end()
+
+    with tracer.start_as_current_span("discord_send", context=parent_context,
+                                      attributes={STAGE_ATTRIBUTE: "discord_send"}) as span:
+        yield span
+
+    listed_at_ns = snipe_data.get('listed_at_ns')
+    if listed_at_ns and stage_recorder:
+        stage_recorder.record("time_to_alert", (time.time_ns() - listed_at_ns) / 1e9)
+
+def format_stage_report() -> str:
+    if not stage_recorder:
+        return "tracing disabled"
+    parts = [
+        f"{stage} p50={p50 * 1000:.0f}ms p99={p99 * 1000:.0f}ms (n={count})"
+        for stage, (count, p50, p99) in stage_recorder.percentiles().items()
+    ]
+    return " | ".join(parts) or "no samples yet"
+
+async def report_stage_latencies():
+    """Periodically logs the p50/p99 time-to-alert breakdown by stage."""
+    while True:
+        await asyncio.sleep(TRACING_REPORT_SECONDS)
+        logger.info(f"Time-to-alert by stage: {format_stage_report()}")
@@ -1,8 +1,13 @@
 import httpx
 import time
+import heapq
 import asyncio
+import itertools
+import contextlib
 import logging
-from datetime import datetime, timedelta
+from datetime import datetime, timedelta, timezone
+
+from . import metrics
 
 logger = logging.getLogger(__name__)
 
@@ -15,6 +20,105 @@ CACHE_DURATION_SECONDS = 300  # 5 minutes
 # Use a single, reusable async client for performance
 async_client = httpx.AsyncClient(timeout=10)
 
+# --- Metrics ---
+SOL_PRICE_CACHE = metrics.Counter("cartel_sol_price_cache_total", "SOL price cache lookups.", ["result"])
+_PRICE_CACHE_HIT = SOL_PRICE_CACHE.labels(result="hit")
+_PRICE_CACHE_REFRESH = SOL_PRICE_CACHE.labels(result="refresh")
+_PRICE_CACHE_REFRESH_FAILED = SOL_PRICE_CACHE.labels(result="refresh_failed")
+
+class AsyncRateLimiter:
+    """
+    Spaces out callers of acquire() so that at most `rate_per_second` calls proceed per second,
+    no matter how many coroutines are waiting concurrently.
+    """
+    def __init__(self, rate_per_second: float):
+        self._interval = 1.0 / rate_per_second
+        self._next_slot = 0.0
+
+    async def acquire(self):
+        now = time.monotonic()
+        wait = self._next_slot - now
+        self._next_slot = max(now, self._next_slot) + self._interval
+        if wait > 0:
+            await asyncio.sleep(wait)
+
+class PrioritySemaphore:
+    """
+    An asyncio semaphore that hands freed slots to the waiter with the lowest priority value
+    (FIFO within a priority), so live traffic always jumps ahead of background work.
+    Use as `async with semaphore.slot(priority):`.
+    """
+    def __init__(self, value: int):
+        self._value = value
+        self._waiters = []  # heap of (priority, sequence, future)
+        self._sequence = itertools.count()
+
+    def locked(self) -> bool:
+        return self._value == 0
+
+    @property
+    def available(self) -> int:
+        return self._value
+
+    @property
+    def waiting(self) -> int:
+        return sum(1 for _, _, future in self._waiters if not future.done())
+
+    @contextlib.asynccontextmanager
+    async def slot(self, priority: int = 0):
+        await self._acquire(priority)
+        try:
+            yield
+        finally:
+            self._release()
+
+    async def _acquire(self, priority: int):
+        if self._value > 0 and not self._waiters:
+            self._value -= 1
+            return
+        future = asyncio.get_running_loop().create_future()
+        heapq.heappush(self._waiters, (priority, next(self._sequence), future))
+        try:
+            await future
+        except asyncio.CancelledError:
+            # If the slot was already handed to us, pass it on instead of leaking it.
+            if future.done() and not future.cancelled():
+                self._release()
+            raise
+
+    def _release(self):
+        while self._waiters:
+            _, _, future = heapq.heappop(self._waiters)
+            if not future.done():
+                future.set_result(None)  # Transfer the slot directly to the next waiter
+                return
+        self._value += 1
+
+# Order in which queued alerts are delivered; unknown levels go last
+ALERT_LEVEL_PRIORITY = {'GOLD': 0, 'HIGH': 1, 'INFO': 2}
+
+class AlertQueue(asyncio.Queue):
+    """
+    The snipe_queue: hands out alerts by level (GOLD, then HIGH, then INFO) and FIFO within a
+    level, so a GOLD alert never waits behind a backlog of INFO ones.
+    """
+    def _init(self, maxsize):
+        self._queue = []  # heap of (priority, sequence, alert)
+        self._sequence = itertools.count()
+
+    def _put(self, item):
+        priority = ALERT_LEVEL_PRIORITY.get(str(item.get('alert_level')).upper(), len(ALERT_LEVEL_PRIORITY))
+        heapq.heappush(self._queue, (priority, next(self._sequence), item))
+
+    def _get(self):
+        return heapq.heappop(self._queue)[2]
+
+    def peek(self):
+        """The alert get_nowait() would return next, left on the queue. Raises asyncio.QueueEmpty."""
+        if not self._queue:
+            raise asyncio.QueueEmpty
+        return self._queue[0][2]
+
 async def _fetch_sol_to_usdc_price():
     """
     Internal async helper to get the current SOL price in USDC from CoinGecko.
@@ -45,9 +149,13 @@ async def get_price_in_both_currencies(amount: float, currency: str) -> dict | N
             if new_price is not None:
                 _cached_sol_price = new_price
                 _last_fetch_time = current_time
+                _PRICE_CACHE_REFRESH.inc()
                 logger.info(f"New SOL price cached: ${_cached_sol_price:.2f}")
             else:
+                _PRICE_CACHE_REFRESH_FAILED.inc()
                 logger.warning("Failed to fetch new price. Using previous cached value (if available).")
+        else:
+            _PRICE_CACHE_HIT.inc()
 
     # --- Conversion Logic ---
     if _cached_sol_price == 0.0:
@@ -63,3 +171,31 @@ async def get_price_in_both_currencies(amount: float, currency: str) -> dict | N
             return {'price_sol': amount / _cached_sol_price, 'price_usdc': amount}
     return None
 
+
+
+def to_utc_datetime(value) -> datetime | None:
+    """
+    Normalizes a timestamp coming from the database (a datetime from Postgres or an
+    ISO string from SQLite) into a timezone-aware UTC datetime. Returns None if it can't be parsed.
+    """
+    if value is None:
+        return None
+    if isinstance(value, datetime):
+        parsed = value
+    else:
+        try:
+            parsed = datetime.fromisoformat(str(value).replace('Z', '+00:00'))
+        except ValueError:
+            return None
+    if parsed.tzinfo is None:
+        parsed = parsed.replace(tzinfo=timezone.utc)
+    return parsed
+
+def has_fresh_valuation(listing: dict, max_age: timedelta) -> bool:
+    """True if the listing has a stored ALT valuation that is younger than max_age."""
+    if listing.get('alt_value') is None:
+        return False
+    last_analyzed_at = to_utc_datetime(listing.get('last_analyzed_at'))
+    if last_analyzed_at is None:
+        return False
+    return datetime.now(timezone.utc) - last_analyzed_at <= max_age
@@ -0,0 +1,111 @@
+import os
+import time
+import httpx
+import asyncio
+import logging
+
+from . import metrics
+
+logger = logging.getLogger(__name__)
+
+# --- Configuration ---
+# Comma-separated Discord webhook URLs; every alert message is posted to each of them
+DISCORD_WEBHOOK_URLS = [url.strip() for url in os.getenv("DISCORD_WEBHOOK_URLS", "").split(",") if url.strip()]
+WEBHOOK_MAX_ATTEMPTS = int(os.getenv("WEBHOOK_MAX_ATTEMPTS", 5))
+WEBHOOK_RETRY_SECONDS = float(os.getenv("WEBHOOK_RETRY_SECONDS", 1))
+
+# Create a single, reusable async client; its keep-alive connections are shared by all webhooks
+async_client = httpx.AsyncClient(
+    timeout=10,
+    limits=httpx.Limits(max_connections=max(len(DISCORD_WEBHOOK_URLS), 1) * 2, keepalive_expiry=60),
+)
+
+# --- Metrics ---
+WEBHOOK_REQUESTS = metrics.Counter("cartel_webhook_requests_total", "Discord webhook executions by outcome.", ["outcome"])
+WEBHOOK_SECONDS = metrics.Histogram("cartel_webhook_request_seconds", "Latency of one Discord webhook execution.")
+_WEBHOOK_OK = WEBHOOK_REQUESTS.labels(outcome="ok")
+_WEBHOOK_RATE_LIMITED = WEBHOOK_REQUESTS.labels(outcome="rate_limited")
+_WEBHOOK_ERROR = WEBHOOK_REQUESTS.labels(outcome="error")
+
+# A 429 with the global flag set holds back every webhook until this monotonic time
+_global_blocked_until = 0.0
+
+class WebhookError(Exception):
+    """A message could not be delivered to one or more webhooks."""
+
+class Webhook:
+    """
+    One Discord webhook with its own rate-limit bucket. Requests to it go out one at a time,
+    waiting out the bucket whenever X-RateLimit-Remaining reaches 0 or Discord answers 429.
+    """
+    def __init__(self, url: str):
+        self.url = url
+        # The webhook id; the URL itself carries the token and is never logged
+        self.name = url.rstrip('/').rsplit('/', 2)[-2]
+        self._lock = asyncio.Lock()
+        self._blocked_until = 0.0
+
+    def _track(self, response: httpx.Response):
+        if response.headers.get('X-RateLimit-Remaining') == '0':
+            reset_after = float(response.headers.get('X-RateLimit-Reset-After', WEBHOOK_RETRY_SECONDS))
+            self._blocked_until = time.monotonic() + reset_after
+
+    def _rate_limited(self, response: httpx.Response) -> float:
+        """Records a 429 and returns how long to wait before retrying."""
+        global _global_blocked_until
+        try:
+            retry_after = float(response.json().get('retry_after', WEBHOOK_RETRY_SECONDS))
+        except ValueError:
+            retry_after = float(response.headers.get('Retry-After', WEBHOOK_RETRY_SECONDS))
+        blocked_until = time.monotonic() + retry_after
+        if response.headers.get('X-RateLimit-Global', '').lower() == 'true':
+            _global_blocked_until = max(_global_blocked_until, blocked_until)
+        self._blocked_until = max(self._blocked_until, blocked_until)
+        return retry_after
+
+    async def execute(self, payload: dict):
+        """Posts one message, retrying rate limits, server errors and network errors."""
+        async with self._lock:
+            delay = WEBHOOK_RETRY_SECONDS
+            for attempt in range(1, WEBHOOK_MAX_ATTEMPTS + 1):
+                wait = max(self._blocked_until, _global_blocked_until) - time.monotonic()
+                if wait > 0:
+                    await asyncio.sleep(wait)
+                try:
+                    with WEBHOOK_SECONDS.time():
+                        response = await async_client.post(self.url, json=payload)
+                except httpx.RequestError as e:
+                    _WEBHOOK_ERROR.inc()
+                    error = repr(e)
+                else:
+                    self._track(response)
+                    if response.is_success:
+                        _WEBHOOK_OK.inc()
+                        return
+                    if response.status_code == 429:
+                        _WEBHOOK_RATE_LIMITED.inc()
+                        retry_after = self._rate_limited(response)
+                        logger.warning(f"Webhook {self.name} rate limited, retrying in {retry_after:.2f}s (attempt {attempt}/{WEBHOOK_MAX_ATTEMPTS}).")
+                        continue # The wait is taken at the top of the loop
+                    _WEBHOOK_ERROR.inc()
+                    error = f"status {response.status_code}: {response.text}"
+                    if response.status_code < 500:
+                        raise WebhookError(f"Webhook {self.name} rejected the message with {error}")
+                logger.warning(f"Webhook {self.name} failed on attempt {attempt}/{WEBHOOK_MAX_ATTEMPTS}: {error}")
+                if attempt < WEBHOOK_MAX_ATTEMPTS:
+                    await asyncio.sleep(delay)
+                    delay *= 2
+            raise WebhookError(f"Webhook {self.name} failed after {WEBHOOK_MAX_ATTEMPTS} attempts.")
+
+webhooks = [Webhook(url) for url in DISCORD_WEBHOOK_URLS]
+
+async def send_alerts(content: str, embeds: list) -> None:
+    """
+    Posts one message with the given discord.Embed objects to every configured webhook at once.
+    Raises WebhookError if any of them could not be delivered to.
+    """
+    payload = {"content": content, "embeds": [embed.to_dict() for embed in embeds]}
+    results = await asyncio.gather(*(webhook.execute(payload) for webhook in webhooks), return_exceptions=True)
+    failures = [f"{webhook.name}: {result}" for webhook, result in zip(webhooks, results) if isinstance(result, BaseException)]
+    if failures:
+        raise WebhookError(f"{len(failures)}/{len(webhooks)} webhooks failed ({'; '.join(failures)})")
@@ -1,17 +1,26 @@
 import os
+import re
+import time
 import discord
 import logging
 import asyncio
+import contextlib
+from datetime import timedelta
 from typing import cast, Callable, Awaitable, Coroutine, Any
 from discord import app_commands, ui, SelectOption
 from discord.ext import commands
 
 # Project imports
 from .core.discord_embeds import create_snipe_embed, create_card_check_embed
-from .core.magic_eden import check_listing_status_async
-from .core.alt_data import get_alt_data_async
-from database import main as database
+from .core.magic_eden import check_listing_status_async, status_rate_limiter
+from .core.alt_data import get_alt_data_async, ALT_API_SEMAPHORE
+from database import aio as db
+from database import write_buffer
+from database import deal_board
 from .core import utils
+from .core import tracing
+from .core import metrics
+from .core import webhooks
 
 logger = logging.getLogger(__name__)
 
@@ -26,6 +35,44 @@ ROLE_ID = int(os.getenv("DISCORD_ROLE_ID", 0))
 if not BOT_TOKEN or not CHANNEL_ID or not ROLE_ID:
     raise ValueError("DISCORD_BOT_TOKEN, DISCORD_CHANNEL_ID, and DISCORD_ROLE_ID must be set in the .env file.")
 
+# "bot" posts alerts through this gateway client; "webhook" posts them to DISCORD_WEBHOOK_URLS
+# (core/webhooks.py) from the worker, so they keep flowing while the gateway reconnects.
+ALERT_TRANSPORT = os.getenv("ALERT_TRANSPORT", "bot").lower()
+if ALERT_TRANSPORT not in ("bot", "webhook"):
+    raise ValueError(f"ALERT_TRANSPORT must be 'bot' or 'webhook', not '{ALERT_TRANSPORT}'.")
+if ALERT_TRANSPORT == "webhook" and not webhooks.DISCORD_WEBHOOK_URLS:
+    raise ValueError("DISCORD_WEBHOOK_URLS must be set when ALERT_TRANSPORT is 'webhook'.")
+
+# A select menu holds at most 25 options, so /cartel_deals pages through the deal list
+DEALS_PER_PAGE = 25
+
+# /cartel_inspect_bulk: mints per command and lookups in flight at once. ME status checks share
+# magic_eden.status_rate_limiter with the rechecker, and ALT lookups take alt_data.ALT_API_SEMAPHORE
+# slots at INSPECT_ALT_PRIORITY: behind live listings, ahead of the backlog drain.
+INSPECT_MAX_MINTS = int(os.getenv("INSPECT_MAX_MINTS", 100))
+INSPECT_CONCURRENCY = int(os.getenv("INSPECT_CONCURRENCY", 10))
+INSPECT_ALT_PRIORITY = 5
+# A stored ALT valuation younger than this is shown as is, without asking ALT again
+INSPECT_VALUATION_MAX_AGE_HOURS = float(os.getenv("INSPECT_VALUATION_MAX_AGE_HOURS", 24))
+INSPECT_LINES_PER_PAGE = 15
+INSPECT_MAX_FILE_BYTES = 64 * 1024
+
+# Discord's limits for one message; alerts that queue up behind a send go out together within them
+DISCORD_MAX_EMBEDS_PER_MESSAGE = 10
+DISCORD_MAX_EMBED_CHARS_PER_MESSAGE = 6000
+
+# --- Metrics ---
+DISCORD_ALERTS = metrics.Counter("cartel_discord_alerts_total", "Snipe alerts handled by the Discord consumer.", ["level", "outcome"])
+DISCORD_SEND_SECONDS = metrics.Histogram("cartel_discord_send_seconds", "Latency of sending one alert message to Discord.")
+DISCORD_ALERTS_PER_MESSAGE = metrics.Histogram("cartel_discord_alerts_per_message", "Alerts packed into one Discord message.",
+                                               buckets=tuple(range(1, DISCORD_MAX_EMBEDS_PER_MESSAGE + 1)))
+
+# Posts one alert message: send(content, embeds)
+AlertSender = Callable[[str, list[discord.Embed]], Awaitable[Any]]
+
+# Solana addresses are 32-44 base58 characters
+MINT_ADDRESS_PATTERN = re.compile(r"[1-9A-HJ-NP-Za-km-z]{32,44}")
+
 # --- Helper function to reconstruct embed data ---
 async def _reconstruct_embed_data(deal_data: dict):
     """
@@ -74,6 +121,91 @@ async def _reconstruct_embed_data(deal_data: dict):
     
     return listing_data, snipe_details
 
+def _card_attributes(card_data: dict) -> dict:
+    """The trait_type -> value map of a Magic Eden token's attributes."""
+    attrs = card_data.get('attributes') or []
+    if not isinstance(attrs, list):
+        attrs = []
+
+    attributes = {}
+    for attr in attrs:
+        if isinstance(attr, dict):
+            trait = attr.get('trait_type')
+            value = attr.get('value')
+            if trait is not None:
+                attributes[trait] = value
+    return attributes
+
+# --- Bulk inspect ---
+
+def _parse_mints(text: str) -> tuple[list[str], list[str]]:
+    """Splits text on whitespace, commas and semicolons into (unique mint addresses, invalid entries)."""
+    mints, invalid = [], []
+    for token in re.split(r"[\s,;]+", text):
+        if token:
+            (mints if MINT_ADDRESS_PATTERN.fullmatch(token) else invalid).append(token)
+    return list(dict.fromkeys(mints)), invalid
+
+def _short_mint(mint_address: str) -> str:
+    return f"`{mint_address[:4]}…{mint_address[-4:]}`"
+
+async def _inspect_mint(mint_address: str) -> str:
+    """
+    One summary line for a mint: its live Magic Eden status and price, and its ALT value.
+    A fresh valuation stored on our own listing row is used before asking ALT.
+    """
+    stored = await write_buffer.get_listing_by_mint(mint_address)
+    await status_rate_limiter.acquire()
+    card_data = await check_listing_status_async(mint_address, retries=3)
+    if card_data is None:
+        return f"{_short_mint(mint_address)} ⚠️ Magic Eden lookup failed"
+    if card_data == 'not_found' or isinstance(card_data, str):
+        return f"{_short_mint(mint_address)} ❔ not found"
+
+    name = (card_data.get('name') or (stored or {}).get('name') or "Unknown Card")[:60]
+    line = f"[{_short_mint(mint_address)}](https://magiceden.io/item-details/{mint_address}) **{name}**"
+
+    alt_value = None
+    if stored and utils.has_fresh_valuation(stored, timedelta(hours=INSPECT_VALUATION_MAX_AGE_HOURS)):
+        alt_value = stored['alt_value']
+    else:
+        attributes = _card_attributes(card_data)
+        cert_id = attributes.get('Grading ID')
+        grade_num = attributes.get('GradeNum')
+        company = attributes.get('Grading Company')
+        if cert_id and grade_num and company:
+            async with ALT_API_SEMAPHORE.slot(INSPECT_ALT_PRIORITY):
+                alt_data = await get_alt_data_async(cert_id, grade_num, company, retries=3)
+            if alt_data:
+                alt_value = alt_data.get('alt_value')
+
+    price_usd = None
+    if card_data.get('listStatus') == 'listed' and card_data.get('price'):
+        prices = await utils.get_price_in_both_currencies(card_data['price'], 'SOL')
+        price_usd = prices['price_usdc'] if prices else None
+        line += f" — 🟢 {card_data['price']:.2f} SOL" + (f" (${price_usd:,.2f})" if price_usd else "")
+    else:
+        line += " — ⚫ unlisted"
+
+    line += f" • ALT ${alt_value:,.2f}" if alt_value else " • ALT N/A"
+    if alt_value and price_usd:
+        line += f" • {(price_usd - alt_value) / alt_value * 100:+.1f}%"
+    return line
+
+async def inspect_mints(mint_addresses: list[str]) -> list[str]:
+    """Summary lines for many mints, in order, looked up INSPECT_CONCURRENCY at a time."""
+    semaphore = asyncio.Semaphore(INSPECT_CONCURRENCY)
+
+    async def inspect(mint_address: str) -> str:
+        async with semaphore:
+            try:
+                return await _inspect_mint(mint_address)
+            except Exception as e:
+                logger.error(f"Bulk inspect of {mint_address} failed: {e}", exc_info=True)
+                return f"{_short_mint(mint_address)} ⚠️ lookup failed"
+
+    return await asyncio.gather(*(inspect(mint_address) for mint_address in mint_addresses))
+
 # --- Interactive UI Components ---
 
 class DealSelect(ui.Select):
@@ -82,12 +214,13 @@ class DealSelect(ui.Select):
             SelectOption(label=deal['name'][:100], value=deal['listing_id'])
             for deal in deals
         ]
-        super().__init__(placeholder="Select a deal to view details...", min_values=1, max_values=1, options=options)
+        super().__init__(placeholder="Select a deal to view details...", min_values=1, max_values=1, options=options, row=0)
 
     async def callback(self, interaction: discord.Interaction):
         await interaction.response.defer(ephemeral=True, thinking=True)
         listing_id = self.values[0]
-        deal_data = await asyncio.to_thread(database.get_listing_by_id, listing_id)
+        # The deal may have been delisted and archived since the menu was sent
+        deal_data = await write_buffer.get_listing_by_id(listing_id) or await db.get_listing_history_by_id(listing_id)
         
         if not deal_data:
             await interaction.followup.send("Sorry, I couldn't find the details for that deal.", ephemeral=True)
@@ -99,24 +232,169 @@ class DealSelect(ui.Select):
         await interaction.followup.send(embed=embed, ephemeral=True)
 
 class DealSelectorView(ui.View):
-    def __init__(self, deals: list[dict]):
+    """One page of deals; Previous/Next fetch the neighbouring pages from the page's cursors."""
+    def __init__(self, categories: list[str], category_name: str, page: deal_board.DealPage, page_number: int = 1):
         super().__init__(timeout=300)
-        self.add_item(DealSelect(deals))
+        self.categories = categories
+        self.category_name = category_name
+        self.page = page
+        self.page_number = page_number
+        self.add_item(DealSelect(page.deals))
+        self.previous_page.disabled = page.before is None
+        self.next_page.disabled = page.after is None
+
+    def message(self) -> str:
+        return f"Page **{self.page_number}** of the active deals in the **{self.category_name}** category. Select one to view details."
+
+    async def _show(self, interaction: discord.Interaction, page: deal_board.DealPage, page_number: int):
+        if not page.deals:
+            await interaction.response.edit_message(content="These deals are no longer active. Run the command again for a fresh list.", view=None)
+        else:
+            view = DealSelectorView(self.categories, self.category_name, page, page_number)
+            await interaction.response.edit_message(content=view.message(), view=view)
+        self.stop()
+
+    @ui.button(label="◀ Previous", style=discord.ButtonStyle.secondary, row=1)
+    async def previous_page(self, interaction: discord.Interaction, button: ui.Button):
+        page = await deal_board.get_active_deals_page(self.categories, DEALS_PER_PAGE, before=self.page.before)
+        await self._show(interaction, page, 1 if page.before is None else self.page_number - 1)
+
+    @ui.button(label="Next ▶", style=discord.ButtonStyle.secondary, row=1)
+    async def next_page(self, interaction: discord.Interaction, button: ui.Button):
+        page = await deal_board.get_active_deals_page(self.categories, DEALS_PER_PAGE, after=self.page.after)
+        await self._show(interaction, page, self.page_number + 1)
+
+class InspectSummaryView(ui.View):
+    """Pages through a /cartel_inspect_bulk summary, INSPECT_LINES_PER_PAGE mints at a time."""
+    def __init__(self, title: str, lines: list[str]):
+        super().__init__(timeout=600)
+        self.title = title
+        self.lines = lines
+        self.page_count = max(1, -(-len(lines) // INSPECT_LINES_PER_PAGE))
+        self.page_number = 0
+        self._update_buttons()
+
+    def _update_buttons(self):
+        self.previous_page.disabled = self.page_number == 0
+        self.next_page.disabled = self.page_number >= self.page_count - 1
+
+    def embed(self) -> discord.Embed:
+        start = self.page_number * INSPECT_LINES_PER_PAGE
+        embed = discord.Embed(title=self.title, description="\n".join(self.lines[start:start + INSPECT_LINES_PER_PAGE]), color=0x0099ff)
+        embed.set_footer(text=f"Page {self.page_number + 1}/{self.page_count}")
+        return embed
+
+    async def _show(self, interaction: discord.Interaction, page_number: int):
+        self.page_number = page_number
+        self._update_buttons()
+        await interaction.response.edit_message(embed=self.embed(), view=self)
+
+    @ui.button(label="◀ Previous", style=discord.ButtonStyle.secondary)
+    async def previous_page(self, interaction: discord.Interaction, button: ui.Button):
+        await self._show(interaction, self.page_number - 1)
+
+    @ui.button(label="Next ▶", style=discord.ButtonStyle.secondary)
+    async def next_page(self, interaction: discord.Interaction, button: ui.Button):
+        await self._show(interaction, self.page_number + 1)
+
+# --- Alert Delivery ---
+
+def _alert_embed(snipe_data: dict) -> discord.Embed:
+    return create_snipe_embed(snipe_data.get('listing_data'), snipe_data.get('snipe_details'),
+                              snipe_data.get('alert_level'), snipe_data.get('duration', 0.0))
+
+def _take_queued_alerts(snipe_queue: utils.AlertQueue, batch: list[dict], embeds: list[discord.Embed]):
+    """
+    Adds alerts that queued up while the last message was sent (or held back by Discord's
+    rate limits) to the batch, highest level first, as long as they fit in one message.
+    """
+    chars = sum(len(embed) for embed in embeds)
+    while len(embeds) < DISCORD_MAX_EMBEDS_PER_MESSAGE and not snipe_queue.empty():
+        try:
+            embed = _alert_embed(snipe_queue.peek())
+        except Exception:
+            break # Left for the next iteration, which reports it on its own
+        if chars + len(embed) > DISCORD_MAX_EMBED_CHARS_PER_MESSAGE:
+            break
+        batch.append(snipe_queue.get_nowait())
+        embeds.append(embed)
+        chars += len(embed)
+
+async def _send_alerts(send: AlertSender, batch: list[dict], embeds: list[discord.Embed]):
+    # The batch is in priority order, so its first alert decides whether the role is pinged
+    ping_message = f"<@&{ROLE_ID}>" if batch[0].get('alert_level', 'INFO').upper() != 'INFO' else ""
+    try:
+        with contextlib.ExitStack() as spans:
+            for snipe_data in batch:
+                spans.enter_context(tracing.alert_delivery_span(snipe_data))
+            with DISCORD_SEND_SECONDS.time():
+                await send(ping_message, embeds)
+    except discord.errors.Forbidden as e:
+        outcome = "error"
+        logging.error(f"PERMISSION ERROR: The bot cannot send messages in channel {CHANNEL_ID}. Check bot permissions. Error: {e}")
+    except discord.errors.HTTPException as e:
+        outcome = "error"
+        logging.error(f"NETWORK ERROR: Failed to send message to Discord. Error: {e}")
+    except webhooks.WebhookError as e:
+        # Webhooks that did get the message aren't retried, so they don't see it twice
+        outcome = "error"
+        logging.error(f"WEBHOOK ERROR: {e}")
+    else:
+        outcome = "sent"
+        DISCORD_ALERTS_PER_MESSAGE.observe(len(batch))
+        logging.info(f"-> Sent {len(batch)} alert(s) to Discord: "
+                     + ", ".join(f"{snipe_data['alert_level']} {snipe_data['listing_data']['name']}" for snipe_data in batch))
+    for snipe_data in batch:
+        DISCORD_ALERTS.labels(level=snipe_data.get('alert_level'), outcome=outcome).inc()
+
+async def consume_alerts(snipe_queue: utils.AlertQueue, send: AlertSender):
+    """Delivers queued alerts through send(content, embeds), several per message, until cancelled."""
+    while True:
+        try:
+            snipe_data = await snipe_queue.get()
+        except asyncio.CancelledError:
+            logging.info("Discord consumer loop cancelled.")
+            break # Exit loop on cancellation
+        except Exception:
+            logging.exception("Unexpected error getting from snipe_queue. Continuing...")
+            await asyncio.sleep(1) # Avoid fast spinning on continuous errors
+            continue
+
+        batch = [snipe_data]
+        try:
+            embeds = [_alert_embed(snipe_data)]
+            _take_queued_alerts(snipe_queue, batch, embeds)
+            await _send_alerts(send, batch, embeds)
+        except Exception: # Catch any other unexpected errors
+            logging.exception("An unexpected error occurred in the Discord consumer loop.")
+        finally:
+            for _ in batch:
+                snipe_queue.task_done()
 
 # --- Bot Subclass for Background Task ---
 
+class GatedCommandTree(app_commands.CommandTree):
+    """Ignores slash commands while accept_interactions() is False, e.g. on a standby replica."""
+    accept_interactions: Callable[[], bool] = staticmethod(lambda: True)
+
+    async def interaction_check(self, interaction: discord.Interaction) -> bool:
+        return self.accept_interactions()
+
 class CartelBot(commands.Bot):
-    def __init__(self, snipe_queue: asyncio.Queue, *args, **kwargs):
-        super().__init__(*args, **kwargs)
+    def __init__(self, snipe_queue: utils.AlertQueue, *args, accept_interactions: Callable[[], bool] | None = None, **kwargs):
+        super().__init__(*args, tree_cls=GatedCommandTree, **kwargs)
         self.snipe_queue = snipe_queue
+        if accept_interactions:
+            self.tree.accept_interactions = accept_interactions
 
     async def setup_hook(self):
-        # This is the proper way to start a background task.
-        self.loop.create_task(self.snipe_consumer_loop())
+        if ALERT_TRANSPORT == "bot":
+            # This is the proper way to start a background task.
+            self.loop.create_task(self.snipe_consumer_loop(), name="discord:snipe_consumer")
         # Only sync when commands change to avoid rate limits.
         logging.info("Syncing Discord application commands...")
         await self.tree.sync() 
-        logging.info("Discord bot setup hook complete. Consumer loop started.")
+        logging.info(f"Discord bot setup hook complete. Alerts are sent by the {ALERT_TRANSPORT}.")
 
     async def on_ready(self):
         logging.info(f"✅ Discord bot logged in as {self.user}")
@@ -130,49 +408,21 @@ class CartelBot(commands.Bot):
         channel_name = getattr(channel, "name", str(CHANNEL_ID))
         logging.info(f"Snipe consumer ready to post in #{channel_name}.")
 
-        while True:
-            try:
-                snipe_data = await self.snipe_queue.get()
-            except asyncio.CancelledError:
-                logging.info("Discord consumer loop cancelled.")
-                break # Exit loop on cancellation
-            except Exception:
-                logging.exception("Unexpected error getting from snipe_queue. Continuing...")
-                await asyncio.sleep(1) # Avoid fast spinning on continuous errors
-                continue
-
-            try:
-                listing_data = snipe_data.get('listing_data')
-                snipe_details = snipe_data.get('snipe_details')
-                alert_level = snipe_data.get('alert_level')
-                duration = snipe_data.get('duration', 0.0)
-
-                embed = create_snipe_embed(listing_data, snipe_details, alert_level, duration)
-                ping_message = f"<@&{ROLE_ID}>" if alert_level.upper() != 'INFO' else ""
-                
-                # Cast to Messageable to satisfy static type-checkers after the runtime check above
-                messageable = cast(discord.abc.Messageable, channel)
-                await messageable.send(content=ping_message, embed=embed)
-                logging.info(f"-> Sent {alert_level} alert to Discord for: {listing_data['name']}")
-
-            except discord.errors.Forbidden as e:
-                logging.error(f"PERMISSION ERROR: The bot cannot send messages in channel {CHANNEL_ID}. Check bot permissions. Error: {e}")
-            except discord.errors.HTTPException as e:
-                logging.error(f"NETWORK ERROR: Failed to send message to Discord. Error: {e}")
-            except Exception: # Catch any other unexpected errors
-                logging.exception("An unexpected error occurred in the Discord consumer loop.")
-            finally:
-                self.snipe_queue.task_done()
+        # Cast to Messageable to satisfy static type-checkers after the runtime check above
+        messageable = cast(discord.abc.Messageable, channel)
+        # discord.py paces sends from the route's rate-limit headers and retries 429s
+        await consume_alerts(self.snipe_queue, lambda content, embeds: messageable.send(content=content, embeds=embeds))
 
 # --- Main entry point for the bot ---
 
-async def start_discord_bot(queue: asyncio.Queue, recheck_skipped_callback: Callable[[str, discord.Interaction], Coroutine[Any, Any, None]]):
+async def start_discord_bot(queue: utils.AlertQueue, recheck_skipped_callback: Callable[[str, discord.Interaction], Coroutine[Any, Any, None]],
+                            accept_interactions: Callable[[], bool] | None = None):
     intents = discord.Intents.default()
     intents.message_content = True # If you plan commands or need message content
     intents.members = True         # Required for Server Members Intent
     intents.presences = True       # Required for Presence Intent
     
-    bot = CartelBot(snipe_queue=queue, command_prefix="!", intents=intents)
+    bot = CartelBot(snipe_queue=queue, command_prefix="!", intents=intents, accept_interactions=accept_interactions)
     
     @bot.tree.command(name="cartel_deals", description="Lists active deals from the database.")
     @app_commands.describe(category="Which category of deals to show")
@@ -193,14 +443,14 @@ async def start_discord_bot(queue: asyncio.Queue, recheck_skipped_callback: Call
         }
         db_categories = category_map.get(category.value, [])
         
-        deals = await asyncio.to_thread(database.get_active_deals_by_category, db_categories)
+        page = await deal_board.get_active_deals_page(db_categories, DEALS_PER_PAGE)
         
-        if not deals:
+        if not page.deals:
             await interaction.followup.send(f"No active deals found for the **{category.name}** category.", ephemeral=True)
             return
             
-        view = DealSelectorView(deals)
-        await interaction.followup.send(f"Found **{len(deals)}** active deals in the **{category.name}** category. Select one to view details.", view=view, ephemeral=True)
+        view = DealSelectorView(db_categories, category.name, page)
+        await interaction.followup.send(view.message(), view=view, ephemeral=True)
 
     @bot.tree.command(name="cartel_inspect", description="Checks the status of a card by its mint address.")
     @app_commands.describe(mint_address="The mint address of the card to check.")
@@ -213,18 +463,7 @@ async def start_discord_bot(queue: asyncio.Queue, recheck_skipped_callback: Call
             await interaction.followup.send(f"Sorry, I couldn't find a card with the mint address `{mint_address}`.", ephemeral=True)
             return
 
-        attrs = card_data.get('attributes') or []
-        if not isinstance(attrs, list):
-            attrs = []
-
-        attributes = {}
-        for attr in attrs:
-            if isinstance(attr, dict):
-                trait = attr.get('trait_type')
-                value = attr.get('value')
-                if trait is not None:
-                    attributes[trait] = value
-
+        attributes = _card_attributes(card_data)
         cert_id = attributes.get('Grading ID')
         grade_num = attributes.get('GradeNum')
         company = attributes.get('Grading Company')
@@ -236,6 +475,36 @@ async def start_discord_bot(queue: asyncio.Queue, recheck_skipped_callback: Call
         embed = create_card_check_embed(card_data, alt_data)
         await interaction.followup.send(embed=embed, ephemeral=True)
 
+    @bot.tree.command(name="cartel_inspect_bulk", description="Checks many cards at once by their mint addresses.")
+    @app_commands.describe(mint_addresses=f"Up to {INSPECT_MAX_MINTS} mint addresses, separated by spaces, commas or new lines.",
+                           file="A text file of mint addresses, instead of or as well as the list.")
+    async def cartel_inspect_bulk(interaction: discord.Interaction, mint_addresses: str | None = None, file: discord.Attachment | None = None):
+        await interaction.response.defer(ephemeral=True, thinking=True)
+
+        text = mint_addresses or ""
+        if file is not None:
+            if file.size > INSPECT_MAX_FILE_BYTES:
+                await interaction.followup.send(f"That file is too large; the limit is {INSPECT_MAX_FILE_BYTES // 1024} KB.", ephemeral=True)
+                return
+            text += "\n" + (await file.read()).decode("utf-8", errors="replace")
+
+        mints, invalid = _parse_mints(text)
+        if not mints:
+            await interaction.followup.send("Please give at least one valid mint address.", ephemeral=True)
+            return
+
+        notes = []
+        if invalid:
+            notes.append(f"Skipped {len(invalid)} invalid entries, e.g. `{invalid[0][:48]}`.")
+        if len(mints) > INSPECT_MAX_MINTS:
+            notes.append(f"Only the first {INSPECT_MAX_MINTS} of {len(mints)} mints were checked.")
+            mints = mints[:INSPECT_MAX_MINTS]
+
+        started_at = time.monotonic()
+        lines = await inspect_mints(mints)
+        view = InspectSummaryView(f"Inspected {len(mints)} cards in {time.monotonic() - started_at:.1f}s", lines)
+        await interaction.followup.send("\n".join(notes) or None, embed=view.embed(), view=view, ephemeral=True)
+
     @bot.tree.command(name="cartel_recheck", description="Admin: Re-analyzes listings that were previously skipped.")
     @app_commands.checks.has_role(ROLE_ID)
     @app_commands.describe(timeframe="Re-check listings from this period that were marked 'SKIP'")
@@ -255,7 +524,7 @@ async def start_discord_bot(queue: asyncio.Queue, recheck_skipped_callback: Call
             ephemeral=True,
         )
         # Run the callback in the background
-        asyncio.create_task(recheck_skipped_callback(timeframe.value, interaction))
+        asyncio.create_task(recheck_skipped_callback(timeframe.value, interaction), name="recheck:cartel_recheck")
 
     @cartel_recheck.error
     async def cartel_recheck_error(interaction: discord.Interaction, error: app_commands.AppCommandError):
@@ -268,3 +537,6 @@ async def start_discord_bot(queue: asyncio.Queue, recheck_skipped_callback: Call
         await bot.start(str(BOT_TOKEN))
     except discord.errors.LoginFailure:
         logger.critical("❌ LOGIN FAILED: The DISCORD_BOT_TOKEN in your .env file is invalid.")
+    finally:
+        if not bot.is_closed():
+            await bot.close()
@@ -13,18 +13,55 @@ else:
 
 import time
 import asyncio
+import contextlib
 from database import main as database
+from database import aio as db
+from database import write_buffer
+from database import cache as listing_cache
+from database import deal_board
+from database import changes as change_feed
 
 # Import the new async functions
 from worker.app.core import magic_eden as me
 from worker.app.core import alt_data as alt
 from worker.app.core import utils as utils
-import discord
+from worker.app.core import rechecker
+from worker.app.core import archiver
+from worker.app.core import loop_monitor
+from worker.app.core import tracing
+from worker.app.core import metrics
+from worker.app.core import job_queue
+from worker.app.core import leader
+from worker.app.core import webhooks
+from worker.app.core import bot_ipc
 from worker.app import discord_bot as discord_bot
 from datetime import datetime, timezone, timedelta
+from collections import deque
 
-# Limit the bot to 10 concurrent requests to the ALT API
-ALT_API_SEMAPHORE = asyncio.Semaphore(10)
+# Priorities for alt.ALT_API_SEMAPHORE and the job queue; lower goes first
+LIVE_PRIORITY = 0
+BACKLOG_PRIORITY = 10
+
+# --- Reaper Configuration ---
+# How often a still-listed mint is re-verified; the 0.55s pacing between checks caps the actual rate
+REAPER_CHECK_INTERVAL_SECONDS = int(os.getenv("REAPER_CHECK_INTERVAL_SECONDS", 60))
+REAPER_MAX_BACKOFF_SECONDS = int(os.getenv("REAPER_MAX_BACKOFF_SECONDS", 3600))
+REAPER_BATCH_SIZE = int(os.getenv("REAPER_BATCH_SIZE", 20))
+# Must comfortably exceed REAPER_BATCH_SIZE * 0.55s, or claimed mints come due again mid-batch
+REAPER_LEASE_SECONDS = int(os.getenv("REAPER_LEASE_SECONDS", 120))
+REAPER_IDLE_SECONDS = 1
+
+# --- Backlog Drainer Configuration ---
+BACKLOG_BATCH_SIZE = int(os.getenv("BACKLOG_BATCH_SIZE", 20))
+BACKLOG_CONCURRENCY = int(os.getenv("BACKLOG_CONCURRENCY", 3))
+BACKLOG_DRAIN_INTERVAL_SECONDS = int(os.getenv("BACKLOG_DRAIN_INTERVAL_SECONDS", 300))
+# 'NEW' rows younger than this are assumed to still be in flight in the watchdog
+BACKLOG_GRACE_SECONDS = int(os.getenv("BACKLOG_GRACE_SECONDS", 120))
+# A 'NEW' row claimed this many times without being enriched is moved to 'SKIP' instead of retried forever
+BACKLOG_MAX_CLAIMS = int(os.getenv("BACKLOG_MAX_CLAIMS", 5))
+
+# During /cartel_recheck, a stored ALT valuation younger than this is re-scored locally instead of re-fetched
+RECHECK_VALUATION_MAX_AGE_HOURS = float(os.getenv("RECHECK_VALUATION_MAX_AGE_HOURS", 24))
 
 # --- Setup Logging ---
 # Get the directory of the current script to build a reliable path to the config file
@@ -36,58 +73,196 @@ with open(config_path, 'r') as f:
 logger = logging.getLogger(__name__)
 if os.path.exists('.env.local'): logger.info("Loading configuration from .env.local for local testing.")
 
-verification_queue = asyncio.Queue()
+# --- Metrics ---
+LISTINGS_DETECTED = metrics.Counter("cartel_listings_detected_total", "New listings found by the watchdog.")
+LISTINGS_PROCESSED = metrics.Counter("cartel_listings_processed_total", "process_listing outcomes.", ["result"])
+REAPER_DUE = metrics.Gauge("cartel_reaper_due_mints", "Scheduled mints whose verification is due.")
+PROCESS_SECONDS = metrics.Histogram("cartel_process_listing_seconds", "End-to-end duration of process_listing (excluding cache hits).")
+_PROCESSED_DEAL = LISTINGS_PROCESSED.labels(result="deal")
+_PROCESSED_NO_DEAL = LISTINGS_PROCESSED.labels(result="no_deal")
+_PROCESSED_NO_ALT_DATA = LISTINGS_PROCESSED.labels(result="no_alt_data")
+_PROCESSED_CACHE_HIT = LISTINGS_PROCESSED.labels(result="cache_hit")
+_PROCESSED_ERROR = LISTINGS_PROCESSED.labels(result="error")
+# Detection timestamps from the last minute, for the new-listings-per-minute gauge
+_recent_detections = deque()
+
+def _new_listings_last_minute() -> int:
+    cutoff = time.monotonic() - 60
+    while _recent_detections and _recent_detections[0] < cutoff:
+        _recent_detections.popleft()
+    return len(_recent_detections)
 
-async def reaper(verification_queue: asyncio.Queue, snipe_queue: asyncio.Queue):
-    """Pulls a mint address from the queue, verifies its status, and acts on it."""
+def register_runtime_metrics(snipe_queue: asyncio.Queue, monitor: loop_monitor.LoopMonitor | None):
+    """Registers scrape-time gauges over the worker's queues, semaphores and monitors."""
+    metrics.CallbackGauge("cartel_new_listings_per_minute", "New listings detected in the last 60 seconds.", _new_listings_last_minute)
+    metrics.CallbackGauge("cartel_snipe_queue_size", "Alerts waiting for the Discord consumer.", snipe_queue.qsize)
+    metrics.CallbackGauge("cartel_alt_semaphore_in_use", "ALT API slots currently held.",
+                          lambda: alt.ALT_API_SEMAPHORE_SIZE - alt.ALT_API_SEMAPHORE.available)
+    metrics.CallbackGauge("cartel_alt_semaphore_waiting", "Callers waiting for an ALT API slot.", lambda: alt.ALT_API_SEMAPHORE.waiting)
+    metrics.CallbackGauge("cartel_stage_latency_seconds", "Rolling time-to-alert percentiles by pipeline stage.",
+                          lambda: {
+                              (stage, quantile): value
+                              for stage, (_, p50, p99) in (tracing.stage_recorder.percentiles() if tracing.stage_recorder else {}).items()
+                              for quantile, value in (("0.5", p50), ("0.99", p99))
+                          },
+                          ["stage", "quantile"])
+    if monitor:
+        metrics.CallbackGauge("cartel_loop_lag_seconds", "Most recent event-loop lag sample.", lambda: monitor.last_lag)
+        metrics.CallbackCounter("cartel_loop_stalls_total", "Event-loop stalls since startup.", lambda: monitor.stall_count)
+        metrics.CallbackGauge("cartel_thread_pool_queue_depth", "to_thread calls waiting for a worker thread.", monitor.thread_pool_queue_depth)
+        metrics.CallbackGauge("cartel_tasks", "Live asyncio tasks by subsystem.", lambda: dict(monitor.count_tasks()), ["subsystem"])
+    metrics.CallbackGauge("cartel_write_buffer_pending", "Listing updates waiting to be flushed.", write_buffer.buffer.pending)
+    metrics.CallbackCounter("cartel_write_buffer_writes_total", "Listing updates buffered since startup.", lambda: write_buffer.buffer.writes)
+    metrics.CallbackCounter("cartel_write_buffer_rows_flushed_total", "Coalesced rows written by the write buffer.", lambda: write_buffer.buffer.rows_flushed)
+    metrics.CallbackCounter("cartel_write_buffer_flush_errors_total", "Write buffer flushes that failed and were retried.", lambda: write_buffer.buffer.flush_errors)
+    metrics.CallbackCounter("cartel_listing_cache_hits_total", "Listing lookups served from the in-process cache.", lambda: listing_cache.listings.hits)
+    metrics.CallbackCounter("cartel_listing_cache_misses_total", "Listing lookups that went to the database.", lambda: listing_cache.listings.misses)
+    metrics.CallbackGauge("cartel_listing_cache_size", "Listings held in the in-process cache.", lambda: len(listing_cache.listings))
+    metrics.CallbackGauge("cartel_deal_board_size", "Active deals held on the in-memory deal board.", lambda: len(deal_board.board))
+    metrics.CallbackCounter("cartel_deal_board_rebuilds_total", "Full rebuilds of the deal board from the database.", lambda: deal_board.board.rebuilds)
+    metrics.CallbackCounter("cartel_deal_board_refreshes_total", "Incremental deal board refreshes of listings written here.", lambda: deal_board.board.refreshes)
+    metrics.CallbackCounter("cartel_change_feed_events_total", "Listing change events received from the database.", lambda: change_feed.feed.events)
+    metrics.CallbackCounter("cartel_change_feed_resyncs_total", "Times the change feed (re)connected and local views started over.", lambda: change_feed.feed.resyncs)
+    metrics.CallbackGauge("cartel_db_pool_checked_out", "Async database pool connections in use.", db.engine.sync_engine.pool.checkedout)
+    database.query_observer = metrics.observe_db_query
+
+async def _verify_mint(mint_address: str, failures: int, snipe_queue: asyncio.Queue):
+    """Checks one scheduled mint on ME, re-analyzes it if its valuation is stale, and reschedules it."""
+    card_data = await me.check_listing_status_async(mint_address)
+    now = datetime.now(timezone.utc)
+
+    if isinstance(card_data, dict) and card_data.get('listStatus') == "listed":
+        listing = await write_buffer.get_listing_by_mint(mint_address)
+        if listing:
+            last_analyzed_at = utils.to_utc_datetime(listing.get('last_analyzed_at')) or datetime.fromtimestamp(0, tz=timezone.utc)
+            if now - last_analyzed_at > timedelta(hours=24):
+                logger.info(f"Reaper: Re-analyzing stale listing for {listing.get('name')}.")
+                await process_listing(listing, snipe_queue, send_alert=True, use_cache=False)
+        next_check_at = now + timedelta(seconds=REAPER_CHECK_INTERVAL_SECONDS)
+        await db.record_verification(mint_address, 'LISTED', next_check_at)
+    elif card_data is None:
+        # The ME check itself failed; back off instead of treating the listing as gone.
+        backoff_seconds = min(REAPER_CHECK_INTERVAL_SECONDS * 2 ** failures, REAPER_MAX_BACKOFF_SECONDS)
+        logger.warning(f"Reaper: Could not check {mint_address}. Retrying in {backoff_seconds}s.")
+        await db.record_verification(mint_address, 'ERROR',
+                                     now + timedelta(seconds=backoff_seconds), failed=True)
+    else:
+        logger.info(f"Reaper: Listing {mint_address} is no longer active. Updating DB.")
+        await write_buffer.update_listing_status(mint_address, False)
+        await db.unschedule_verification(mint_address)
+
+async def reaper(snipe_queue: asyncio.Queue):
+    """
+    Works through the durable reaper_schedule: claims the mints that are due, verifies each one
+    and records when it is next due. A restart resumes the schedule where it left off.
+    """
     logger.info("--- Starting Reaper ---")
     while True:
-        mint_address = None
         try:
-            mint_address = await verification_queue.get()
-            card_data = await me.check_listing_status_async(mint_address)
-            
-            if isinstance(card_data, dict) and card_data.get('listStatus') == "listed":
-                listing = await asyncio.to_thread(database.get_listing_by_mint, mint_address)
-                if listing:
-                    last_analyzed_str = listing.get('last_analyzed_at')
-                    last_analyzed_at = None
-                    if not last_analyzed_str:
-                        last_analyzed_at = datetime.fromtimestamp(0, tz=timezone.utc)
-                    elif isinstance(last_analyzed_str, str):
-                        last_analyzed_at = datetime.fromisoformat(last_analyzed_str)
-                        if last_analyzed_at.tzinfo is None:
-                            last_analyzed_at = last_analyzed_at.replace(tzinfo=timezone.utc)
-                    elif isinstance(last_analyzed_str, datetime):
-                        last_analyzed_at = last_analyzed_str
-                        if last_analyzed_at.tzinfo is None:
-                            last_analyzed_at = last_analyzed_at.replace(tzinfo=timezone.utc)
-                    else:
-                        last_analyzed_at = datetime.fromtimestamp(0, tz=timezone.utc)
-                    
-                    if datetime.now(timezone.utc) - last_analyzed_at > timedelta(hours=24):
-                        logger.info(f"Reaper: Re-analyzing stale listing for {listing.get('name')}.")
-                        await process_listing(listing, snipe_queue, send_alert=True)
-                
-                await verification_queue.put(mint_address)
-            else:
-                logger.info(f"Reaper: Listing {mint_address} is no longer active. Updating DB.")
-                await asyncio.to_thread(database.update_listing_status, mint_address, False)
+            due_items = await db.claim_due_verifications(REAPER_BATCH_SIZE, REAPER_LEASE_SECONDS)
+            REAPER_DUE.set(await db.count_due_verifications())
+            if not due_items:
+                await asyncio.sleep(REAPER_IDLE_SECONDS)
+                continue
 
-            await asyncio.sleep(0.55)
+            for item in due_items:
+                try:
+                    await _verify_mint(item['token_mint'], item['failures'], snipe_queue)
+                except Exception as e:
+                    logger.error(f"Error verifying {item['token_mint']} in reaper: {e}", exc_info=True)
+                await asyncio.sleep(0.55)
         except Exception as e:
             logger.error(f"Error in reaper task: {e}", exc_info=True)
-        finally:
-            if mint_address is not None:
-                verification_queue.task_done()
+            await asyncio.sleep(5)
 
-async def process_listing(listing: dict, queue: asyncio.Queue, send_alert: bool = True) -> bool:
+def classify_deal(alt_value: float, listing_price_usd: float, alt_confidence: float) -> tuple[str | None, str, str | None]:
+    """
+    Maps a listing's USD price against its ALT valuation to an alert level and cartel_category.
+    Returns (alert_level, cartel_category, difference_str); alert_level is None when no alert is due.
+    """
+    alert_level = None
+    cartel_category = 'SKIP'
+    difference_str = None
+
+    if alt_value > 0 and listing_price_usd > 0 and alt_confidence > 60:
+        diff_percent = ((listing_price_usd - alt_value) / alt_value) * 100
+        if diff_percent <= -30: 
+            difference_str = f"🟢 {diff_percent:+.2f}%"
+            alert_level = 'GOLD'
+            cartel_category = 'AUTOBUY'
+        else: 
+            difference_str = f"{diff_percent:+.2f}%"
+            if diff_percent <= -20: 
+                alert_level = 'HIGH'
+                cartel_category = 'GOOD'
+            elif diff_percent <= -15: 
+                alert_level = 'INFO'
+                cartel_category = 'OK'
+
+    return alert_level, cartel_category, difference_str
+
+def _stored_snipe_details(listing: dict) -> dict:
+    """Rebuilds the ALT part of snipe_details from the valuation columns stored on a listing row."""
+    return {
+        'alt_asset_id': listing.get('alt_asset_id'),
+        'alt_value': listing.get('alt_value') or 0.0,
+        'avg_price': listing.get('avg_price') or 0.0,
+        'supply': listing.get('supply') or 0,
+        'lower_bound': listing.get('alt_value_lower_bound') or 0.0,
+        'upper_bound': listing.get('alt_value_upper_bound') or 0.0,
+        'confidence': listing.get('alt_value_confidence') or 0.0,
+    }
+
+async def rescore_listing(listing: dict, queue: asyncio.Queue, send_alert: bool = True) -> bool:
+    """
+    Re-classifies a listing from its stored ALT valuation and the current SOL rate, without calling ALT.
+    Only the cartel_category is written back, so the age of the valuation is preserved.
+    Returns True if the listing became a deal, False otherwise.
+    """
+    prices = await utils.get_price_in_both_currencies(listing['price_amount'], listing['price_currency'])
+    if not prices:
+        logger.error(f"Could not convert price for {listing.get('name')}. Skipping local re-score.")
+        return False
+
+    snipe_details = {**_stored_snipe_details(listing), 'listing_price_usd': prices['price_usdc']}
+    alert_level, cartel_category, difference_str = classify_deal(
+        snipe_details['alt_value'], snipe_details['listing_price_usd'], snipe_details['confidence']
+    )
+    if difference_str:
+        snipe_details['difference_str'] = difference_str
+
+    if cartel_category == listing.get('cartel_category'):
+        return False
+
+    await write_buffer.skip_listing(listing['listing_id'], cartel_category)
+    logger.info(f"Re-scored {listing.get('name')} locally: {listing.get('cartel_category')} -> {cartel_category}.")
+
+    found_deal = False
+    if alert_level and send_alert:
+        await queue.put({
+            'listing_data': listing,
+            'snipe_details': snipe_details,
+            'alert_level': alert_level,
+            'duration': 0.0,
+            **tracing.queue_context(listing)
+        })
+        found_deal = True
+
+    if cartel_category != 'SKIP' and listing.get('token_mint'):
+        await db.schedule_verification([listing['token_mint']])
+    return found_deal
+
+async def process_listing(listing: dict, queue: asyncio.Queue, send_alert: bool = True, use_cache: bool = True,
+                          priority: int = LIVE_PRIORITY, reraise: bool = False) -> bool:
     """
     The complete, atomic pipeline for a single listing.
+    With use_cache=False the 7-day ALT cache is ignored and the valuation is always re-fetched.
+    `priority` orders this call's wait for an ALT slot against other callers (lower goes first).
+    With reraise=True unexpected errors propagate, so a job runner can retry the listing.
     Returns True if a new deal was found, False otherwise.
     """
     # If this card is already in our database, check when we last analyzed it.
-    if 'last_analyzed_at' in listing and listing['last_analyzed_at'] is not None:
+    if use_cache and 'last_analyzed_at' in listing and listing['last_analyzed_at'] is not None:
         try:
             # Convert last_analyzed_at (which may be a string) to a datetime object
             last_analyzed_str = str(listing['last_analyzed_at']).replace('Z', '+00:00')
@@ -100,6 +275,7 @@ async def process_listing(listing: dict, queue: asyncio.Queue, send_alert: bool
             # If it was analyzed in the last 7 days, we can skip the ALT API call
             if (datetime.now(timezone.utc) - last_analyzed_dt).days < 7:
                 logger.info(f"CACHE HIT: Skipping ALT analysis for {listing.get('name')} (last analyzed {last_analyzed_dt.strftime('%Y-%m-%d')})")
+                _PROCESSED_CACHE_HIT.inc()
                 return False # Return False because we didn't find a *new* deal
         except (ValueError, TypeError) as e:
             logger.warning(f"Could not parse 'last_analyzed_at' timestamp '{listing['last_analyzed_at']}'. Re-analyzing. Error: {e}")
@@ -109,55 +285,40 @@ async def process_listing(listing: dict, queue: asyncio.Queue, send_alert: bool
     
     try:
         # --- 1. Fetch ALT Data ---
-        t0 = time.time()
         processed_alt_data = None
-        async with ALT_API_SEMAPHORE:
-            processed_alt_data = await alt.get_alt_data_async(
-                listing['grading_id'], 
-                listing.get('grade_num', 0), 
-                listing['grading_company']
-            )
-        t1 = time.time()
-        logger.debug(f"ALT data fetch took: {t1 - t0:.3f}s")
+        with tracing.stage_span("alt_enrichment"):
+            async with alt.ALT_API_SEMAPHORE.slot(priority):
+                processed_alt_data = await alt.get_alt_data_async(
+                    listing['grading_id'], 
+                    listing.get('grade_num', 0), 
+                    listing['grading_company']
+                )
         
         if not processed_alt_data:
             logger.warning(f"Could not fetch ALT data for {listing.get('name')}. Marking as SKIP.")
-            await asyncio.to_thread(database.skip_listing, listing['listing_id'], 'SKIP')
+            await write_buffer.skip_listing(listing['listing_id'], 'SKIP')
+            _PROCESSED_NO_ALT_DATA.inc()
             return False
 
-        # --- 2. Convert Price ---
-        t0 = time.time()
-        prices = await utils.get_price_in_both_currencies(listing['price_amount'], listing['price_currency'])
-        t1 = time.time()
-        logger.debug(f"Price conversion took: {t1 - t0:.3f}s")
+        with tracing.stage_span("classify"):
+            # --- 2. Convert Price ---
+            prices = await utils.get_price_in_both_currencies(listing['price_amount'], listing['price_currency'])
 
-        if not prices:
-            logger.error(f"Could not convert price for {listing.get('name')}. Skipping.")
-            return False
+            if not prices:
+                logger.error(f"Could not convert price for {listing.get('name')}. Skipping.")
+                _PROCESSED_ERROR.inc()
+                return False
 
-        snipe_details = {**processed_alt_data, 'listing_price_usd': prices['price_usdc']}
-        
-        # --- 3. Determine Alert Level ---
-        alert_level = None
-        alt_value = snipe_details.get('alt_value', 0)
-        listing_price_usd = snipe_details.get('listing_price_usd', 0)
-        alt_confidence = snipe_details.get('confidence', 0)
-        cartel_category = 'SKIP'
-
-        if alt_value > 0 and listing_price_usd > 0 and alt_confidence > 60:
-            diff_percent = ((listing_price_usd - alt_value) / alt_value) * 100
-            if diff_percent <= -30: 
-                snipe_details['difference_str'] = f"🟢 {diff_percent:+.2f}%"
-                alert_level = 'GOLD'
-                cartel_category = 'AUTOBUY'
-            else: 
-                snipe_details['difference_str'] = f"{diff_percent:+.2f}%"
-                if diff_percent <= -20: 
-                    alert_level = 'HIGH'
-                    cartel_category = 'GOOD'
-                elif diff_percent <= -15: 
-                    alert_level = 'INFO'
-                    cartel_category = 'OK'
+            snipe_details = {**processed_alt_data, 'listing_price_usd': prices['price_usdc']}
+            
+            # --- 3. Determine Alert Level ---
+            alert_level, cartel_category, difference_str = classify_deal(
+                snipe_details.get('alt_value', 0),
+                snipe_details.get('listing_price_usd', 0),
+                snipe_details.get('confidence', 0)
+            )
+            if difference_str:
+                snipe_details['difference_str'] = difference_str
         
         # --- 4. Queue Alert and Update DB ---
         found_deal = False
@@ -166,30 +327,34 @@ async def process_listing(listing: dict, queue: asyncio.Queue, send_alert: bool
                 'listing_data': listing, 
                 'snipe_details': snipe_details, 
                 'alert_level': alert_level,
-                'duration': time.time() - start_time # Use overall duration for the alert
+                'duration': time.time() - start_time, # Use overall duration for the alert
+                **tracing.queue_context(listing)
             })
             found_deal = True
        
-        t0 = time.time()
-        await asyncio.to_thread(database.update_listing, listing['listing_id'], snipe_details, cartel_category)
-        t1 = time.time()
-        logger.debug(f"Database update took: {t1 - t0:.3f}s")
+        with tracing.stage_span("record"):
+            await write_buffer.update_listing(listing['listing_id'], snipe_details, cartel_category)
         
         if cartel_category != 'SKIP':
             token_mint = listing.get('token_mint')
             if token_mint:
-                logger.info(f"Adding {token_mint} to reaper queue (Category: {cartel_category}).")
-                await verification_queue.put(token_mint)
+                logger.info(f"Adding {token_mint} to reaper schedule (Category: {cartel_category}).")
+                await db.schedule_verification([token_mint])
 
         total_duration = time.time() - start_time
+        PROCESS_SECONDS.observe(total_duration)
+        (_PROCESSED_DEAL if alert_level else _PROCESSED_NO_DEAL).inc()
         logger.info(f"Successfully processed {listing.get('name')}. Took {total_duration:.3f}s. Alert: {alert_level}")
         return found_deal
 
     except Exception as e:
+        _PROCESSED_ERROR.inc()
         logger.error(f"Unexpected error while processing {listing.get('name')}: {e}", exc_info=True)
+        if reraise:
+            raise
         return False
 
-async def cartel_recheck(queue: asyncio.Queue, timeframe: str, interaction: discord.Interaction):
+async def cartel_recheck(queue: asyncio.Queue, timeframe: str, reply: bot_ipc.Reply):
     """
     Fetches active listings marked as 'SKIP' within a given timeframe and re-processes them.
     """
@@ -208,31 +373,90 @@ async def cartel_recheck(queue: asyncio.Queue, timeframe: str, interaction: disc
     if timeframe in time_deltas:
         since_timestamp = datetime.now(timezone.utc) - time_deltas[timeframe]
 
-    skipped_listings = await asyncio.to_thread(database.get_skipped_listings, since_timestamp)
+    # --- Tier 1: re-score every listing with a fresh stored valuation locally ---
+    # SKIP listings are streamed in chunks (the next one read while this one is re-scored) and
+    # only the IDs of stale ones are kept for tier 2, so memory stays flat however many match.
+    max_age = timedelta(hours=RECHECK_VALUATION_MAX_AGE_HOURS)
+    stale_listing_ids = []
+    new_deals_count = 0
+    rescored_count = 0
+    processed_count = 0
+    async with contextlib.aclosing(db.prefetch(db.iter_skipped_listings(since_timestamp))) as chunks:
+        async for skipped_listings in chunks:
+            processed_count += len(skipped_listings)
+            for listing in skipped_listings:
+                if not utils.has_fresh_valuation(listing, max_age):
+                    stale_listing_ids.append(listing['listing_id'])
+                    continue
+                rescored_count += 1
+                if await rescore_listing(listing, queue, send_alert=True):
+                    new_deals_count += 1
 
-    if not skipped_listings:
+    if not processed_count:
         logger.warning(f"Re-check initiated for {timeframe}, but no 'SKIP' listings found in that period.")
-        await interaction.followup.send(f"ℹ️ No 'SKIP' listings found to re-check for the **{timeframe}** timeframe.", ephemeral=True)
+        await reply(f"ℹ️ No 'SKIP' listings found to re-check for the **{timeframe}** timeframe.")
         return
 
-    logger.info(f"Found {len(skipped_listings)} 'SKIP' listings to re-process.")
-    
-    new_deals_count = 0
-    for i, listing in enumerate(skipped_listings):
-        logger.info(f"--- Re-processing listing {i+1}/{len(skipped_listings)} ---")
-        if await process_listing(listing, queue, send_alert=True):
+    logger.info(f"Found {processed_count} 'SKIP' listings. Re-scored {rescored_count} locally. "
+                f"{len(stale_listing_ids)} have stale valuations and go to ALT.")
+
+    # --- Tier 2: only listings with a stale or missing valuation go back through ALT ---
+    for i, listing_id in enumerate(stale_listing_ids):
+        listing = await write_buffer.get_listing_by_id(listing_id)
+        if listing is None:
+            continue
+        logger.info(f"--- Re-processing stale listing {i+1}/{len(stale_listing_ids)} ---")
+        if await process_listing(listing, queue, send_alert=True, use_cache=False):
             new_deals_count += 1
         await asyncio.sleep(0.55)
 
-    processed_count = len(skipped_listings)
-    logger.info(f"--- Re-check for timeframe '{timeframe}' complete! ---")
-    await interaction.followup.send(
+    logger.info(f"--- Re-check for timeframe '{timeframe}' complete! ALT calls avoided: {rescored_count} ---")
+    await reply(
         f"✅ **Re-check Complete!**\n"
         f"Processed **{processed_count}** listings from the **{timeframe}** timeframe.\n"
-        f"Found **{new_deals_count}** new deals.",
-        ephemeral=True
+        f"Re-scored **{rescored_count}** locally and sent **{len(stale_listing_ids)}** to ALT "
+        f"(**{rescored_count}** ALT calls avoided).\n"
+        f"Found **{new_deals_count}** new deals."
     )
 
+async def drain_backlog(queue: asyncio.Queue) -> int:
+    """
+    Claims listings stuck in 'NEW' batch by batch and enriches them with bounded concurrency
+    at backlog priority, until no claimable rows are left. Rows that keep failing are given up on
+    after BACKLOG_MAX_CLAIMS claims. Returns the number of rows processed.
+    """
+    semaphore = asyncio.Semaphore(BACKLOG_CONCURRENCY)
+
+    async def _process(listing: dict):
+        async with semaphore:
+            await process_listing(listing, queue, send_alert=True, use_cache=False, priority=BACKLOG_PRIORITY)
+
+    processed_count = 0
+    while True:
+        saved_before = datetime.now(timezone.utc) - timedelta(seconds=BACKLOG_GRACE_SECONDS)
+        batch = await db.claim_unprocessed_listings(BACKLOG_BATCH_SIZE, saved_before, BACKLOG_MAX_CLAIMS)
+        if not batch:
+            return processed_count
+        logger.info(f"Backlog: claimed {len(batch)} 'NEW' listings.")
+        await asyncio.gather(*(asyncio.create_task(_process(listing), name="backlog:process_listing") for listing in batch))
+        processed_count += len(batch)
+
+async def backlog_drainer(queue: asyncio.Queue):
+    """Reports and drains the 'NEW' backlog at startup and then every BACKLOG_DRAIN_INTERVAL_SECONDS."""
+    logger.info("--- Starting Backlog Drainer ---")
+    while True:
+        try:
+            stats = await db.get_unprocessed_backlog_stats()
+            if stats['count']:
+                oldest_listed_at = utils.to_utc_datetime(stats['oldest_listed_at'])
+                oldest_age = datetime.now(timezone.utc) - oldest_listed_at if oldest_listed_at else None
+                logger.info(f"Backlog: {stats['count']} listings in 'NEW', oldest listed {oldest_age} ago.")
+                processed_count = await drain_backlog(queue)
+                logger.info(f"Backlog: drained {processed_count} listings.")
+        except Exception as e:
+            logger.error(f"Error in backlog drainer: {e}", exc_info=True)
+        await asyncio.sleep(BACKLOG_DRAIN_INTERVAL_SECONDS)
+
 async def initial_population(queue: asyncio.Queue):
     """
     Slowly fetches all ME listings, enriches them, and saves them to the DB.
@@ -248,29 +472,80 @@ async def initial_population(queue: asyncio.Queue):
     
     for i, listing in enumerate(all_listings):
         logger.info(f"--- Populating listing {i+1}/{len(all_listings)} ---")
-        await asyncio.to_thread(database.save_listing, [listing])
+        await db.save_listing([listing])
         await process_listing(listing, queue, send_alert=False)
         await asyncio.sleep(1)
             
     logger.info("--- Initial population and enrichment complete! ---")
 
+async def ingest_listing(listing: dict, queue: asyncio.Queue, detected_at_ns: int):
+    """
+    Persists a freshly detected listing and runs it through the pipeline under one trace.
+    In distributed mode the enrichment is queued as a job for whichever worker claims it first.
+    """
+    with tracing.listing_span(listing, detected_at_ns):
+        with tracing.stage_span("persist"):
+            await db.save_listing([listing])
+        if job_queue.is_distributed():
+            await job_queue.enqueue(
+                'enrich',
+                {'listing_id': listing['listing_id'], 'trace_context': tracing.inject_context()},
+                priority=LIVE_PRIORITY,
+                dedupe_key=f"enrich:{listing['listing_id']}"
+            )
+        else:
+            await process_listing(listing, queue, send_alert=True)
+
+class AlertRouter:
+    """
+    Stands in for snipe_queue in the pipeline. On the leader, alerts go straight onto the
+    local queue; other replicas forward them as 'alert' jobs to the leader's Discord consumer.
+    """
+    def __init__(self, queue: asyncio.Queue):
+        self.queue = queue
+
+    async def put(self, item: dict):
+        if leader.is_leader():
+            await self.queue.put(item)
+            return
+        await job_queue.enqueue('alert', bot_ipc.alert_payload(item), priority=LIVE_PRIORITY)
+
+def make_enrich_job_handler(queue: asyncio.Queue):
+    """Builds the handler for 'enrich' jobs, which run a saved listing through process_listing."""
+    async def handle_enrich_job(payload: dict):
+        listing = await write_buffer.get_listing_by_id(payload['listing_id'])
+        if not listing or listing.get('cartel_category') != 'NEW':
+            return # Already enriched by an earlier attempt
+        with tracing.attached_context(payload.get('trace_context')):
+            await process_listing(listing, queue, send_alert=True, use_cache=False, reraise=True)
+    return handle_enrich_job
+
+async def lead(queue: asyncio.Queue):
+    """The leader's watchdog duty: populates an empty database first, then watches for new listings."""
+    if not await db.get_all_listing_ids():
+        await initial_population(queue)
+    await watchdog(queue)
+
 async def watchdog(queue: asyncio.Queue):
     """The main high-speed watchdog loop."""
     logger.info("--- Starting Watchdog ---")
-    processed_ids = await asyncio.to_thread(database.get_all_listing_ids)
+    processed_ids = await db.get_all_listing_ids()
     logger.info(f"Loaded {len(processed_ids)} previously processed listing IDs.")
     
     while True:
         try:
             new_listings = await me.fetch_new_listings_async(processed_ids)
             if new_listings:
+                detected_at_ns = time.time_ns()
                 logger.info(f"Found {len(new_listings)} new items!")
+                LISTINGS_DETECTED.inc(len(new_listings))
+                _recent_detections.extend([time.monotonic()] * len(new_listings))
+                _new_listings_last_minute()  # Also prunes detections older than a minute
                 
                 tasks = []
                 for listing in new_listings:
                     processed_ids.add(listing['listing_id'])
-                    await asyncio.to_thread(database.save_listing, [listing])
-                    tasks.append(process_listing(listing, queue, send_alert=True))
+                    tasks.append(asyncio.create_task(ingest_listing(listing, queue, detected_at_ns), name="watchdog:ingest_listing"))
                 await asyncio.gather(*tasks)
 
             await asyncio.sleep(0.3)
@@ -281,23 +556,68 @@ async def watchdog(queue: asyncio.Queue):
 async def main():
     """The main entry point for the application."""
     
-    snipe_queue = asyncio.Queue()
+    snipe_queue = utils.AlertQueue()
     logger.info("--- Sniper booting up ---")
+    monitor = loop_monitor.start_loop_monitor()
+    tracer_provider = tracing.setup_tracing([me.async_client, alt.async_client, utils.async_client])
+    register_runtime_metrics(snipe_queue, monitor)
+    metrics_server = await metrics.start_metrics_server()
     
-    await asyncio.to_thread(database.init_db)
+    await db.init_db()
 
-    initial_reaper_items = await asyncio.to_thread(database.get_initial_reaper_queue_items)
-    for item in initial_reaper_items:
-        await verification_queue.put(item)
+    await db.seed_reaper_schedule()
     
-    if not await asyncio.to_thread(database.get_all_listing_ids):
-        await initial_population(snipe_queue)
+    rechecker_scheduler = rechecker.start_rechecker()
+    archiver_scheduler = archiver.start_archiver()
+    alerts = AlertRouter(snipe_queue)
 
-    discord_task = asyncio.create_task(discord_bot.start_discord_bot(snipe_queue, recheck_skipped_callback=lambda timeframe, interaction: cartel_recheck(snipe_queue, timeframe, interaction)))
-    watchdog_task = asyncio.create_task(watchdog(snipe_queue))
-    reaper_task = asyncio.create_task(reaper(verification_queue, snipe_queue))
+    def start_leader_duties() -> list[asyncio.Task]:
+        duties = [asyncio.create_task(lead(alerts), name="watchdog")]
+        if leader.LEADER_ELECTION_ENABLED:
+            # Alerts found by other replicas arrive as jobs and join the local snipe_queue
+            duties.append(asyncio.create_task(job_queue.run_jobs(['alert']), name="jobs:alerts"))
+        return duties
+
+    # Every replica keeps the gateway connected so a takeover is instant, but only the leader answers commands
+    if bot_ipc.DISCORD_BOT_MODE == "process":
+        # The bot runs as a child process, so gateway traffic stays out of this event loop
+        bot_link = bot_ipc.BotLink(snipe_queue, run_recheck=lambda timeframe, reply: cartel_recheck(snipe_queue, timeframe, reply),
+                                   forward_alerts=discord_bot.ALERT_TRANSPORT == "bot")
+        discord_task = asyncio.create_task(bot_link.serve(leader.is_leader), name="discord:bot_link")
+    else:
+        discord_task = asyncio.create_task(discord_bot.start_discord_bot(snipe_queue, recheck_skipped_callback=lambda timeframe, interaction: cartel_recheck(snipe_queue, timeframe, lambda content: interaction.followup.send(content, ephemeral=True)), accept_interactions=leader.is_leader), name="discord:gateway")
+    leader_task = asyncio.create_task(leader.run_leader_election(start_leader_duties), name="leader")
+    reaper_task = asyncio.create_task(reaper(alerts), name="reaper")
+    backlog_task = asyncio.create_task(backlog_drainer(alerts), name="backlog")
+    tracing_task = asyncio.create_task(tracing.report_stage_latencies(), name="tracing:report")
+    # Other processes' listing writes invalidate the listing cache and deal board as they commit
+    change_feed_task = asyncio.create_task(change_feed.sync_local_views(), name="db:change_feed_sync")
+    tasks = [discord_task, leader_task, reaper_task, backlog_task, tracing_task, change_feed_task]
+    if discord_bot.ALERT_TRANSPORT == "webhook":
+        # Alerts bypass the gateway client, which then only serves slash commands
+        tasks.append(asyncio.create_task(discord_bot.consume_alerts(snipe_queue, webhooks.send_alerts), name="discord:webhooks"))
+
+    job_queue.register_handler('alert', snipe_queue.put)
+    if job_queue.is_distributed():
+        job_queue.register_handler('enrich', make_enrich_job_handler(alerts))
+        job_queue.register_handler('verify', rechecker.verify_job_handler)
+        tasks.append(asyncio.create_task(job_queue.run_jobs(['enrich', 'verify']), name="jobs:runner"))
     
-    await asyncio.gather(discord_task, watchdog_task, reaper_task)
+    try:
+        await asyncio.gather(*tasks)
+    finally:
+        rechecker_scheduler.shutdown(wait=False)
+        archiver_scheduler.shutdown(wait=False)
+        if metrics_server:
+            metrics_server.close()
+        if monitor:
+            monitor.stop()
+        change_feed_task.cancel()
+        await change_feed.close()
+        await write_buffer.close()
+        await db.dispose()
+        if tracer_provider:
+            tracer_provider.shutdown()
 
 if __name__ == "__main__":
     try:
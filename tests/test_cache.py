@@ -0,0 +1,106 @@
+import asyncio
+
+import pytest
+
+from database import aio, cache
+from database.main import listing_record_type
+
+make_listing = listing_record_type(("listing_id", "token_mint", "name"))._make
+
+@pytest.fixture
+def names():
+    """The stored listings the fake reads answer from: listing_id -> name, minted as mint-<listing_id>."""
+    return {"c-1": "first", "c-2": "second", "c-3": "third"}
+
+@pytest.fixture
+def reads(monkeypatch, names):
+    """The listing_id or mint of every database read the cache makes, answered from `names`."""
+    calls = []
+
+    def lookup(listing_id):
+        return make_listing((listing_id, f"mint-{listing_id}", names[listing_id])) if listing_id in names else None
+
+    async def get_listing_by_id(listing_id):
+        calls.append(listing_id)
+        return lookup(listing_id)
+
+    async def get_listing_by_mint(mint_address):
+        calls.append(mint_address)
+        return lookup(mint_address.removeprefix("mint-"))
+    monkeypatch.setattr(aio, "get_listing_by_id", get_listing_by_id)
+    monkeypatch.setattr(aio, "get_listing_by_mint", get_listing_by_mint)
+    return calls
+
+def test_cache_serves_repeat_reads_until_invalidated(reads, names):
+    async def main():
+        listings = cache.ListingCache()
+        first = await listings.get_listing_by_id("c-1")
+        assert await listings.get_listing_by_id("c-1") is first
+        assert await listings.get_listing_by_mint("mint-c-1") is not None
+        assert await listings.get_listing_by_mint("mint-c-1") is not None
+        names["c-1"] = "renamed"
+        listings.invalidate(listing_ids=["c-1"])
+        return listings, (await listings.get_listing_by_id("c-1"))["name"]
+
+    listings, name = asyncio.run(main())
+    assert name == "renamed"
+    assert reads == ["c-1", "mint-c-1", "c-1"]
+    assert (listings.hits, listings.misses) == (2, 3)
+
+def test_invalidating_a_mint_drops_its_listings_and_lookups(reads):
+    async def main():
+        listings = cache.ListingCache()
+        await listings.get_listing_by_mint("mint-c-2")
+        await listings.get_listing_by_id("c-3")
+        listings.invalidate(mints=["mint-c-2"])
+        await listings.get_listing_by_id("c-2")
+        await listings.get_listing_by_mint("mint-c-2")
+        await listings.get_listing_by_id("c-3")
+        return len(listings)
+
+    assert asyncio.run(main()) == 2
+    assert reads == ["mint-c-2", "c-3", "c-2", "mint-c-2"]
+
+def test_a_read_that_races_an_invalidation_is_not_cached(reads, monkeypatch):
+    async def main():
+        listings = cache.ListingCache()
+        read = aio.get_listing_by_id
+
+        async def racing_read(listing_id):
+            record = await read(listing_id)
+            # The listing is written (and the cache invalidated) after the row was read
+            listings.invalidate(listing_ids=[listing_id])
+            return record
+        monkeypatch.setattr(aio, "get_listing_by_id", racing_read)
+        await listings.get_listing_by_id("c-1")
+        monkeypatch.setattr(aio, "get_listing_by_id", read)
+        await listings.get_listing_by_id("c-1")
+        return listings
+
+    listings = asyncio.run(main())
+    assert reads == ["c-1", "c-1"]
+    assert listings.hits == 0
+
+def test_cache_evicts_least_recently_used_and_expired_entries(reads):
+    async def main():
+        listings = cache.ListingCache(max_size=2)
+        await listings.get_listing_by_id("c-1")
+        await listings.get_listing_by_id("c-2")
+        await listings.get_listing_by_id("c-1")
+        await listings.get_listing_by_id("c-3")  # evicts c-2
+        await listings.get_listing_by_id("c-2")
+        expiring = cache.ListingCache(ttl_seconds=-1)
+        await expiring.get_listing_by_id("c-1")
+        await expiring.get_listing_by_id("c-1")
+        return len(listings), len(expiring)
+
+    assert asyncio.run(main()) == (2, 1)
+    assert reads == ["c-1", "c-2", "c-3", "c-2", "c-1", "c-1"]
+
+def test_committed_writes_invalidate_the_shared_cache(db, run):
+    db.save_listing([{"listing_id": "c-db", "token_mint": "c-db-mint", "name": "before"}])
+    assert run(cache.get_listing_by_id("c-db"))["name"] == "before"
+    db.update_listing_details("c-db", {"name": "after"})
+    assert run(cache.get_listing_by_mint("c-db-mint"))["name"] == "after"
+    db.update_listing_details("c-db", {"name": "again"})
+    assert run(cache.get_listing_by_id("c-db"))["name"] == "again"
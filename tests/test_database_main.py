@@ -0,0 +1,50 @@
+from datetime import datetime, timezone, timedelta
+
+import pytest
+
+from database import main as database
+
+UTC_NOON = datetime(2025, 6, 1, 12, 0, tzinfo=timezone.utc)
+
+@pytest.mark.parametrize("value", [
+    UTC_NOON,
+    datetime(2025, 6, 1, 14, 0, tzinfo=timezone(timedelta(hours=2))),
+    datetime(2025, 6, 1, 12, 0),  # naive values are taken as UTC
+    "2025-06-01T12:00:00Z",
+    "2025-06-01T12:00:00.000+00:00",
+    UTC_NOON.timestamp(),
+    int(UTC_NOON.timestamp() * 1000),  # epoch milliseconds
+    str(int(UTC_NOON.timestamp())),
+])
+def test_utc_datetime_binds_every_format_as_utc(value):
+    bound = database.UTCDateTime().process_bind_param(value, database.engine.dialect)
+    assert bound == UTC_NOON and bound.tzinfo == timezone.utc
+
+@pytest.mark.parametrize("value", [None, "not a date"])
+def test_utc_datetime_binds_missing_and_unparseable_values_as_null(value):
+    assert database.UTCDateTime().process_bind_param(value, database.engine.dialect) is None
+
+def test_utc_datetime_reads_back_timezone_aware(db):
+    db.save_listing([{"listing_id": "utc-1", "token_mint": "utc-mint-1", "listed_at": "2025-06-01T14:00:00+02:00"}])
+    listed_at = db.get_listing_by_id("utc-1", ("listed_at",))["listed_at"]
+    assert listed_at == UTC_NOON and listed_at.tzinfo is not None
+
+def test_sync_and_async_functions_run_the_same_operation(db, run):
+    from database import aio
+    db.save_listing([{"listing_id": "op-1", "token_mint": "op-mint-1", "name": "sync"}])
+    run(aio.save_listing([{"listing_id": "op-2", "token_mint": "op-mint-2", "name": "async"}]))
+    run(aio.update_listing_details("op-1", {"name": "renamed"}))
+    assert db.get_listing_by_id("op-1", ("name",)) == run(aio.get_listing_by_id("op-1", ("name",)))
+    assert run(aio.get_listing_by_mint("op-mint-1", ("name",)))["name"] == "renamed"
+    assert db.get_all_listing_ids() == run(aio.get_all_listing_ids()) == {"op-1", "op-2"}
+
+def test_backlog_claims_give_up_after_max_claims(db):
+    db.save_listing([{"listing_id": "claim-1", "token_mint": "claim-mint-1"}])
+    claimed = []
+    for hours in range(1, 5):
+        # Each pass comes after the previous claim's grace period
+        later = datetime.now(timezone.utc) + timedelta(hours=hours)
+        claimed.append([listing["claim_attempts"] for listing in db.claim_unprocessed_listings(10, later, 2, ("claim_attempts",))])
+    assert claimed == [[0], [1], [], []]
+    listing = db.get_listing_by_id("claim-1", ("cartel_category", "claim_attempts"))
+    assert (listing["cartel_category"], listing["claim_attempts"]) == ("SKIP", 2)
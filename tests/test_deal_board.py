@@ -0,0 +1,75 @@
+from datetime import datetime, timedelta, timezone
+
+import pytest
+
+from database import aio, deal_board
+from database import main as database
+
+BASE = datetime(2025, 6, 1, tzinfo=timezone.utc)
+
+@pytest.fixture
+def deals(db):
+    """Seeds active deals, ties and an undated one included, and returns their ids in board order."""
+    rows = []
+    for n in range(14):
+        # Pairs share a listed_at, so ties are broken by listing_id
+        rows.append({"listing_id": f"deal-{n:02d}", "token_mint": f"deal-mint-{n:02d}", "name": f"Deal {n}",
+                     "listed_at": BASE - timedelta(hours=n // 2), "cartel_category": ("AUTOBUY", "GOOD", "OK")[n % 3]})
+    rows.append({"listing_id": "deal-undated", "token_mint": "deal-mint-undated", "name": "Undated",
+                 "listed_at": None, "cartel_category": "GOOD"})
+    rows.append({"listing_id": "deal-skipped", "token_mint": "deal-mint-skipped", "name": "Skipped",
+                 "listed_at": BASE + timedelta(hours=1), "cartel_category": "SKIP"})
+    rows.append({"listing_id": "deal-delisted", "token_mint": "deal-mint-delisted", "name": "Delisted",
+                 "listed_at": BASE + timedelta(hours=1), "cartel_category": "GOOD", "is_listed": False})
+    db.save_listing(rows)
+    return [f"deal-{n:02d}" for n in range(14)] + ["deal-undated"]
+
+async def _walk(get_page, categories, limit):
+    """Pages forward from the first page to the last, then back again; returns both as id lists."""
+    forward, page = [], await get_page(categories, limit)
+    assert page.before is None
+    while True:
+        forward.append([deal['listing_id'] for deal in page.deals])
+        if page.after is None:
+            break
+        page = await get_page(categories, limit, after=page.after)
+    backward = []
+    while page.before is not None:
+        page = await get_page(categories, limit, before=page.before)
+        backward.append([deal['listing_id'] for deal in page.deals])
+    return forward, backward
+
+@pytest.mark.parametrize("board_categories", [deal_board.DEAL_CATEGORIES, ("AUTOBUY",)])
+def test_pages_walk_every_deal_in_both_directions(deals, run, board_categories):
+    # A board that doesn't hold every requested category pages with keyset queries instead
+    board = deal_board.DealBoard(board_categories)
+    forward, backward = run(_walk(board.get_active_deals_page, list(deal_board.DEAL_CATEGORIES), 4))
+    assert [len(page) for page in forward] == [4, 4, 4, 3]
+    assert sum(forward, []) == deals
+    assert backward == forward[-2::-1]
+
+def test_board_answers_like_the_database(deals, run):
+    async def main():
+        board = deal_board.DealBoard()
+        return ([deal['listing_id'] for deal in await board.get_active_deals_by_category(["GOOD", "OK"], 6)],
+                [deal['listing_id'] for deal in await aio.get_active_deals_by_category(["GOOD", "OK"], 6)])
+
+    from_board, from_database = run(main())
+    assert from_board == from_database == ["deal-01", "deal-02", "deal-04", "deal-05", "deal-07", "deal-08"]
+
+def test_writes_update_the_board_without_a_rebuild(deals, run, monkeypatch):
+    board = deal_board.DealBoard()
+    monkeypatch.setattr(database, "listing_write_observers", [*database.listing_write_observers, board.invalidate])
+
+    async def main():
+        before = [deal['listing_id'] for deal in await board.get_active_deals_by_category(["AUTOBUY"], 10)]
+        await aio.skip_listing("deal-00", "SKIP")
+        await aio.skip_listing("deal-skipped", "AUTOBUY")
+        await aio.update_listing_status("deal-mint-03", False)
+        after = [deal['listing_id'] for deal in await board.get_active_deals_by_category(["AUTOBUY"], 10)]
+        return before, after
+
+    before, after = run(main())
+    assert before == ["deal-00", "deal-03", "deal-06", "deal-09", "deal-12"]
+    assert after == ["deal-skipped", "deal-06", "deal-09", "deal-12"]
+    assert (board.rebuilds, board.refreshes) == (1, 1)
@@ -0,0 +1,19 @@
+from worker.app import discord_bot
+
+MINT_A = "7xKXtg2CW87d97TXJSDpbD5jBkheTqA83TZRuJosgAsU"
+MINT_B = "So11111111111111111111111111111111111111112"
+
+def test_parse_mints_splits_on_whitespace_commas_and_semicolons():
+    mints, invalid = discord_bot._parse_mints(f" {MINT_A},{MINT_B};\n{MINT_A}\t")
+    assert mints == [MINT_A, MINT_B]
+    assert invalid == []
+
+def test_parse_mints_reports_entries_that_are_not_mint_addresses():
+    # Too short, too long, and base58 has no 0, O, I or l
+    entries = ["abc", MINT_A + "x" * 5, "0" * 40, "O" * 40, "I" * 40, "l" * 40]
+    mints, invalid = discord_bot._parse_mints(" ".join([MINT_B, *entries]))
+    assert mints == [MINT_B]
+    assert invalid == entries
+
+def test_parse_mints_of_blank_text_is_empty():
+    assert discord_bot._parse_mints(" ,; \n") == ([], [])
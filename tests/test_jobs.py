@@ -0,0 +1,101 @@
+from datetime import datetime, timezone
+
+from sqlalchemy import insert, select
+
+from database import main as database
+
+def job(key: str, **fields) -> dict:
+    return {"kind": "verify", "payload": {"token_mint": key}, "dedupe_key": f"verify:{key}", **fields}
+
+def state(db, job_id: int):
+    with db.engine.connect() as connection:
+        return connection.execute(select(
+            database.Job.status, database.Job.attempts, database.Job.dedupe_key, database.Job.last_error
+        ).where(database.Job.id == job_id)).one()
+
+def test_enqueue_ignores_a_dedupe_key_already_queued(db):
+    assert db.enqueue_jobs([job("a"), job("b")]) == 2
+    assert db.enqueue_jobs([job("a")]) == 0
+    assert db.get_job_counts() == {("verify", "PENDING"): 2}
+
+def test_claims_go_by_priority_and_are_leased_to_one_worker(db):
+    db.enqueue_jobs([job("low", priority=20), job("high", priority=0), job("other", kind="enrich")])
+    [claimed] = db.claim_jobs(["verify"], 1, 60, "worker-a")
+    assert (claimed["payload"], claimed["attempts"]) == ({"token_mint": "high"}, 1)
+    assert [job["payload"] for job in db.claim_jobs(["verify"], 10, 60, "worker-b")] == [{"token_mint": "low"}]
+    # Everything runnable of that kind is leased out
+    assert db.claim_jobs(["verify"], 10, 60, "worker-c") == []
+    assert db.get_job_counts() == {("verify", "RUNNING"): 2, ("enrich", "PENDING"): 1}
+
+def test_a_job_whose_lease_expired_is_claimed_again(db):
+    db.enqueue_jobs([job("a")])
+    [first] = db.claim_jobs(["verify"], 1, -1, "crashed-worker")
+    [second] = db.claim_jobs(["verify"], 1, 60, "worker-b")
+    assert second["id"] == first["id"] and second["attempts"] == 2
+
+def test_an_expired_lease_on_the_last_attempt_dead_letters_the_job(db):
+    db.enqueue_jobs([job("a", max_attempts=1)])
+    [claimed] = db.claim_jobs(["verify"], 1, -1, "crashed-worker")
+    assert db.claim_jobs(["verify"], 1, 60, "worker-b") == []
+    assert tuple(state(db, claimed["id"])) == ("DEAD", 1, None, "lease expired")
+
+def test_a_failed_job_is_retried_after_its_delay(db):
+    db.enqueue_jobs([job("soon"), job("later")])
+    for claimed in db.claim_jobs(["verify"], 2, 60, "worker-a"):
+        delay = 0 if claimed["payload"] == {"token_mint": "soon"} else 3600
+        db.fail_job(claimed["id"], "ME timed out", delay)
+    [retried] = db.claim_jobs(["verify"], 10, 60, "worker-a")
+    assert (retried["payload"], retried["attempts"]) == ({"token_mint": "soon"}, 2)
+    assert db.get_job_counts() == {("verify", "RUNNING"): 1, ("verify", "PENDING"): 1}
+
+def test_completed_jobs_are_deleted(db):
+    db.enqueue_jobs([job("a")])
+    [claimed] = db.claim_jobs(["verify"], 1, 60, "worker-a")
+    db.complete_job(claimed["id"])
+    assert db.get_job_counts() == {}
+    # Its dedupe key is free again
+    assert db.enqueue_jobs([job("a")]) == 1
+
+def test_dead_jobs_release_their_dedupe_key_and_can_be_requeued(db):
+    db.enqueue_jobs([job("a", max_attempts=2)])
+    for _ in range(2):
+        [claimed] = db.claim_jobs(["verify"], 1, 60, "worker-a")
+        db.fail_job(claimed["id"], "ME timed out", 0)
+    assert tuple(state(db, claimed["id"])) == ("DEAD", 2, None, "ME timed out")
+
+    assert db.enqueue_jobs([job("a")]) == 1
+    assert db.requeue_dead_jobs("enrich") == 0
+    assert db.requeue_dead_jobs("verify") == 1
+    assert db.get_job_counts() == {("verify", "PENDING"): 2}
+    assert state(db, claimed["id"]).attempts == 0
+
+def run_on(connection, steps):
+    """Runs an operation's statements on `connection`, leaving its transaction open."""
+    result = None
+    try:
+        while True:
+            step = steps.send(result)
+            if step is database.COMMIT:
+                result = None
+                continue
+            statement, params = step if isinstance(step, tuple) else (step, None)
+            result = connection.execute(statement, params)
+    except StopIteration as stop:
+        return stop.value
+
+def test_concurrent_claims_skip_jobs_locked_by_another_worker(postgres_engine):
+    database.Job.__table__.create(postgres_engine)
+    with postgres_engine.begin() as connection:
+        connection.execute(insert(database.Job), [
+            {"kind": "verify", "payload": {"n": n}, "status": "PENDING", "priority": 0,
+             "run_at": datetime.now(timezone.utc), "attempts": 0, "max_attempts": 5} for n in range(4)
+        ])
+    claim_jobs = database.operations["claim_jobs"]
+    with postgres_engine.connect() as first, postgres_engine.connect() as second:
+        # The first worker's claim is still uncommitted, holding its rows' locks
+        claimed_first = run_on(first, claim_jobs(["verify"], 2, 60, "worker-a"))
+        claimed_second = run_on(second, claim_jobs(["verify"], 10, 60, "worker-b"))
+        second.commit()
+        first.commit()
+    assert len(claimed_first) == len(claimed_second) == 2
+    assert not {job["id"] for job in claimed_first} & {job["id"] for job in claimed_second}
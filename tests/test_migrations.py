@@ -0,0 +1,114 @@
+from datetime import datetime, timezone
+
+import pytest
+from sqlalchemy import MetaData, Table, Column, String, Float, Integer, Boolean, DateTime, func, insert, inspect, select, text
+from sqlalchemy.schema import CreateTable
+
+from database import main as database, migrations
+
+UTC_NOON = datetime(2025, 6, 1, 12, 0, tzinfo=timezone.utc)
+
+# The listings table as the baseline schema created it, listed_at still ME's text
+BASELINE_LISTINGS = Table(
+    "listings", MetaData(),
+    Column("listing_id", String, primary_key=True),
+    Column("name", String),
+    Column("grade_num", Float),
+    Column("grade", String),
+    Column("category", String),
+    Column("insured_value", Float),
+    Column("grading_company", String),
+    Column("img_url", String),
+    Column("grading_id", String),
+    Column("token_mint", String),
+    Column("price_amount", Float),
+    Column("price_currency", String),
+    Column("listed_at", String),
+    Column("alt_value", Float),
+    Column("avg_price", Float),
+    Column("supply", Integer),
+    Column("alt_asset_id", String),
+    Column("alt_value_lower_bound", Float),
+    Column("alt_value_upper_bound", Float),
+    Column("alt_value_confidence", Float),
+    Column("cartel_category", String, nullable=False, default='NEW'),
+    Column("is_listed", Boolean, default=True),
+    Column("last_analyzed_at", DateTime(timezone=True), server_default=func.now()),
+)
+
+@pytest.fixture(params=["sqlite", "postgres"])
+def engine(request):
+    return request.getfixturevalue(f"{request.param}_engine")
+
+def init_db(engine):
+    """database.init_db() against `engine`."""
+    database.Base.metadata.create_all(bind=engine)
+    migrations.run_migrations(engine)
+
+def applied_versions(engine) -> list[int]:
+    with engine.connect() as connection:
+        return list(connection.execute(text("SELECT version FROM schema_migrations ORDER BY version")).scalars())
+
+def create_baseline_database(engine):
+    BASELINE_LISTINGS.create(engine)
+    with engine.begin() as connection:
+        connection.execute(insert(BASELINE_LISTINGS), [
+            {"listing_id": "listed", "token_mint": "mint-1", "listed_at": "2025-06-01T12:00:00.000Z", "cartel_category": "GOOD", "is_listed": True},
+            {"listing_id": "delisted", "token_mint": "mint-2", "listed_at": "1748779200000", "cartel_category": "SKIP", "is_listed": False},
+        ])
+
+def test_version_2_database_upgrades_through_every_migration(engine, monkeypatch):
+    create_baseline_database(engine)
+    with monkeypatch.context() as patch:
+        patch.setattr(migrations, "MIGRATIONS", migrations.MIGRATIONS[:2])
+        init_db(engine)
+    assert applied_versions(engine) == [1, 2]
+
+    init_db(engine)
+    assert applied_versions(engine) == [version for version, _, _ in migrations.MIGRATIONS]
+    with engine.connect() as connection:
+        history = connection.execute(text(
+            "SELECT listing_id, claim_attempts, delisted_at IS NOT NULL, archived_at FROM listings_history ORDER BY listing_id"
+        )).all()
+        listed_at = connection.execute(select(database.Listing.listed_at)).scalars().all()
+    assert [tuple(row) for row in history] == [("delisted", 0, True, None), ("listed", 0, False, None)]
+    assert listed_at == [UTC_NOON, UTC_NOON]
+
+def assert_current_schema(engine):
+    """The database matches the models: every declared column and index, and every migration recorded."""
+    assert applied_versions(engine) == [version for version, _, _ in migrations.MIGRATIONS]
+    schema = inspect(engine)
+    for table in database.Base.metadata.sorted_tables:
+        assert {column["name"] for column in schema.get_columns(table.name)} == set(table.columns.keys()), table.name
+        assert {index["name"] for index in schema.get_indexes(table.name)} >= {index.name for index in table.indexes}, table.name
+    assert "listings_history" in schema.get_view_names()
+
+def test_empty_database_is_created_at_the_current_schema(engine):
+    init_db(engine)
+    assert_current_schema(engine)
+
+def test_baseline_database_is_migrated_to_the_current_schema(engine):
+    create_baseline_database(engine)
+    init_db(engine)
+    assert_current_schema(engine)
+    with engine.connect() as connection:
+        rows = connection.execute(select(database.Listing.listing_id, database.Listing.listed_at).order_by(database.Listing.listing_id)).all()
+    assert [tuple(row) for row in rows] == [("delisted", UTC_NOON), ("listed", UTC_NOON)]
+
+def test_applied_migrations_are_not_run_again(engine, monkeypatch):
+    init_db(engine)
+    applied = []
+    monkeypatch.setattr(migrations, "MIGRATIONS", [(version, name, applied.append) for version, name, _ in migrations.MIGRATIONS])
+    init_db(engine)
+    assert applied == []
+
+def test_sqlite_jobs_table_is_rebuilt_with_integer_ids(sqlite_engine):
+    create_table = str(CreateTable(database.Job.__table__).compile(dialect=sqlite_engine.dialect))
+    with sqlite_engine.begin() as connection:
+        connection.execute(text(create_table.replace("id INTEGER NOT NULL", "id BIGINT NOT NULL")))
+    init_db(sqlite_engine)
+    with sqlite_engine.begin() as connection:
+        job_id = connection.execute(insert(database.Job).values(
+            kind="verify", payload={}, status="PENDING", priority=0, run_at=UTC_NOON, attempts=0, max_attempts=5
+        )).inserted_primary_key[0]
+    assert job_id == 1
@@ -0,0 +1,40 @@
+import asyncio
+
+import pytest
+
+from worker.app.core import rechecker, utils
+from worker.app.core import magic_eden as me
+
+class CountingRateLimiter(utils.AsyncRateLimiter):
+    def __init__(self):
+        super().__init__(1000)
+        self.acquired = 0
+
+    async def acquire(self):
+        self.acquired += 1
+        await super().acquire()
+
+@pytest.fixture
+def me_status(monkeypatch):
+    """ME status checks answered from a dict of mint -> status, through a counting rate limiter."""
+    statuses = {}
+
+    async def check_listing_status_async(token_mint):
+        return statuses.get(token_mint)
+    monkeypatch.setattr(me, "check_listing_status_async", check_listing_status_async)
+    monkeypatch.setattr(me, "status_rate_limiter", CountingRateLimiter())
+    return statuses
+
+def test_verify_jobs_wait_for_the_status_rate_limiter(me_status):
+    async def main():
+        await asyncio.gather(*(rechecker.verify_job_handler({'token_mint': mint}) for mint in ("a", "b")),
+                             return_exceptions=True)
+
+    me_status["a"] = {'listStatus': 'listed'}
+    asyncio.run(main())
+    assert me.status_rate_limiter.acquired == 2
+
+def test_failed_verify_job_raises_so_it_is_retried(me_status):
+    with pytest.raises(RuntimeError):
+        asyncio.run(rechecker.verify_job_handler({'token_mint': "unknown"}))
+    assert me.status_rate_limiter.acquired == 1
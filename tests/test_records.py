@@ -0,0 +1,28 @@
+import pytest
+
+from database.records import Record, record_type
+
+FIELDS = ("listing_id", "name", "alt_value")
+
+def test_record_reads_like_a_dict_and_an_object():
+    record = record_type("ListingRecord", FIELDS)._make(("r-1", "Charizard", None))
+    assert isinstance(record, Record)
+    assert record["name"] == "Charizard" and record.name == "Charizard"
+    assert record.get("alt_value", 0.0) is None
+    assert record.get("supply", 7) == 7
+    assert "name" in record and "supply" not in record
+    assert list(record) == list(FIELDS) and len(record) == 3
+    assert {**record, "alt_value": 1.5} == {"listing_id": "r-1", "name": "Charizard", "alt_value": 1.5}
+    assert repr(record) == "ListingRecord(listing_id='r-1', name='Charizard', alt_value=None)"
+
+def test_record_rejects_unknown_keys_and_new_attributes():
+    record = record_type("ListingRecord", FIELDS)._make(("r-2", "Pikachu", 3.0))
+    with pytest.raises(KeyError):
+        record["supply"]
+    with pytest.raises(AttributeError):
+        record.supply = 1
+    assert not hasattr(record, "__dict__")
+
+def test_record_types_are_built_once_per_projection():
+    assert record_type("ListingRecord", FIELDS) is record_type("ListingRecord", FIELDS)
+    assert record_type("ListingRecord", FIELDS) is not record_type("ListingRecord", FIELDS[:2])
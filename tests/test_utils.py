@@ -0,0 +1,92 @@
+import time
+import asyncio
+
+import pytest
+
+from worker.app.core import utils
+
+def test_rate_limiter_spaces_out_concurrent_callers():
+    async def main():
+        limiter = utils.AsyncRateLimiter(50)
+        started_at = time.monotonic()
+        finished = []
+
+        async def call():
+            await limiter.acquire()
+            finished.append(time.monotonic() - started_at)
+        await asyncio.gather(*(call() for _ in range(6)))
+        return sorted(finished)
+
+    finished = asyncio.run(main())
+    assert finished[0] < 0.01
+    # Six calls at 50/s need five 20ms intervals
+    assert finished[-1] >= 0.095
+    assert all(later - earlier >= 0.015 for earlier, later in zip(finished, finished[1:]))
+
+def test_rate_limiter_does_not_bank_idle_time():
+    async def main():
+        limiter = utils.AsyncRateLimiter(50)
+        await limiter.acquire()
+        await asyncio.sleep(0.1)
+        started_at = time.monotonic()
+        await limiter.acquire()
+        await limiter.acquire()
+        return time.monotonic() - started_at
+
+    # After idling, the first call goes at once but the next still waits its interval
+    assert asyncio.run(main()) >= 0.015
+
+def test_priority_semaphore_hands_slots_out_by_priority_then_arrival():
+    async def main():
+        semaphore = utils.PrioritySemaphore(1)
+        order = []
+
+        async def worker(name: str, priority: int):
+            async with semaphore.slot(priority):
+                order.append(name)
+                await asyncio.sleep(0)
+
+        async with semaphore.slot():
+            tasks = [asyncio.create_task(worker(name, priority))
+                     for name, priority in (("backlog-1", 10), ("live-1", 0), ("backlog-2", 10), ("live-2", 0))]
+            await asyncio.sleep(0)
+            assert semaphore.locked() and semaphore.waiting == 4
+        await asyncio.gather(*tasks)
+        return order, semaphore.available
+
+    order, available = asyncio.run(main())
+    assert order == ["live-1", "live-2", "backlog-1", "backlog-2"]
+    assert available == 1
+
+def test_priority_semaphore_cancelled_waiters_do_not_leak_slots():
+    async def main():
+        semaphore = utils.PrioritySemaphore(1)
+        async with semaphore.slot():
+            waiting = asyncio.create_task(semaphore._acquire(0))
+            await asyncio.sleep(0)
+            waiting.cancel()
+            await asyncio.gather(waiting, return_exceptions=True)
+            # Handed the slot on release, then cancelled before it could run
+            handed_over = asyncio.create_task(semaphore._acquire(0))
+            await asyncio.sleep(0)
+        handed_over.cancel()
+        await asyncio.gather(handed_over, return_exceptions=True)
+        return semaphore.available, semaphore.waiting
+
+    assert asyncio.run(main()) == (1, 0)
+
+def test_alert_queue_delivers_by_level_then_fifo():
+    async def main():
+        queue = utils.AlertQueue()
+        for name, level in (("info-1", "INFO"), ("unknown", None), ("high", "HIGH"), ("gold-1", "gold"),
+                            ("info-2", "INFO"), ("gold-2", "GOLD")):
+            queue.put_nowait({"name": name, "alert_level": level})
+        assert queue.peek()["name"] == "gold-1"
+        assert queue.qsize() == 6
+        return [queue.get_nowait()["name"] for _ in range(queue.qsize())]
+
+    assert asyncio.run(main()) == ["gold-1", "gold-2", "high", "info-1", "info-2", "unknown"]
+
+def test_alert_queue_peek_on_empty_raises():
+    with pytest.raises(asyncio.QueueEmpty):
+        utils.AlertQueue().peek()
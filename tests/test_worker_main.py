@@ -0,0 +1,21 @@
+import pytest
+
+@pytest.mark.parametrize("price_usd, expected", [
+    (60, ('GOLD', 'AUTOBUY', '🟢 -40.00%')),
+    (70, ('GOLD', 'AUTOBUY', '🟢 -30.00%')),
+    (75, ('HIGH', 'GOOD', '-25.00%')),
+    (80, ('HIGH', 'GOOD', '-20.00%')),
+    (85, ('INFO', 'OK', '-15.00%')),
+    (90, (None, 'SKIP', '-10.00%')),
+    (120, (None, 'SKIP', '+20.00%')),
+])
+def test_classify_deal_bands(worker_main, price_usd, expected):
+    assert worker_main.classify_deal(100, price_usd, 80) == expected
+
+@pytest.mark.parametrize("alt_value, price_usd, confidence", [
+    (0, 50, 80),    # no valuation
+    (100, 0, 80),   # no price
+    (100, 50, 60),  # confidence must exceed 60
+])
+def test_classify_deal_skips_without_a_usable_valuation(worker_main, alt_value, price_usd, confidence):
+    assert worker_main.classify_deal(alt_value, price_usd, confidence) == (None, 'SKIP', None)
@@ -0,0 +1,89 @@
+import asyncio
+
+import pytest
+
+from database import aio, write_buffer
+
+@pytest.fixture
+def applied(monkeypatch):
+    """The (by_listing_id, is_listed_by_mint) batches flushed, instead of writing them to the database."""
+    batches = []
+
+    async def apply_listing_updates(by_listing_id, is_listed_by_mint):
+        batches.append(({key: dict(values) for key, values in by_listing_id.items()}, dict(is_listed_by_mint)))
+    monkeypatch.setattr(aio, "apply_listing_updates", apply_listing_updates)
+    return batches
+
+def test_writes_to_the_same_listing_coalesce_into_one_row(applied):
+    async def main():
+        buffer = write_buffer.WriteBuffer()
+        await buffer.update_listing("wb-1", {"alt_value": 10.0}, "GOOD")
+        await buffer.skip_listing("wb-1", "SKIP")
+        await buffer.update_listing_status("wb-mint-1", False)
+        await buffer.update_listing_status("wb-mint-1", True)
+        pending = buffer.pending()
+        await buffer.close()
+        return buffer, pending
+
+    buffer, pending = asyncio.run(main())
+    assert pending == 2
+    [(by_listing_id, is_listed_by_mint)] = applied
+    assert by_listing_id["wb-1"]["alt_value"] == 10.0
+    assert by_listing_id["wb-1"]["cartel_category"] == "SKIP"
+    assert is_listed_by_mint == {"wb-mint-1": True}
+    assert (buffer.writes, buffer.flushes, buffer.rows_flushed, buffer.pending()) == (4, 1, 2, 0)
+
+def test_overlay_applies_in_flight_then_pending_changes(monkeypatch):
+    async def main():
+        buffer = write_buffer.WriteBuffer()
+        in_flight, release = asyncio.Event(), asyncio.Event()
+
+        async def apply_listing_updates(by_listing_id, is_listed_by_mint):
+            in_flight.set()
+            await release.wait()
+        monkeypatch.setattr(aio, "apply_listing_updates", apply_listing_updates)
+
+        stored = {"listing_id": "wb-2", "token_mint": "wb-mint-2", "cartel_category": "NEW", "is_listed": True, "name": "card"}
+        await buffer.update_listing_status("wb-mint-2", False)
+        await buffer.skip_listing("wb-2", "OK")
+        flushing = asyncio.create_task(buffer.flush())
+        await in_flight.wait()
+        # Written while the first batch is in flight, so it lands on top of it
+        await buffer.skip_listing("wb-2", "GOOD")
+        during = buffer.overlay(stored)
+        release.set()
+        await flushing
+        after = buffer.overlay(stored)
+        await buffer.close()
+        return during, after, buffer.overlay(None)
+
+    during, after, missing = asyncio.run(main())
+    assert (during["cartel_category"], during["is_listed"], during["name"]) == ("GOOD", False, "card")
+    assert (after["cartel_category"], after["is_listed"]) == ("GOOD", True)
+    assert missing is None
+
+def test_failed_flush_keeps_the_batch_under_newer_writes(monkeypatch, applied):
+    async def main():
+        buffer = write_buffer.WriteBuffer()
+        real_apply = aio.apply_listing_updates
+
+        async def failing_apply(by_listing_id, is_listed_by_mint):
+            # A newer write arrives while the doomed flush is in flight
+            await buffer.skip_listing("wb-3", "GOOD")
+            await buffer.update_listing_status("wb-mint-3", True)
+            raise ConnectionError("database is down")
+
+        await buffer.update_listing("wb-3", {"alt_value": 5.0}, "OK")
+        await buffer.update_listing_status("wb-mint-3", False)
+        monkeypatch.setattr(aio, "apply_listing_updates", failing_apply)
+        with pytest.raises(ConnectionError):
+            await buffer.flush()
+        monkeypatch.setattr(aio, "apply_listing_updates", real_apply)
+        await buffer.close()
+        return buffer
+
+    buffer = asyncio.run(main())
+    [(by_listing_id, is_listed_by_mint)] = applied
+    assert (by_listing_id["wb-3"]["alt_value"], by_listing_id["wb-3"]["cartel_category"]) == (5.0, "GOOD")
+    assert is_listed_by_mint == {"wb-mint-3": True}
+    assert buffer.flush_errors == 1